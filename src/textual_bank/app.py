@@ -1,27 +1,42 @@
 from pathlib import Path
 from sqlite3 import OperationalError
-from typing import Any
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
 
 from constants_app import SCREENS
-from model.model import Model
-from textual import events, on
+from model.model import SEARCH_CANDIDATES, Model
+from model.money import cents_to_dollars_text
+from textual import events, on, work
 from textual.app import App, ComposeResult
 from textual.reactive import var
 from textual.widgets import Button, DataTable, Input, Select
 from views.budget_progress import BudgetProgress
+from views.cat_modal import CategorySelection
 from views.categorize import LabelTransactions
 from views.main_screen import HomeScreen
+from views.query_stats import QueryStatsScreen, sparkline
+from views.search import TransactionSearch
+from views.stats import SpendingStats
+from views.upload_screen import selected_files
 
 from data_handler import DataHandler
+from db_worker import DatabaseWorker
 from views.budget import BudgetCRUD
 
 
+if TYPE_CHECKING:
+    from model.ingest import IngestReport
+
+WRITE_BEHIND_INTERVAL: float = 0.25
+
+
 class Controller(App):
     """This is the main controller for the application. It handles all the events
 
     Attributes:
         model: The model object that handles the data.
         data_handler: The interface to the database.
+        db: The thread every DataHandler call is run on, off the event loop.
         title: The title of the current screen.
         sub_title: The sub title of the current screen.
     """
@@ -30,6 +45,7 @@ class Controller(App):
         super().__init__()
         self.model = model
         self.data_handler = data_handler
+        self.db = DatabaseWorker()
 
     CSS_PATH = [
         "tcss/budget_crud.tcss",
@@ -38,6 +54,8 @@ class Controller(App):
         "tcss/uploads.tcss",
         "tcss/budget_progress.tcss",
         "tcss/budget_crud_modal.tcss",
+        "tcss/search.tcss",
+        "tcss/stats.tcss",
     ]
 
     SCREENS = SCREENS
@@ -58,10 +76,13 @@ class Controller(App):
     def on_mount(self) -> None:
         self.title = "Textual Bank"
         self.sub_title = "Home Screen"
+        self.set_interval(WRITE_BEHIND_INTERVAL, self.flush_pending_writes)
 
     def on_key(self, event: events.Key) -> None:
         if event.key == "h":
             self.push_screen("home")
+        elif event.key == "ctrl+d":
+            self.push_screen("query_stats")
 
     ####################################################################################
     ############### Event Handlers Below, Class Definitions above ######################
@@ -71,7 +92,7 @@ class Controller(App):
     def select_new_category(self, event: Select.Changed):
         """When an option is selected, set category & set focus on the accept button."""
         self.new_category = event.value
-        self.query_one("#accept").focus()
+        self.screen.query_one("#accept").focus()
 
     @on(LabelTransactions.ProcessingStatusChange)
     def update_processing_status_in_db(
@@ -85,22 +106,43 @@ class Controller(App):
         None
         """
         self.data_handler.update_processing_status(
-            row=event.table.get_row(event.row_key),
+            transaction_id=int(event.row_key.value),
             value=event.value,
         )
+        if self.data_handler.write_batch_full:
+            self.flush_pending_writes()
 
     @on(LabelTransactions.FlagTransaction)
     def flag_transaction(self, event: LabelTransactions.FlagTransaction):
         """Inform DataHandler of changes needed in the DB for flagged status."""
-        self.data_handler.flag_transaction(row=event.table.get_row(event.row_key))
+        self.data_handler.flag_transaction(transaction_id=int(event.row_key.value))
+        if self.data_handler.write_batch_full:
+            self.flush_pending_writes()
+
+    @on(LabelTransactions.ScreenLeft)
+    def flush_pending_writes(self) -> None:
+        """Write queued triage edits on the database thread, if there are any."""
+        if self.data_handler.pending_write_count:
+            self.run_worker(self.write_pending_edits(), group="db")
+
+    async def write_pending_edits(self) -> None:
+        """Write queued triage edits, telling the user about any that were lost."""
+        try:
+            await self.db.run(self.data_handler.flush_pending_writes)
+        except RuntimeError as e:
+            self.notify(str(e), title="Edits Not Saved", severity="error")
 
-    # Remember to do this
     @on(BudgetProgress.ProgressTableMounted)
-    def get_aggregate_table_data(self, event: BudgetProgress.ProgressTableMounted):
-        """Query the DB for all unprocessed transactions and add them to the table."""
-        progress_data = self.data_handler.query_budget_progress_from_db()
+    @work(group="db")
+    async def get_budget_progress_data(
+        self, event: BudgetProgress.ProgressTableMounted
+    ):
+        """Query the DB for this month's budget progress and add it to the table."""
+        progress_data = await self.db.read(
+            self.data_handler.query_budget_progress_from_db
+        )
         if progress_data:
-            event.table.add_columns(
+            self.budget_columns = event.table.add_columns(
                 "Goal", "Actual", "Difference", "Category", "Month/Year"
             )
             event.table.add_rows(progress_data[0:])
@@ -108,11 +150,15 @@ class Controller(App):
             self.push_screen("home")
 
     @on(LabelTransactions.TableMounted)
-    def get_data_for_table(self, event: LabelTransactions.TableMounted):
-        """Query the DB for all unprocessed transactions and add them to the table."""
+    @work(group="db")
+    async def get_data_for_table(self, event: LabelTransactions.TableMounted):
+        """Query the DB for the newest page of unprocessed transactions and add it to the table."""
         try:
-            unprocessed_data = self.data_handler.query_transactions_from_db()
-            if unprocessed_data:
+            event.table.screen.categories = await self.db.read(
+                self.data_handler.query_categories
+            )
+            page = await self.db.read(self.data_handler.query_transaction_page)
+            if page:
                 self.transaction_columns = event.table.add_columns(
                     "AccountType",
                     "PostedDate",
@@ -123,17 +169,26 @@ class Controller(App):
                     "Processed",
                     "Flagged",
                 )
-                event.table.add_rows(unprocessed_data[0:])
+            event.table.screen.add_page(page)
         except OperationalError:
             self.push_screen("home")
 
+    @on(LabelTransactions.PageRequested)
+    @work(group="db")
+    async def get_page_for_table(self, event: LabelTransactions.PageRequested):
+        """Fetch the page of transactions either side of the table's window."""
+        # Queued edits are flushed first so the page reflects them.
+        await self.write_pending_edits()
+        page = await self.db.read(
+            self.data_handler.query_transaction_page,
+            before=event.before,
+            after=event.after,
+        )
+        event.table.screen.add_page(page, newer=event.after is not None)
+
     @on(LabelTransactions.CategoryAccepted)
     def update_data_table(self, event: LabelTransactions.CategoryAccepted):
         """Update the category of the selected row in the database."""
-        self.data_handler.update_category(
-            new_category=event.category,
-            row=event.table.get_row(event.row_key),
-        )
         event.table.update_cell(
             row_key=event.row_key,
             column_key=self.transaction_columns[4],
@@ -144,22 +199,136 @@ class Controller(App):
             column_key=self.transaction_columns[6],
             value="Yes",
         )
-
-    @on(BudgetProgress.ProgressTableMounted)
-    def get_budget_progress_data(self, event: BudgetProgress.ProgressTableMounted):
-        """Query the DB for all budget items and add them to the table."""
-        progress_data = self.data_handler.query_budget_progress_from_db()
-        if progress_data:
-            self.budget_columns = event.table.add_columns(
-                "Goal", "Actual", "Difference", "Category", "Month/Year"
+        self.data_handler.update_category(
+            new_category=event.category,
+            transaction_id=int(event.row_key.value),
+        )
+        if self.data_handler.write_batch_full:
+            self.flush_pending_writes()
+
+    @on(CategorySelection.SuggestionsRequested)
+    @work(group="db")
+    async def rank_category_options(
+        self, event: CategorySelection.SuggestionsRequested
+    ):
+        """Put the categories chosen before for this merchant first in the picker."""
+        suggested = await self.db.read(
+            self.data_handler.query_category_suggestions, event.description
+        )
+        if event.modal.is_attached:
+            event.modal.rank_options(suggested)
+
+    @on(LabelTransactions.CategoryAcceptedForSimilar)
+    @work(group="db")
+    async def update_similar_rows(
+        self, event: LabelTransactions.CategoryAcceptedForSimilar
+    ):
+        """Categorize every transaction like the selected one and patch their rows."""
+        await self.write_pending_edits()
+        updated = await self.db.run(
+            self.data_handler.recategorize_similar,
+            new_category=event.category,
+            transaction_id=int(event.row_key.value),
+            exact=event.exact,
+        )
+        # Rows outside the window are fetched with their new values when paged in.
+        row_keys = [str(id) for id in updated if str(id) in event.table.rows]
+        with self.batch_update():
+            for row_key in row_keys:
+                event.table.update_cell(
+                    row_key=row_key,
+                    column_key=self.transaction_columns[4],
+                    value=event.category,
+                )
+                event.table.update_cell(
+                    row_key=row_key,
+                    column_key=self.transaction_columns[6],
+                    value="Yes",
+                )
+        self.notify(f"Categorized {len(updated)} transactions as {event.category}")
+
+    @on(QueryStatsScreen.StatsRequested)
+    def show_query_stats(self, event: QueryStatsScreen.StatsRequested) -> None:
+        """Fill the debug table with the latest per-statement timings."""
+        # The counters live in memory, so this does not go through the DB thread.
+        stats = self.data_handler.query_stats(reset=event.reset)
+        cursor_row = event.table.cursor_row
+        event.table.clear()
+        for statement in stats:
+            event.table.add_row(
+                f"{statement.seconds * 1000:,.1f}",
+                statement.calls,
+                f"{statement.mean_seconds * 1000:,.2f}",
+                f"{statement.max_seconds * 1000:,.1f}",
+                statement.rows,
+                statement.errors,
+                statement.lock_waits,
+                sparkline(statement.histogram),
+                statement.sql[:120],
             )
-            event.table.add_rows(progress_data[0:])
+        if event.table.row_count:
+            event.table.move_cursor(row=min(cursor_row, event.table.row_count - 1))
+
+    @on(TransactionSearch.SearchRequested)
+    @work(group="search", exclusive=True)
+    async def search_transactions(self, event: TransactionSearch.SearchRequested):
+        """Replace the search results with the matches for the latest search."""
+        start = perf_counter()
+        try:
+            rows = await self.db.read(
+                self.data_handler.search_transactions,
+                event.query,
+                start=event.start,
+                end=event.end,
+                min_amount=event.min_amount,
+                max_amount=event.max_amount,
+            )
+        except (ValueError, OperationalError) as e:
+            event.status.update(f"Invalid search: {e}")
+            return
+        seconds = perf_counter() - start
+        event.table.clear()
+        event.table.add_rows(row[1:-1] for row in rows)
+        status = f"{len(rows):,} matches in {seconds * 1000:,.1f} ms"
+        if rows and rows[0][-1] >= SEARCH_CANDIDATES:
+            status += (
+                f", ranked from the newest {SEARCH_CANDIDATES:,} only;"
+                " add words or dates to reach older transactions"
+            )
+        event.status.update(status)
+
+    @on(SpendingStats.StatsRequested)
+    @work(group="db")
+    async def show_spending_stats(self, event: SpendingStats.StatsRequested):
+        """Fill the statistics tables from the analytics snapshot."""
+        start = perf_counter()
+        report = await self.db.read(self.data_handler.query_spending_report)
+        event.categories.clear()
+        event.categories.add_rows(report.categories)
+        event.savings.clear()
+        event.savings.add_rows(
+            (*row[:4], "" if row[4] is None else f"{row[4]:.1%}")
+            for row in report.savings
+        )
+        event.merchants.clear()
+        event.merchants.add_rows(report.merchants)
+        if report.latest_month is None:
+            event.status.update("No transactions yet")
+            return
+        event.status.update(
+            f"{report.transactions:,} transactions through {report.latest_month}, "
+            f"computed in {(perf_counter() - start) * 1000:,.1f} ms"
+        )
 
     @on(BudgetCRUD.BudgetTableMounted)
-    def get_all_budget_items(self, event: BudgetCRUD.BudgetTableMounted) -> None:
+    @work(group="db")
+    async def get_all_budget_items(self, event: BudgetCRUD.BudgetTableMounted) -> None:
         """Query the DB for all budget items and add them to the table."""
-        budget_items: list[Any] | None = (
-            self.data_handler.query_active_budget_items_from_db()
+        event.table.screen.categories = await self.db.read(
+            self.data_handler.query_categories
+        )
+        budget_items: list[Any] | None = await self.db.read(
+            self.data_handler.query_active_budget_items_from_db
         )
         if budget_items:
             self.budget_columns = event.table.add_columns(
@@ -181,55 +350,67 @@ class Controller(App):
         self.query_one("#update_item_category", expect_type=Select).value = str(
             event.row_data[1]
         )
-        self.query_one("#update_item_goal", expect_type=Input).value = str(
-            event.row_data[2]
-        )
+        self.query_one(
+            "#update_item_goal", expect_type=Input
+        ).value = cents_to_dollars_text(event.row_data[2])
 
     @on(BudgetCRUD.SaveBudgetItemUpdate)
-    def budget_items_to_update(self, event: BudgetCRUD.SaveBudgetItemUpdate):
-        self.data_handler.update_budget_item(row=event.result)
-        budget_items = self.data_handler.query_active_budget_items_from_db()
+    @work(group="db")
+    async def budget_items_to_update(self, event: BudgetCRUD.SaveBudgetItemUpdate):
+        await self.db.run(self.data_handler.update_budget_item, row=event.result)
+        budget_items = await self.db.read(
+            self.data_handler.query_active_budget_items_from_db
+        )
         event.table.clear()
         if budget_items:
             event.table.add_rows(budget_items[0:])
 
     @on(BudgetCRUD.FilterBudgetTable)
-    def filter_budget_table(self, event: BudgetCRUD.FilterBudgetTable):
+    @work(group="db")
+    async def filter_budget_table(self, event: BudgetCRUD.FilterBudgetTable):
         """Filter the budget table based on the active status of the budget items."""
         if event.active:
-            budget_items = self.data_handler.query_active_budget_items_from_db()
+            query = self.data_handler.query_active_budget_items_from_db
         else:
-            budget_items = self.data_handler.query_budget_items_from_db()
+            query = self.data_handler.query_budget_items_from_db
+        budget_items = await self.db.read(query)
         if budget_items:
             event.table.clear()
             event.table.add_rows(budget_items[0:])
 
     @on(BudgetCRUD.SaveBudgetItem)
-    def items_to_save(self, event: BudgetCRUD.SaveBudgetItem) -> None:
+    @work(group="db")
+    async def items_to_save(self, event: BudgetCRUD.SaveBudgetItem) -> None:
         """Save the new budget item to the database."""
-        self.data_handler.save_new_budget_item(
+        await self.db.run(
+            self.data_handler.save_new_budget_item,
             category=event.item_category,
             amount=event.item_amount,
             active=event.active_status,
         )
-        table = self.query_one("#budget_data_table", expect_type=DataTable)
+        budget_items = await self.db.read(
+            self.data_handler.query_active_budget_items_from_db
+        )
+        table = self.screen.query_one("#budget_data_table", expect_type=DataTable)
         if table:
             table.clear()
-            table.add_rows(self.data_handler.query_active_budget_items_from_db()[0:])
+            table.add_rows(budget_items[0:])
         else:
             self.push_screen("home")
 
     @on(BudgetCRUD.DeleteBudgetItem)
-    def delete_budget_item(self, event: BudgetCRUD.DeleteBudgetItem) -> None:
+    @work(group="db")
+    async def delete_budget_item(self, event: BudgetCRUD.DeleteBudgetItem) -> None:
         """Delete a budget item from the database."""
-        self.data_handler.delete_item_from_db(id=event.id)
         event.table.remove_row(event.row_key)
+        await self.db.run(self.data_handler.delete_item_from_db, id=event.id)
 
     @on(BudgetProgress.CycleBackward)
-    def handle_backward_cycle(self, event: BudgetProgress.CycleBackward) -> None:
+    @work(group="db")
+    async def handle_backward_cycle(self, event: BudgetProgress.CycleBackward) -> None:
         """Tell DataHandler/DB to move data by x months backwards in time"""
-        new_data = self.data_handler.cycle_months(
-            number_of_months=event.number_of_months
+        new_data = await self.db.read(
+            self.data_handler.cycle_months, number_of_months=event.number_of_months
         )
 
         if new_data:
@@ -240,10 +421,11 @@ class Controller(App):
                 event.table.clear(columns=False)
 
     @on(BudgetProgress.CycleForward)
-    def handle_forward_cycle(self, event: BudgetProgress.CycleForward):
+    @work(group="db")
+    async def handle_forward_cycle(self, event: BudgetProgress.CycleForward):
         """Tell DataHandler/DB to move data by x months forward in time"""
-        new_data: list[tuple[int, int, int, str, str]] | None = (
-            self.data_handler.cycle_months(number_of_months=event.number_of_months)
+        new_data: list[tuple[int, int, int, str, str]] | None = await self.db.read(
+            self.data_handler.cycle_months, number_of_months=event.number_of_months
         )
         if type(new_data) is list:
             event.table.clear(columns=False)
@@ -255,10 +437,68 @@ class Controller(App):
     ############# Button Events #################
     #############################################
     @on(Button.Pressed, "#upload_transactions")
-    def on_upload_dataframe(self):
-        """Send filepath to DataHandler for uploading to database."""
-        filepath = Path(self.query_one("#file_name", expect_type=Input).value)
-        self.data_handler.upload_dataframe(filepath)
+    @work(group="db")
+    async def on_upload_dataframe(self):
+        """Send filepath to DataHandler for uploading to database.
+
+        The import runs on the database thread, so the UI keeps repainting and
+        handling keys while a large file is processed.
+        """
+        filepaths = selected_files(
+            self.screen.query_one("#file_name", expect_type=Input).value
+        )
+        if not filepaths:
+            self.notify("No csv files found", title="Upload Failed", severity="error")
+            return
+        if len(filepaths) > 1:
+            await self.upload_files(filepaths)
+            return
+        filepath = filepaths[0]
+        self.notify(f"Uploading {filepath.name}...")
+        try:
+            report = await self.db.run(self.data_handler.upload_dataframe, filepath)
+        except Exception as e:
+            self.notify(str(e), title="Upload Failed", severity="error")
+            return
+        self.notify(str(report), title="Upload Complete")
+
+    async def upload_files(self, filepaths: list[Path]) -> None:
+        """Upload several files at once, showing the progress of each one.
+
+        The files are parsed in parallel; every report is shown in the progress
+        table as soon as its file has been written or has failed.
+        """
+        table = self.screen.query_one("#upload_progress", expect_type=DataTable)
+        table.clear()
+        for filepath in filepaths:
+            table.add_row(filepath.name, "Parsing", "", "", "", key=str(filepath))
+        table.display = True
+        self.notify(f"Uploading {len(filepaths)} files...")
+
+        def show_progress(report: "IngestReport") -> None:
+            status = "Failed: " + report.error if report.error else "Done"
+            table.update_cell(report.filepath, "Status", status)
+            if not report.error:
+                table.update_cell(report.filepath, "Rows", f"{report.rows_read:,}")
+                table.update_cell(
+                    report.filepath, "Written", f"{report.rows_written:,}"
+                )
+                table.update_cell(report.filepath, "Seconds", f"{report.seconds:.2f}")
+
+        start = perf_counter()
+        reports = await self.db.run(
+            self.data_handler.upload_files,
+            filepaths,
+            lambda report: self.call_from_thread(show_progress, report),
+        )
+        failed = sum(report.error is not None for report in reports)
+        self.notify(
+            f"Imported {sum(report.rows_written for report in reports):,} rows from "
+            f"{len(reports) - failed} of {len(reports)} files "
+            f"in {perf_counter() - start:.2f}s",
+            title="Upload Complete" if not failed else "Upload Finished With Errors",
+            severity="information" if not failed else "warning",
+        )
 
     @on(Button.Pressed, "#cancel")
     def cancel_buttons(self):
@@ -274,9 +514,10 @@ class Controller(App):
         self.push_screen(screen=event.button.id)
 
     @on(Button.Pressed, "#quit")
-    def quit_buttons(self):
+    async def quit_buttons(self):
         """Closes the application for any buttons with the id of quit."""
-        self.data_handler.close_database_connection()
+        await self.db.run(self.data_handler.close_database_connection)
+        self.db.shutdown()
         self.exit()
 
     @on(Button.Pressed, "#home")
@@ -290,3 +531,5 @@ if __name__ == "__main__":
     data_handler = DataHandler(model)
     app = Controller(model, data_handler)
     app.run()
+    # Nothing is pending after the Quit button; this covers every other way out.
+    data_handler.flush_pending_writes()
@@ -0,0 +1,289 @@
+"""Benchmark csv ingest and the app's queries on synthetic data.
+
+Every run generates the same deterministic export (see synthetic.py), loads it
+into a throwaway database and times each operation a few times. Results are
+written as JSON, and an earlier results file can be passed to `--compare` to
+print how much faster or slower each operation got.
+
+Usage:
+    python benchmark.py --rows 100000
+    python benchmark.py --rows 1000000 --repeat 5 --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from model.ingest import CSV_COLUMNS, tweak_incoming_dataframe
+from model.model import Model, month_key
+from synthetic import DEFAULT_SEED, write_csv
+
+DEFAULT_ROWS: int = 100_000
+DEFAULT_REPEAT: int = 3
+# Share of the export uploaded first, before the incremental upload of the whole.
+INCREMENTAL_PREFIX: float = 0.9
+PROCESSED_SHARE: float = 0.5
+# Goals for categories the default rules assign to the synthetic descriptions,
+# so the progress queries have totals to join.
+GOALS: dict[str, int] = {
+    "Groceries/House Supplies": 60_000,
+    "Car Expenses": 25_000,
+    "Netflix": 2_000,
+    "Money towards savings": 100_000,
+}
+
+
+@dataclass
+class Timing:
+    """Wall times of every repeat of one benchmarked operation.
+
+    Attributes:
+    name (str): The operation.
+    rows (int): Rows in the database or file the operation ran against.
+    seconds (list[float]): Wall time of each repeat.
+    """
+
+    name: str
+    rows: int
+    seconds: list[float] = field(default_factory=list)
+
+    @property
+    def best(self) -> float:
+        return min(self.seconds)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.seconds)
+
+    def as_dict(self) -> dict:
+        return asdict(self) | {"best": self.best, "median": self.median}
+
+
+def time_call(
+    name: str,
+    rows: int,
+    repeat: int,
+    fn: Callable[[], object],
+    setup: Callable[[], object] | None = None,
+) -> Timing:
+    """Time `fn` `repeat` times, running the untimed `setup` before each call."""
+    timing = Timing(name, rows)
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timing.seconds.append(time.perf_counter() - start)
+    return timing
+
+
+def rows_per_day(rows: int) -> int:
+    """Spread the export over roughly a year, whatever its size."""
+    return max(40, rows // 365)
+
+
+def run_benchmarks(rows: int, repeat: int, workdir: Path) -> list[Timing]:
+    """Run every benchmark against `rows` synthetic transactions."""
+    per_day = rows_per_day(rows)
+    export = write_csv(workdir / "export.csv", rows, DEFAULT_SEED, per_day)
+    prefix_rows = int(rows * INCREMENTAL_PREFIX)
+    prefix = write_csv(workdir / "prefix.csv", prefix_rows, DEFAULT_SEED, per_day)
+    db_path = workdir / "bench.db"
+
+    def fresh_model() -> Model:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+        return Model(db_path=db_path)
+
+    timings = []
+    models: list[Model] = []
+
+    def cold_setup() -> None:
+        for model in models:
+            model.close_database_connection()
+        models[:] = [fresh_model()]
+
+    timings.append(
+        time_call(
+            "upload_dataframe cold",
+            rows,
+            repeat,
+            lambda: models[0].upload_dataframe(export),
+            setup=cold_setup,
+        )
+    )
+
+    def incremental_setup() -> None:
+        cold_setup()
+        models[0].upload_dataframe(prefix)
+
+    timings.append(
+        time_call(
+            "upload_dataframe incremental",
+            rows - prefix_rows,
+            repeat,
+            lambda: models[0].upload_dataframe(export),
+            setup=incremental_setup,
+        )
+    )
+    # Every row is already stored, so this is the cost of deduplication alone.
+    timings.append(
+        time_call(
+            "upload_dataframe duplicate",
+            rows,
+            repeat,
+            lambda: models[0].upload_dataframe(export),
+        )
+    )
+
+    frame = pd.read_csv(export, parse_dates=["Posted Date"])[CSV_COLUMNS]
+    matcher = models[0].category_matcher()
+    timings.append(
+        time_call(
+            "tweak_incoming_dataframe",
+            rows,
+            repeat,
+            lambda: tweak_incoming_dataframe(frame, matcher),
+        )
+    )
+
+    model = models[0]
+    model.con.execute(
+        "UPDATE MyAccounts SET Processed = 'Yes' WHERE id % ? = 0",
+        (round(1 / PROCESSED_SHARE),),
+    )
+    stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for category, goal in GOALS.items():
+        model.insert_new_goals(category, goal, True, stamp)
+    model.con.commit()
+    # Benchmark the months the data covers rather than today's.
+    newest = model.con.execute(
+        "SELECT MAX(PostedMonth) FROM MyAccounts"
+    ).fetchone()[0]
+    deepest = model.con.execute(
+        "SELECT PostedDate, id FROM MyAccounts WHERE Processed = 'No' "
+        "ORDER BY PostedDate, id LIMIT 1 OFFSET 200"
+    ).fetchone()
+    current = month_key()
+    months_back = (current // 100 - newest // 100) * 12 + (
+        current % 100 - newest % 100
+    )
+
+    queries: dict[str, Callable[[], object]] = {
+        "get_unprocessed_transactions_page first": lambda: (
+            model.get_unprocessed_transactions_page(200)
+        ),
+        "get_unprocessed_transactions_page deep": lambda: (
+            model.get_unprocessed_transactions_page(200, before=deepest)
+        ),
+        "retrieve_all_goals": model.retrieve_all_goals,
+        "retrieve_active_goals": model.retrieve_active_goals,
+        # retrieve_budget_progress and retrieve_month_fwd_progress are this
+        # query for today's and later months, which the synthetic data ends
+        # before, so they would only time an empty result.
+        "retrieve_month_progress": lambda: model.retrieve_month_progress(newest),
+        "retrieve_month_bwd_progress": lambda: (
+            model.retrieve_month_bwd_progress(months_back)
+        ),
+        "retrieve_all_budget_progress": model.retrieve_all_budget_progress,
+        "rebuild_monthly_category_totals": model.rebuild_monthly_category_totals,
+        # The first repeat builds the snapshot, the rest only refresh it.
+        "spending_report": model.spending_report,
+    }
+    for name, query in queries.items():
+        if "progress" in name:
+            assert query(), f"{name} returned no rows; check GOALS"
+        timings.append(time_call(name, rows, repeat, query))
+    model.close_database_connection()
+    return timings
+
+
+def environment() -> dict:
+    """Describe the machine and code the results were measured on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def compare(timings: list[Timing], baseline_path: Path) -> None:
+    """Print the median of each operation against the same one in a baseline."""
+    baseline = {
+        result["name"]: result["median"]
+        for result in json.loads(baseline_path.read_text())["results"]
+    }
+    print(f"\n{'operation':<42} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for timing in timings:
+        before = baseline.get(timing.name)
+        if before is None:
+            continue
+        print(
+            f"{timing.name:<42} {before * 1000:>10.3f} {timing.median * 1000:>10.3f} "
+            f"{before / timing.median:>7.2f}x"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="earlier results to compare to")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="textual-bank-bench-") as workdir:
+        timings = run_benchmarks(args.rows, args.repeat, Path(workdir))
+
+    print(f"{'operation':<42} {'rows':>10} {'best ms':>10} {'median ms':>10}")
+    for timing in timings:
+        print(
+            f"{timing.name:<42} {timing.rows:>10,} "
+            f"{timing.best * 1000:>10.3f} {timing.median * 1000:>10.3f}"
+        )
+    output = args.output or Path(
+        f"benchmark-{args.rows}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.write_text(
+        json.dumps(
+            {
+                "environment": environment(),
+                "rows": args.rows,
+                "repeat": args.repeat,
+                "results": [timing.as_dict() for timing in timings],
+            },
+            indent=2,
+        )
+    )
+    print(f"\nWrote {output}")
+    if args.compare:
+        compare(timings, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
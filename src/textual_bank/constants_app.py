@@ -1,7 +1,9 @@
 from views.budget import BudgetCRUD, CreateBudgetItem
 from views.budget_progress import BudgetProgress
-from views.categorize import CategorySelection, LabelTransactions
+from views.categorize import LabelTransactions
 from views.main_screen import HomeScreen
+from views.query_stats import QueryStatsScreen
+from views.search import TransactionSearch
 from views.stats import SpendingStats
 from views.upload_screen import UploadScreen
 
@@ -12,6 +14,7 @@ SCREENS = {
     "budget_review": BudgetProgress,
     "budget_crud": BudgetCRUD,
     "stats": SpendingStats,
-    "catpicker": CategorySelection,
     "new_budget_goal": CreateBudgetItem,
+    "query_stats": QueryStatsScreen,
+    "search": TransactionSearch,
 }
@@ -30,3 +30,26 @@ SELECT_OPTIONS: list[tuple] = [
     ("House Reno", "House Reno"),
     ("Medical", "Medical"),
 ]
+
+# (pattern, priority, category) seeded into the category_rules table. Patterns are
+# case-insensitive substrings of the transaction description; lower priorities win.
+DEFAULT_CATEGORY_RULES: list[tuple[str, int, str]] = [
+    ("dividend paid", 10, "Money towards savings"),
+    ("netflix.com", 20, "Netflix"),
+    ("schnucks", 30, "Groceries/House Supplies"),
+    ("animal hospitals", 40, "Dog"),
+    ("google storage", 50, "Google Storage"),
+    ("tmobile", 60, "T-Mobile Internet"),
+    ("autozone", 70, "Car Expenses"),
+    ("ach:discover -e-payment", 80, "Discover Card"),
+    ("ach:jpmorgan chase -chase ach", 90, "JPMorgan Chase - Mortgage"),
+    ("small wonders", 100, "Daycare expenses"),
+    ("university of wi -dir dep", 110, "Adam Paycheck"),
+    ("ach:black & veatch", 120, "Nicole Paycheck"),
+    ("Gas / Fuel", 130, "Gas"),
+    ("Transfer", 140, "Money towards savings"),
+    ("Dining Out", 150, "Eating Out"),
+    ("Doctor", 160, "Medical"),
+    ("Veterinary", 170, "Dog"),
+    ("Auto Insurance", 180, "Auto Insurance"),
+]
@@ -1,32 +1,113 @@
-from dataclasses import dataclass
-from datetime import datetime
-from types import CellType
-from typing import Any
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any
 from model.model import Model
+from model.money import dollars_to_cents, with_cents
 from pathlib import Path
 
+if TYPE_CHECKING:
+    from model.analytics import SpendingReport
+    from model.ingest import IngestReport
+    from model.instrumentation import StatementStats
+
+
+WRITE_BATCH_SIZE: int = 500
+TRANSACTION_PAGE_SIZE: int = 200
+
 
 @dataclass
 class DataHandler:
-    """An interface between the Model and the Controller"""
+    """An interface between the Model and the Controller
+
+    Accepting, flagging and recategorizing transactions is write-behind: the
+    edits are coalesced per transaction in memory and written by
+    `flush_pending_writes` with one executemany per kind of edit inside a
+    single transaction.
+
+    The category names the pickers offer are cached until a write or an
+    import may have added one.
+    """
 
     model: Model
+    batch_size: int = WRITE_BATCH_SIZE
+    pending_categories: dict[int, str] = field(default_factory=dict)
+    pending_statuses: dict[int, str] = field(default_factory=dict)
+    pending_flags: set[int] = field(default_factory=set)
+    _pending_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _categories: list[str] | None = field(default=None, repr=False)
+
+    def query_transaction_page(
+        self,
+        limit: int = TRANSACTION_PAGE_SIZE,
+        before: tuple[str, int] | None = None,
+        after: tuple[str, int] | None = None,
+    ) -> list[tuple]:
+        """Query one keyset page of unprocessed transactions from the database."""
+        page = self.model.get_unprocessed_transactions_page(limit, before, after)
+        return with_cents(page, 4, 7)
+
+    def search_transactions(
+        self,
+        query: str,
+        start: str = "",
+        end: str = "",
+        min_amount: str = "",
+        max_amount: str = "",
+    ) -> list[tuple]:
+        """Search every transaction with the filters as the user typed them.
+
+        Raises:
+        ValueError: If a date is not YYYY-MM-DD or an amount is not a number.
+        sqlite3.OperationalError: If the query is not valid FTS5.
+        """
+        rows = self.model.search_transactions(
+            query,
+            start=date.fromisoformat(start).isoformat() if start else None,
+            end=date.fromisoformat(end).isoformat() if end else None,
+            min_cents=abs(dollars_to_cents(min_amount)) if min_amount else None,
+            max_cents=abs(dollars_to_cents(max_amount)) if max_amount else None,
+        )
+        return with_cents(rows, 5)
+
+    def query_spending_report(self) -> "SpendingReport":
+        """Query the spending statistics, with every amount shown as dollars."""
+        report = self.model.spending_report()
+        report.categories = with_cents(report.categories, 1, 2, 3, 4)
+        report.savings = with_cents(report.savings, 1, 2, 3)
+        report.merchants = with_cents(report.merchants, 1)
+        return report
+
+    def query_category_suggestions(self, description: str) -> list[str]:
+        """Query the DB for the categories chosen before for a description."""
+        return self.model.suggest_categories(description)
 
-    def query_transactions_from_db(self):
-        """Query all unprocessed transactions from the database."""
-        return self.model.get_unprocessed_transactions()
+    def query_categories(self) -> list[str]:
+        """Query every category name, from the cache when it is current."""
+        categories = self._categories
+        if categories is None:
+            categories = self._categories = self.model.retrieve_categories()
+        return categories
+
+    def forget_categories(self, *written: str) -> None:
+        """Drop the cached category names if any of `written` is not among them."""
+        categories = self._categories
+        if categories is not None and not set(written) <= set(categories):
+            self._categories = None
 
     def query_budget_items_from_db(self) -> list:
         """Query all budget items from the database."""
-        return self.model.retrieve_all_goals()
+        return with_cents(self.model.retrieve_all_goals(), 2)
 
     def query_active_budget_items_from_db(self) -> list[Any]:
         """Query all active budget items from the database."""
-        return self.model.retrieve_active_goals()
+        return with_cents(self.model.retrieve_active_goals(), 2)
 
     def query_budget_progress_from_db(self):
         """Query all budget progress from the database."""
-        return self.model.retrieve_budget_progress()
+        progress = self.model.retrieve_budget_progress()
+        return None if progress is None else with_cents(progress, 0, 1, 2)
 
     def delete_item_from_db(self, id: int) -> bool | None:
         """Delete a budget item from the database.
@@ -43,50 +124,133 @@ class DataHandler:
         else:
             print("Failed to delete category from datahandler)")
 
-    def upload_dataframe(self, filepath: str | Path):
+    def upload_dataframe(self, filepath: str | Path) -> "IngestReport":
         """Upload a csv file to the database."""
-        success = self.model.upload_dataframe(filepath)
-        if success:
-            return True
+        self._categories = None
+        return self.model.upload_dataframe(filepath)
+
+    def upload_files(
+        self,
+        filepaths: list[Path],
+        progress: Callable[["IngestReport"], None] | None = None,
+    ) -> list["IngestReport"]:
+        """Upload several csv files to the database, reporting each one."""
+        self._categories = None
+        return self.model.upload_files(filepaths, progress)
+
+    def update_category(self, new_category: str, transaction_id: int):
+        """Queue a category change for a transaction based on user input."""
+        with self._pending_lock:
+            self.pending_categories[transaction_id] = new_category
+        return True
+
+    def recategorize_similar(
+        self, new_category: str, transaction_id: int, exact: bool = False
+    ) -> list[int]:
+        """Categorize a transaction and every unprocessed one like it at once.
 
-    def update_category(self, new_category: str, row: list[Any]):
-        """Update the category of a transaction based on user input."""
-        old_category = row[4]
-        description = row[3]
-        amount = row[2]
-        balance = row[5]
-        success = self.model.update_category(
-            new_category,
-            old_category,
-            description,
-            amount,
-            balance,
+        Queued edits are written first so none of them lands on top of the bulk
+        update afterwards.
+
+        Returns:
+        list[int]: Ids of every transaction that was updated.
+        """
+        self.flush_pending_writes()
+        updated = self.model.recategorize_similar(transaction_id, new_category, exact)
+        self.forget_categories(new_category)
+        return updated
+
+    @property
+    def pending_write_count(self) -> int:
+        """The number of queued edits that have not been written yet."""
+        return (
+            len(self.pending_categories)
+            + len(self.pending_statuses)
+            + len(self.pending_flags)
         )
-        if success:
-            return True
+
+    @property
+    def write_batch_full(self) -> bool:
+        """Whether enough edits are queued that they should be flushed now."""
+        return self.pending_write_count >= self.batch_size
+
+    def flush_pending_writes(self) -> int:
+        """Write every queued edit to the database in one transaction.
+
+        If the batch fails, each transaction's edits are retried on their own
+        so one bad edit cannot hold back the rest. Edits that still fail are
+        dropped rather than queued again.
+
+        Returns:
+        int: The number of rows updated.
+
+        Raises:
+        RuntimeError: If some edits were dropped; every other edit was written.
+        """
+        with self._pending_lock:
+            if not self.pending_write_count:
+                return 0
+            categories, self.pending_categories = self.pending_categories, {}
+            statuses, self.pending_statuses = self.pending_statuses, {}
+            flags, self.pending_flags = self.pending_flags, set()
+        try:
+            updated = self.model.apply_transaction_updates(categories, statuses, flags)
+        except Exception:
+            updated, dropped = self._write_one_at_a_time(categories, statuses, flags)
+            self.forget_categories(*categories.values())
+            if dropped:
+                raise RuntimeError(
+                    "Could not save the edits to transactions "
+                    + ", ".join(map(str, sorted(dropped)))
+                )
+            return updated
+        self.forget_categories(*categories.values())
+        return updated
+
+    def _write_one_at_a_time(
+        self, categories: dict[int, str], statuses: dict[int, str], flags: set[int]
+    ) -> tuple[int, list[int]]:
+        """Write the edits of each transaction in its own transaction.
+
+        Returns:
+        tuple[int, list[int]]: The rows updated and the ids whose edits failed.
+        """
+        updated, dropped = 0, []
+        for id in categories.keys() | statuses.keys() | flags:
+            try:
+                updated += self.model.apply_transaction_updates(
+                    {id: categories[id]} if id in categories else {},
+                    {id: statuses[id]} if id in statuses else {},
+                    {id} & flags,
+                )
+            except Exception:
+                dropped.append(id)
+        return updated, dropped
+
+    def query_stats(self, reset: bool = False) -> list["StatementStats"]:
+        """Return the timings of every statement run so far, slowest first."""
+        stats = self.model.connections.stats
+        if reset:
+            stats.reset()
+        return stats.snapshot()
 
     def close_database_connection(self):
-        """Close the database connection."""
+        """Write any queued edits, then close the database connection."""
+        try:
+            self.flush_pending_writes()
+        except RuntimeError as e:
+            print(e)
         success = self.model.close_database_connection()
         if success:
             return True
         else:
             print("Failed to close the database connection properly")
 
-    def update_processing_status(self, row: list[CellType], value: str) -> bool | None:
-        category = row[4]
-        description = row[3]
-        amount = row[2]
-        balance = row[5]
-        status = value
-        flagged = row[7]
-        success = self.model.update_status(
-            category, description, amount, balance, status, flagged
-        )
-        if success:
-            return True
-        else:
-            print("failed to update - from DataHandler")
+    def update_processing_status(self, transaction_id: int, value: str) -> bool | None:
+        """Queue a processing status change for a transaction."""
+        with self._pending_lock:
+            self.pending_statuses[transaction_id] = value
+        return True
 
     def update_budget_item(self, row: list) -> bool | None:
         """Update a budget item in the database.
@@ -99,7 +263,7 @@ class DataHandler:
         timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d")
         id = row[0]
         category = row[1]
-        goal = row[2]
+        goal = dollars_to_cents(row[2])
         active = row[3]
         success = self.model.update_existing_goals(
             category=category,
@@ -108,25 +272,24 @@ class DataHandler:
             timestamp=timestamp,
             id=id,
         )
+        self.forget_categories(category)
         if success:
             return True
         else:
             print("Failed to update category from datahandler)")
 
-    def flag_transaction(self, row):
-        category = row[4]
-        description = row[3]
-        amount = row[2]
-        balance = row[5]
-        success = self.model.flag_transaction(category, description, amount, balance)
-        if success:
-            return True
-        else:
-            print("failed to update - from DataHandler")
+    def flag_transaction(self, transaction_id: int):
+        """Queue a transaction to be flagged."""
+        with self._pending_lock:
+            self.pending_flags.add(transaction_id)
+        return True
 
-    def save_new_budget_item(self, category: str, amount: int, active: bool) -> bool:
+    def save_new_budget_item(self, category: str, amount: str, active: bool) -> bool:
         timestamp: str = datetime.strftime(datetime.now(), "%Y-%m-%d")
-        success = self.model.insert_new_goals(category, amount, active, timestamp)
+        success = self.model.insert_new_goals(
+            category, dollars_to_cents(amount), active, timestamp
+        )
+        self.forget_categories(category)
         if success:
             return True
         print("Failed to Save new Budget Item to DB- From DataHandler")
@@ -137,9 +300,13 @@ class DataHandler:
     ) -> list[tuple[int, int, int, str, str]] | None:
         """Cycle the progress table x months backward"""
         if number_of_months < 0:
-            return self.model.retrieve_month_bwd_progress(
+            progress = self.model.retrieve_month_bwd_progress(
                 number_of_months=abs(number_of_months)
             )
         elif number_of_months == 0:
-            return self.model.retrieve_budget_progress()
-        return self.model.retrieve_month_fwd_progress(number_of_months=number_of_months)
+            progress = self.model.retrieve_budget_progress()
+        else:
+            progress = self.model.retrieve_month_fwd_progress(
+                number_of_months=number_of_months
+            )
+        return None if progress is None else with_cents(progress, 0, 1, 2)
@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+READER_THREADS: int = 2
+
+
+class DatabaseWorker:
+    """Runs database calls off the Textual event loop.
+
+    Writes go to one dedicated thread, the only user of the writer connection,
+    so they stay serialized. Reads go to a small pool whose threads each hold
+    their own reader connection, so with WAL they run alongside the writer. The
+    event loop awaits either and keeps repainting and handling keys meanwhile.
+    """
+
+    def __init__(self, readers: int = READER_THREADS) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="textual-bank-db"
+        )
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=readers, thread_name_prefix="textual-bank-db-read"
+        )
+        self._last_write: asyncio.Future | None = None
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run `fn(*args, **kwargs)` on the writer thread and await its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        self._last_write = future
+        return await future
+
+    async def read(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run the read-only `fn(*args, **kwargs)` on a reader thread.
+
+        A read waits for the writes already submitted, so it sees them, but
+        never for writes submitted after it.
+        """
+        if self._last_write is not None and not self._last_write.done():
+            await asyncio.wait([self._last_write])
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._read_executor, partial(fn, *args, **kwargs)
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the database threads once queued calls have finished."""
+        self._read_executor.shutdown(wait=wait)
+        self._executor.shutdown(wait=wait)
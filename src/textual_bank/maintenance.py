@@ -0,0 +1,47 @@
+"""Maintenance commands for the_bank.db.
+
+Usage:
+    python maintenance.py rebuild-totals
+    python maintenance.py rebuild-suggestions
+"""
+
+import argparse
+
+from model.model import Model
+
+
+def rebuild_totals(model: Model) -> int:
+    """Recompute the monthly category rollup from the raw transactions."""
+    if model.rebuild_monthly_category_totals():
+        print("Rebuilt monthly_category_totals")
+        return 0
+    return 1
+
+
+def rebuild_suggestions(model: Model) -> int:
+    """Recount the learned category suggestions from the processed transactions."""
+    if model.rebuild_category_suggestions():
+        print("Rebuilt category_suggestions")
+        return 0
+    return 1
+
+
+COMMANDS = {
+    "rebuild-totals": rebuild_totals,
+    "rebuild-suggestions": rebuild_suggestions,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=COMMANDS)
+    args = parser.parse_args(argv)
+    model = Model()
+    try:
+        return COMMANDS[args.command](model)
+    finally:
+        model.close_database_connection()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
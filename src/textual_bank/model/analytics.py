@@ -0,0 +1,339 @@
+"""Spending statistics computed on a columnar, in-memory copy of MyAccounts.
+
+`TransactionSnapshot` keeps the columns the statistics need as NumPy arrays:
+the month, the amount in cents and integer codes for the category and the
+merchant. It is read in full once; after that a refresh only reads the rows
+added since the last seen id and the rows the transaction_changes log says
+were updated or deleted. The log is capped, so a snapshot that fell further
+behind than the log reaches reads every row again instead. Every statistic is
+then a handful of `bincount`s over those arrays.
+
+NumPy is only imported by this module, which the app loads the first time the
+statistics are requested.
+"""
+
+import threading
+from collections.abc import Collection, Sequence
+from dataclasses import MISSING, dataclass, field, fields
+from sqlite3 import Connection
+
+import numpy as np
+
+from model.schema import CATEGORY_NAME
+
+WINDOW_MONTHS: int = 12
+TOP_CATEGORIES: int = 25
+TOP_MERCHANTS: int = 10
+# Money moved between the user's own accounts: it leaves one account and
+# arrives in another, so it is neither income nor spending for the savings rate.
+TRANSFER_CATEGORIES: frozenset[str] = frozenset({"Money towards savings", "Transfers"})
+
+
+def month_index(posted_month):
+    """Number YYYYMM months, or an array of them, so consecutive months differ by 1.
+
+    >>> month_index(202501) - month_index(202412)
+    1
+    """
+    return (posted_month // 100) * 12 + posted_month % 100 - 1
+
+
+def month_label(index: int) -> str:
+    """Render a `month_index` as YYYY-MM.
+
+    >>> month_label(month_index(202403))
+    '2024-03'
+    """
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def encode(
+    values: Sequence[str | None], names: list[str], codes: dict[str | None, int]
+) -> np.ndarray:
+    """Replace every value by its position in `names`, adding unseen values.
+
+    >>> names, codes = [], {}
+    >>> encode(["Gas", "Food", "Gas"], names, codes).tolist(), names
+    ([0, 1, 0], ['Gas', 'Food'])
+    """
+    encoded = np.empty(len(values), dtype=np.int32)
+    for position, value in enumerate(values):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value or "")
+        encoded[position] = code
+    return encoded
+
+
+@dataclass
+class SpendingReport:
+    """Spending statistics for the last WINDOW_MONTHS months of data.
+
+    Money is in cents, and spending is positive.
+
+    Attributes:
+    latest_month (str | None): The newest month with transactions, YYYY-MM.
+    transactions (int): Transactions the statistics were computed from.
+    categories (list[tuple[str, int, int, int, int]]): Category, spend in the
+        latest month, spend in the month before, and the 3- and 12-month
+        averages, biggest first. The first row sums every category and the
+        last one every category after the TOP_CATEGORIES biggest.
+    savings (list[tuple[str, int, int, int, float | None]]): Month, income,
+        spend, amount saved and savings rate, newest first. Transfers between
+        the user's accounts are left out.
+    merchants (list[tuple[str, int, int]]): Merchant, spend and number of
+        purchases over the window, biggest first.
+    """
+
+    latest_month: str | None = None
+    transactions: int = 0
+    categories: list[tuple[str, int, int, int, int]] = field(default_factory=list)
+    savings: list[tuple[str, int, int, int, float | None]] = field(
+        default_factory=list
+    )
+    merchants: list[tuple[str, int, int]] = field(default_factory=list)
+
+
+@dataclass
+class TransactionSnapshot:
+    """Columnar copy of MyAccounts, kept current incrementally.
+
+    Attributes:
+    ids (np.ndarray): Transaction ids, ascending.
+    months (np.ndarray): `month_index` of each posted date.
+    amounts (np.ndarray): Amounts in cents.
+    categories (np.ndarray): Codes into `category_names`.
+    merchants (np.ndarray): Codes into `merchant_names`.
+    live (np.ndarray): False for transactions that have been deleted.
+    last_id (int): The newest transaction read.
+    last_change (int): The newest transaction_changes entry applied.
+    """
+
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    months: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    amounts: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    categories: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=np.int32)
+    )
+    merchants: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    live: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+    category_names: list[str] = field(default_factory=list)
+    merchant_names: list[str] = field(default_factory=list)
+    last_id: int = 0
+    last_change: int = 0
+    _category_codes: dict[str | None, int] = field(default_factory=dict, repr=False)
+    _merchant_codes: dict[str | None, int] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    _COLUMNS = (
+        f"a.id, COALESCE(a.PostedMonth, 0), a.Amount, {CATEGORY_NAME}, a.MerchantKey"
+    )
+    _FROM = "MyAccounts AS a LEFT JOIN categories AS c ON c.id = a.CategoryId"
+
+    def _columns(
+        self, rows: list[tuple]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Convert (id, PostedMonth, Amount, Category, MerchantKey) rows."""
+        ids, months, amounts, categories, merchants = zip(*rows)
+        return (
+            np.fromiter(ids, dtype=np.int64, count=len(rows)),
+            month_index(np.fromiter(months, dtype=np.int32, count=len(rows))),
+            np.fromiter((amount or 0 for amount in amounts), np.int64, len(rows)),
+            encode(categories, self.category_names, self._category_codes),
+            encode(merchants, self.merchant_names, self._merchant_codes),
+        )
+
+    def clear(self) -> None:
+        """Forget every row read, so the next refresh reads them all again."""
+        for column in fields(self):
+            if column.name != "_lock":
+                setattr(
+                    self,
+                    column.name,
+                    column.default_factory()
+                    if column.default is MISSING
+                    else column.default,
+                )
+
+    def refresh(self, con: Connection) -> int:
+        """Read what changed in MyAccounts since the last refresh.
+
+        The change log is read before the rows, so a change made while
+        refreshing is applied now or, at the latest, by the next refresh. If
+        the log was capped past the last change applied, the changes in between
+        are lost and every row is read again.
+
+        Returns:
+        int: The number of rows read.
+        """
+        if self.last_id:
+            changes = con.execute(
+                "SELECT seq, id FROM transaction_changes WHERE seq > ? ORDER BY seq",
+                (self.last_change,),
+            ).fetchall()
+            if changes and changes[0][0] > self.last_change + 1:
+                self.clear()
+                return self.refresh(con)
+        else:
+            # Reading every row covers every change made so far.
+            changes = con.execute(
+                "SELECT COALESCE(MAX(seq), 0), 0 FROM transaction_changes"
+            ).fetchall()
+        changed = np.array(
+            sorted({id for _, id in changes if 0 < id <= self.last_id}), dtype=np.int64
+        )
+        # Rows added and removed between two refreshes were never read.
+        changed = changed[np.isin(changed, self.ids, assume_unique=True)]
+        added = con.execute(
+            f"SELECT {self._COLUMNS} FROM {self._FROM} WHERE a.id > ? ORDER BY a.id",
+            (self.last_id,),
+        ).fetchall()
+        updated = []
+        if changed.size:
+            updated = con.execute(
+                f"""
+            SELECT {self._COLUMNS} FROM {self._FROM}
+            WHERE a.id IN (SELECT value FROM json_each(?))
+                """,
+                (str(changed.tolist()),),
+            ).fetchall()
+            # Deleted rows are not returned and stay dead.
+            self.live[np.searchsorted(self.ids, changed)] = False
+        if updated:
+            ids, months, amounts, categories, merchants = self._columns(updated)
+            positions = np.searchsorted(self.ids, ids)
+            self.months[positions] = months
+            self.amounts[positions] = amounts
+            self.categories[positions] = categories
+            self.merchants[positions] = merchants
+            self.live[positions] = True
+        if added:
+            ids, months, amounts, categories, merchants = self._columns(added)
+            self.ids = np.concatenate([self.ids, ids])
+            self.months = np.concatenate([self.months, months])
+            self.amounts = np.concatenate([self.amounts, amounts])
+            self.categories = np.concatenate([self.categories, categories])
+            self.merchants = np.concatenate([self.merchants, merchants])
+            self.live = np.concatenate([self.live, np.ones(len(ids), dtype=bool)])
+            self.last_id = int(ids[-1])
+        if changes:
+            self.last_change = max(self.last_change, changes[-1][0])
+        return len(added) + len(updated)
+
+    def report(self, con: Connection) -> SpendingReport:
+        """Refresh the snapshot and compute the statistics from it."""
+        with self._lock:
+            self.refresh(con)
+            return spending_report(self)
+
+
+def spending_report(
+    snapshot: TransactionSnapshot,
+    top_categories: int = TOP_CATEGORIES,
+    top_merchants: int = TOP_MERCHANTS,
+    transfer_categories: Collection[str] = TRANSFER_CATEGORIES,
+) -> SpendingReport:
+    """Compute spending statistics for the newest WINDOW_MONTHS months.
+
+    Every outgoing amount counts as spending and every incoming one as income,
+    whether or not the transaction has been processed yet. The savings rate
+    leaves out transactions in `transfer_categories`.
+    """
+    live = snapshot.live & (snapshot.months >= 0)
+    months = snapshot.months[live]
+    if not months.size:
+        return SpendingReport()
+    latest = int(months.max())
+    # 0 for the latest month, 1 for the month before and so on.
+    age = latest - months
+    recent = age < WINDOW_MONTHS
+    age = age[recent]
+    amounts = snapshot.amounts[live][recent]
+    categories = snapshot.categories[live][recent]
+    merchants = snapshot.merchants[live][recent]
+    spend = np.where(amounts < 0, -amounts, 0)
+    income = np.where(amounts > 0, amounts, 0)
+    # Averages only cover months there is data for.
+    covered = min(WINDOW_MONTHS, latest - int(months.min()) + 1)
+
+    by_category = np.bincount(
+        categories * WINDOW_MONTHS + age,
+        weights=spend,
+        minlength=len(snapshot.category_names) * WINDOW_MONTHS,
+    ).reshape(-1, WINDOW_MONTHS)
+    monthly = np.rint(
+        np.column_stack(
+            [
+                by_category[:, 0],
+                by_category[:, 1],
+                by_category[:, :3].sum(axis=1) / min(3, covered),
+                by_category.sum(axis=1) / covered,
+            ]
+        )
+    ).astype(np.int64)
+    # Uncategorized transactions keep their description as the category, so
+    # only the biggest categories are listed and the rest are summed.
+    order = np.argsort(-monthly[:, 3], kind="stable")
+    order = order[monthly[order, 3] > 0]
+    shown, rest = order[:top_categories], order[top_categories:]
+    category_rows = [("All categories", *monthly.sum(axis=0).tolist())]
+    category_rows += [
+        (snapshot.category_names[code], *monthly[code].tolist()) for code in shown
+    ]
+    if rest.size:
+        category_rows.append(
+            (f"{rest.size:,} other categories", *monthly[rest].sum(axis=0).tolist())
+        )
+
+    transfer_codes = [
+        snapshot._category_codes[name]
+        for name in transfer_categories
+        if name in snapshot._category_codes
+    ]
+    kept = ~np.isin(categories, transfer_codes)
+    income_by_month = np.bincount(
+        age[kept], weights=income[kept], minlength=WINDOW_MONTHS
+    )
+    spend_by_month = np.bincount(
+        age[kept], weights=spend[kept], minlength=WINDOW_MONTHS
+    )
+    savings_rows = []
+    for month_age in range(covered):
+        earned = round(income_by_month[month_age])
+        spent = round(spend_by_month[month_age])
+        saved = earned - spent
+        savings_rows.append(
+            (
+                month_label(latest - month_age),
+                earned,
+                spent,
+                saved,
+                saved / earned if earned else None,
+            )
+        )
+
+    spending = spend > 0
+    merchant_spend = np.bincount(
+        merchants, weights=spend, minlength=len(snapshot.merchant_names)
+    )
+    purchases = np.bincount(
+        merchants[spending], minlength=len(snapshot.merchant_names)
+    )
+    top = np.argsort(-merchant_spend, kind="stable")[:top_merchants]
+    merchant_rows = [
+        (
+            snapshot.merchant_names[code],
+            round(merchant_spend[code]),
+            int(purchases[code]),
+        )
+        for code in top
+        if merchant_spend[code]
+    ]
+    return SpendingReport(
+        latest_month=month_label(latest),
+        transactions=int(live.sum()),
+        categories=category_rows,
+        savings=savings_rows,
+        merchants=merchant_rows,
+    )
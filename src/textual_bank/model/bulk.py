@@ -0,0 +1,210 @@
+"""Bulk appends to MyAccounts from column buffers.
+
+`BulkLoader` is the write half of a csv import. Every batch is one prepared
+`INSERT OR IGNORE` run through `executemany` over the zipped columns, so
+nothing is inferred or converted per row, and the whole load is a single
+transaction.
+
+Full-text indexing is switched off for the duration of the load through the
+bulk_load guard table, and the new rows are indexed with one set-based
+statement when the load is done; that is several times faster than row by row
+and needs no schema change, so readers keep their prepared statements. For
+loads that are large compared to the table, the secondary indexes can be
+dropped too and rebuilt with one sort each when the load is done. Both happen
+inside the transaction, so no other connection ever sees them missing.
+"""
+
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from sqlite3 import Connection
+
+from model.schema import category_ids
+
+# MyAccounts as declared by the migrations, without the id.
+MYACCOUNTS_COLUMNS: tuple[str, ...] = (
+    "AccountNumber",
+    "AccountType",
+    "PostedDate",
+    "Amount",
+    "Description",
+    "CheckNumber",
+    "Balance",
+    "Labels",
+    "Note",
+    "Processed",
+    "Flagged",
+    "Fingerprint",
+    "MerchantKey",
+    "CategoryId",
+)
+
+# Does the work of transaction_search_insert, which the bulk_load row switches
+# off, for every row with an id above the one bound to it.
+INDEX_NEW_ROWS_FOR_SEARCH: str = """
+    INSERT INTO transaction_search (rowid, Description, Category, Labels, Note)
+    SELECT id, Description, Category, Labels, Note
+    FROM transaction_search_content WHERE id > ?
+"""
+
+# Loads of at least this many rows, and more rows than the table already
+# holds, rebuild the secondary indexes instead of updating them.
+DEFER_INDEXES_MIN_ROWS: int = 100_000
+
+
+def should_defer_indexes(con: Connection, rows: int) -> bool:
+    """Whether rebuilding the indexes after loading `rows` rows is cheaper."""
+    if rows < DEFER_INDEXES_MIN_ROWS:
+        return False
+    stored = con.execute("SELECT COALESCE(MAX(id), 0) FROM MyAccounts").fetchone()[0]
+    return rows > stored
+
+
+@dataclass
+class LoadStats:
+    """Where the time of a bulk load went.
+
+    Attributes:
+    rows (int): Rows offered to the loader.
+    inserted (int): Rows that were not already stored.
+    insert_seconds (float): Time spent in executemany.
+    index_seconds (float): Time spent on deferred triggers and indexes.
+    commit_seconds (float): Time spent committing.
+    """
+
+    rows: int = 0
+    inserted: int = 0
+    insert_seconds: float = 0.0
+    index_seconds: float = 0.0
+    commit_seconds: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return self.insert_seconds + self.index_seconds + self.commit_seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        """Rows written per second spent in the database."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class BulkLoader:
+    """Append batches of columns to MyAccounts in a single transaction.
+
+    Args:
+    con (Connection): The writer connection.
+    defer_indexes (bool): Drop the secondary indexes of MyAccounts while
+        loading and rebuild them when the loader exits.
+    stats (LoadStats | None): Where to add the timings, a new LoadStats if
+        not given.
+
+        >>> from model.model import Model
+        >>> model = Model(db_path=":memory:")
+        >>> with BulkLoader(model.con) as loader:
+        ...     loader.load(
+        ...         {
+        ...             "Description": ["NETFLIX.COM", "NETFLIX.COM"],
+        ...             "Fingerprint": ["a", "a"],
+        ...             "Category": ["Netflix", "Netflix"],
+        ...             "Processed": ["No", "No"],
+        ...         }
+        ...     )
+        1
+        >>> model.con.execute(
+        ...     "SELECT rowid FROM transaction_search WHERE transaction_search MATCH 'netflix'"
+        ... ).fetchall()
+        [(1,)]
+        >>> model.con.execute(
+        ...     "SELECT name FROM MyAccounts JOIN categories ON categories.id = CategoryId"
+        ... ).fetchall()
+        [('Netflix',)]
+
+    """
+
+    def __init__(
+        self,
+        con: Connection,
+        defer_indexes: bool = False,
+        stats: LoadStats | None = None,
+    ):
+        self.con = con
+        self.defer_indexes = defer_indexes
+        self.stats = stats if stats is not None else LoadStats()
+        self._indexes: list[str] = []
+        self._last_id: int = 0
+
+    def _schema(self, kind: str, names: Sequence[str] | None = None) -> list[tuple]:
+        rows = self.con.execute(
+            """
+            SELECT name, sql FROM sqlite_master
+            WHERE type = ? AND tbl_name = 'MyAccounts' AND sql IS NOT NULL
+            """,
+            (kind,),
+        ).fetchall()
+        return [row for row in rows if names is None or row[0] in names]
+
+    def __enter__(self) -> "BulkLoader":
+        if not self.con.in_transaction:
+            self.con.execute("BEGIN IMMEDIATE")
+        self._last_id = self.con.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM MyAccounts"
+        ).fetchone()[0]
+        self.con.execute("INSERT INTO bulk_load (active) VALUES (1)")
+        if self.defer_indexes:
+            start = time.perf_counter()
+            for name, sql in self._schema("index"):
+                # The UNIQUE index is what skips rows that are already stored.
+                if sql.upper().startswith("CREATE UNIQUE"):
+                    continue
+                self.con.execute(f"DROP INDEX {name}")
+                self._indexes.append(sql)
+            self.stats.index_seconds += time.perf_counter() - start
+        return self
+
+    def load(self, columns: dict[str, Sequence]) -> int:
+        """Append one batch of rows given as equally long columns.
+
+        Columns missing from `columns` are stored as NULL; rows whose
+        Fingerprint is already stored are skipped. A Category column of names
+        is stored as their CategoryId, adding the names that are new.
+
+        Returns:
+        int: The number of rows inserted.
+        """
+        start = time.perf_counter()
+        if "Category" in columns:
+            columns = dict(columns)
+            columns["CategoryId"] = category_ids(self.con, columns.pop("Category"))
+        names = [name for name in MYACCOUNTS_COLUMNS if name in columns]
+        unknown = set(columns) - set(names)
+        if unknown:
+            raise ValueError(f"MyAccounts has no column {', '.join(sorted(unknown))}")
+        cursor = self.con.executemany(
+            f"INSERT OR IGNORE INTO MyAccounts ({', '.join(names)}) "
+            f"VALUES ({', '.join('?' * len(names))})",
+            zip(*(columns[name] for name in names)),
+        )
+        inserted = max(cursor.rowcount, 0)
+        self.stats.insert_seconds += time.perf_counter() - start
+        self.stats.rows += len(columns[names[0]]) if names else 0
+        self.stats.inserted += inserted
+        return inserted
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None:
+            # Rolling back also removes the guard row and restores the indexes.
+            self.con.rollback()
+            return
+        try:
+            start = time.perf_counter()
+            self.con.execute(INDEX_NEW_ROWS_FOR_SEARCH, (self._last_id,))
+            self.con.execute("DELETE FROM bulk_load")
+            for sql in self._indexes:
+                self.con.execute(sql)
+            self.stats.index_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            self.con.commit()
+            self.stats.commit_seconds += time.perf_counter() - start
+        except Exception:
+            self.con.rollback()
+            raise
@@ -0,0 +1,118 @@
+"""Lazily opened, tuned sqlite connections: one writer and a reader per thread.
+
+The database runs in WAL mode, so readers see the last committed state without
+waiting on the writer, and the writer only appends to the log instead of
+rewriting a rollback journal on every commit.
+"""
+
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from sqlite3 import Connection
+
+from model.instrumentation import SLOW_QUERY_MS, InstrumentedConnection, QueryStats
+
+DEFAULT_DB_PATH: Path = Path(__file__).resolve().parent.parent / "the_bank.db"
+
+MMAP_SIZE: int = 256 * 1024 * 1024
+CACHE_SIZE_KIB: int = 64 * 1024
+BUSY_TIMEOUT_MS: int = 5_000
+
+
+@dataclass
+class ConnectionFactory:
+    """Opens connections to `db_path` on first use and closes them together.
+
+    Attributes:
+    db_path (str | Path): The path to the database.
+    mmap_size (int): Bytes of the database file to memory-map.
+    cache_size_kib (int): Page cache size of each connection, in KiB.
+    busy_timeout_ms (int): How long to wait for a lock before giving up.
+    slow_query_ms (float): Statements slower than this are logged.
+    slow_query_log (str | Path | None): Where they are logged. Defaults to a
+        `-slow-queries.log` file next to the database.
+    stats (QueryStats): Timings of every statement on every connection.
+
+        >>> connections = ConnectionFactory(":memory:")
+        >>> connections.writer.execute("PRAGMA busy_timeout").fetchone()
+        (5000,)
+        >>> connections.close()
+
+    """
+
+    db_path: str | Path = DEFAULT_DB_PATH
+    mmap_size: int = MMAP_SIZE
+    cache_size_kib: int = CACHE_SIZE_KIB
+    busy_timeout_ms: int = BUSY_TIMEOUT_MS
+    slow_query_ms: float = SLOW_QUERY_MS
+    slow_query_log: str | Path | None = None
+    stats: QueryStats = field(init=False, repr=False)
+    _writer: Connection | None = field(default=None, init=False, repr=False)
+    _readers: list[Connection] = field(default_factory=list, init=False, repr=False)
+    _local: threading.local = field(
+        default_factory=threading.local, init=False, repr=False
+    )
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        if self.slow_query_log is None and str(self.db_path) != ":memory:":
+            path = Path(self.db_path)
+            self.slow_query_log = path.with_name(f"{path.stem}-slow-queries.log")
+        self.stats = QueryStats(self.slow_query_ms, self.slow_query_log)
+
+    def _connect(self) -> Connection:
+        """Open a connection with the per-connection pragmas applied."""
+        # Connections may be closed from another thread by `close`, but each one
+        # is only ever used by the thread that owns it.
+        con = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=InstrumentedConnection,
+        )
+        con.stats = self.stats
+        con.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        con.execute("PRAGMA synchronous = NORMAL")
+        con.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        con.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        return con
+
+    @property
+    def writer(self) -> Connection:
+        """The single connection every write goes through."""
+        with self._lock:
+            if self._writer is None:
+                con = self._connect()
+                # The journal mode is stored in the database file, so setting it
+                # once on the writer covers every reader as well.
+                con.execute("PRAGMA journal_mode = WAL")
+                self._writer = con
+            return self._writer
+
+    def reader(self) -> Connection:
+        """Return the calling thread's read-only connection, opening it if needed."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            # Make sure the database exists and is in WAL mode before reading.
+            self.writer
+            con = self._connect()
+            con.execute("PRAGMA query_only = ON")
+            self._local.con = con
+            with self._lock:
+                self._readers.append(con)
+        return con
+
+    def close(self) -> None:
+        """Close the writer and every reader that has been opened."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for con in self._readers:
+                con.close()
+            self._readers.clear()
+            # Threads that read again after closing get a fresh connection.
+            self._local = threading.local()
@@ -0,0 +1,671 @@
+"""Reading bank csv exports into MyAccounts.
+
+This is the only module that needs pandas and numpy. The rest of the app only
+imports it once a file is uploaded, so startup never pays for them.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pandas as pd
+from constants_cat import DEFAULT_CATEGORY_RULES
+
+from model.bulk import BulkLoader, LoadStats, should_defer_indexes
+from model.rules import CategoryMatcher, Rule, compile_rules
+from model.schema import fingerprint_text, merchant_key
+from model.suggestions import CategorySuggester
+
+if TYPE_CHECKING:
+    from model.model import Model
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - resource is unavailable on Windows
+    resource = None
+
+DEFAULT_CHUNKSIZE: int = 50_000
+# Bytes read from the top of a csv file to estimate its number of rows.
+ESTIMATE_SAMPLE_BYTES: int = 1 << 20
+CSV_COLUMNS: list[str] = [
+    "AccountNumber",
+    "AccountType",
+    "Posted Date",
+    "Amount",
+    "Description",
+    "Check Number",
+    "Category",
+    "Balance",
+    "Labels",
+    "Note",
+]
+# The export columns an import reads; the bank's own Category is replaced.
+READ_COLUMNS: list[str] = [column for column in CSV_COLUMNS if column != "Category"]
+# Text columns are read as text instead of having their type inferred. The
+# account and check numbers keep the types they were always stored with.
+READ_DTYPES: dict[str, str] = {
+    "AccountType": "str",
+    "Amount": "str",
+    "Description": "str",
+    "Balance": "str",
+    "Labels": "str",
+    "Note": "str",
+}
+# Days before the latest stored transaction of an account an import reads
+# again, for transactions that post late.
+WATERMARK_OVERLAP_DAYS: int = 7
+
+
+def estimate_rows(filepath: str | Path) -> int:
+    """Estimate the data rows of a csv file from the line length of its start."""
+    size = Path(filepath).stat().st_size
+    with open(filepath, "rb") as file:
+        sample = file.read(ESTIMATE_SAMPLE_BYTES)
+    lines = sample.count(b"\n")
+    if not lines or len(sample) == size:
+        return max(lines - 1, 0)
+    return size * lines // len(sample) - 1
+
+
+def peak_rss_kb() -> int:
+    """Return the peak resident set size of this process in kilobytes.
+
+    This is the high-water mark since the process started, not since an import
+    began: it only shows an import's memory use if the import raised it.
+    """
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@dataclass
+class IngestReport:
+    """Summary of a single csv import.
+
+    Attributes:
+    filepath (str): The file that was imported.
+    rows_read (int): Rows parsed from the csv file.
+    rows_written (int): Rows appended to MyAccounts.
+    rows_invalid (int): Rows skipped because their Amount or Balance is
+        missing or is not an amount of money.
+    seconds (float): Wall time spent on the import.
+    peak_rss_kb (int): Peak resident set size of this process since it
+        started, taken after the import. Files parsed by worker processes do
+        not count towards it.
+    load (LoadStats): Time spent writing to the database.
+    error (str | None): Why the file could not be imported, if it failed.
+    """
+
+    filepath: str
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_invalid: int = 0
+    seconds: float = 0.0
+    peak_rss_kb: int = 0
+    load: LoadStats = field(default_factory=LoadStats)
+    error: str | None = None
+
+    @property
+    def rows_per_second(self) -> float:
+        """Rows parsed per second of wall time."""
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f"Failed to import {Path(self.filepath).name}: {self.error}"
+        skipped = (
+            f" ({self.rows_invalid:,} without a valid amount or balance skipped)"
+            if self.rows_invalid
+            else ""
+        )
+        return (
+            f"Imported {self.rows_written:,} of {self.rows_read:,} rows from "
+            f"{Path(self.filepath).name}{skipped} in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s, peak RSS {self.peak_rss_kb / 1024:,.1f} MiB); "
+            f"writing took {self.load.seconds:.2f}s "
+            f"({self.load.rows_per_second:,.0f} rows/s: insert {self.load.insert_seconds:.2f}s, "
+            f"index {self.load.index_seconds:.2f}s, commit {self.load.commit_seconds:.2f}s)"
+        )
+
+
+MONEY_TRANSLATION = str.maketrans({"$": None, ",": None, ")": None, " ": None, "(": "-"})
+
+
+def parse_money(values: pd.Series) -> pd.Series:
+    """Convert bank money strings such as "$1,234.56" or "($12.00)" to Int64 cents.
+
+    A single `str.translate` pass strips the currency formatting, so no
+    intermediate Series is built per character that has to be removed.
+    Missing values and text that is not an amount become <NA>.
+
+    >>> parse_money(pd.Series(["$1,234.56", "($12.00)", "$0.10"])).tolist()
+    [123456, -1200, 10]
+    >>> parse_money(pd.Series(["$1.00", None, "n/a"])).isna().tolist()
+    [False, True, True]
+    """
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(
+            values.astype(str).str.translate(MONEY_TRANSLATION), errors="coerce"
+        )
+    return (values * 100).round().astype("Int64")
+
+
+def categorize_descriptions(
+    descriptions: pd.Series, matcher: CategoryMatcher
+) -> pd.Series:
+    """Categorize each description, falling back to the description itself.
+
+    The matcher remembers the descriptions it has seen, so repeats cost a
+    dictionary lookup.
+    """
+    categories = []
+    for description in descriptions.tolist():
+        category = matcher.match(str(description))
+        categories.append(description if category is None else category)
+    return pd.Series(categories, index=descriptions.index, dtype=object)
+
+
+def tweak_incoming_dataframe(
+    df: pd.DataFrame, matcher: CategoryMatcher | None = None
+) -> pd.DataFrame:
+    """Clean up incoming DataFrame.
+
+    Categories come from `matcher`, which evaluates every categorization rule in
+    a single pass over the unique descriptions. Descriptions no rule matches keep
+    the description as their category.
+
+    Args:
+    df (pd.DataFrame): Incoming DataFrame
+    matcher (CategoryMatcher | None): Compiled rules, defaults to the built-in rules.
+
+    >>> df = pd.DataFrame(
+    ...     {
+    ...         "Posted Date": ["2021-01-01", "2021-01-02", "2021-01-03"],
+    ...         "Description": ["desc1", "desc2", "desc3"],
+    ...         "Amount": ["$1.00", "$2.00", "$3.00"],
+    ...         "Balance": ["$1.00", "$2.00", "$3.00"],
+    ...         "Category": ["cat1", "cat2", "cat3"],
+    ...         "Labels": ["", "", ""],
+    ...         "Note": ["", "", ""],
+    ...     }
+    ... )
+
+    >>> columns = ["PostedDate", "Amount", "Balance", "Category", "Processed"]
+    >>> tweak_incoming_dataframe(df)[columns]
+       PostedDate  Amount  Balance Category Processed
+    0  2021-01-01     100      100    desc1        No
+    1  2021-01-02     200      200    desc2        No
+    2  2021-01-03     300      300    desc3        No
+
+    Returns:
+    df (pd.DataFrame): Cleaned up DataFrame
+
+    """
+    if matcher is None:
+        matcher = compile_rules(tuple(DEFAULT_CATEGORY_RULES))
+    return df.assign(
+        Processed="No",
+        Category=lambda x: categorize_descriptions(x.Description, matcher),
+        Amount=lambda x: parse_money(x.Amount),
+        Balance=lambda x: parse_money(x.Balance),
+        Flagged="",
+    ).rename(
+        columns={
+            "Posted Date": "PostedDate",
+            "Check Number": "CheckNumber",
+        }
+    )
+
+
+def text_values(values: pd.Series) -> list[str]:
+    """`fingerprint_text` of every value, rendering each distinct value once."""
+    rendered: dict = {}
+    texts = []
+    for value in values.tolist():
+        text = rendered.get(value)
+        if text is None:
+            text = rendered[value] = fingerprint_text(value)
+        texts.append(text)
+    return texts
+
+
+def add_fingerprints(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the Fingerprint column that identifies each transaction.
+
+    Builds the same keys as `transaction_fingerprint` a column at a time:
+    dates are formatted by pandas and descriptions are cleaned once per
+    distinct value, so only the hashing is done row by row.
+
+    Args:
+    df (pd.DataFrame): A DataFrame returned by `tweak_incoming_dataframe`.
+
+    Returns:
+    df (pd.DataFrame): The same rows with a Fingerprint column.
+
+    >>> df = pd.DataFrame(
+    ...     {
+    ...         "AccountNumber": [1000],
+    ...         "PostedDate": pd.to_datetime(["2024-10-01"]),
+    ...         "Amount": [-1250],
+    ...         "Description": ["NETFLIX "],
+    ...         "Balance": [4250],
+    ...     }
+    ... )
+    >>> from model.schema import transaction_fingerprint
+    >>> add_fingerprints(df).Fingerprint[0] == transaction_fingerprint(
+    ...     "1000", "2024-10-01", -1250, "NETFLIX", 4250
+    ... )
+    True
+    """
+    if pd.api.types.is_datetime64_any_dtype(df.PostedDate):
+        dates = df.PostedDate.dt.strftime("%Y-%m-%d").fillna("").tolist()
+    else:
+        dates = [text[:10] for text in text_values(df.PostedDate)]
+    return df.assign(
+        Fingerprint=[
+            hashlib.sha1(
+                f"{account}\x1f{date}\x1f{amount}\x1f{description}\x1f{balance}".encode()
+            ).hexdigest()
+            for account, date, amount, description, balance in zip(
+                text_values(df.AccountNumber),
+                dates,
+                df.Amount.astype("int64").tolist(),
+                text_values(df.Description),
+                df.Balance.astype("int64").tolist(),
+            )
+        ]
+    )
+
+
+def add_merchant_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the MerchantKey column similar transactions are matched on.
+
+    Exports repeat a small set of descriptions, and `merchant_key` caches
+    the ones it has normalized.
+    """
+    return df.assign(MerchantKey=list(map(merchant_key, df.Description.tolist())))
+
+
+def apply_suggestions(
+    df: pd.DataFrame, suggester: CategorySuggester | None
+) -> pd.DataFrame:
+    """Fill in the category chosen before for the same merchant.
+
+    A category chosen for this very merchant key is preferred over the rules.
+    The first word of the key is looser, so it only categorizes transactions no
+    rule matched. Everything else keeps the category `tweak_incoming_dataframe`
+    gave it.
+    """
+    if suggester is None or not suggester.counts:
+        return df
+    keys = df.MerchantKey.tolist()
+    # No rule matched a row whose category is still its description.
+    unmatched = (df.Category == df.Description).tolist()
+    suggested = {
+        (key, first_word): suggester.suggest(key, first_word)
+        for key, first_word in set(zip(keys, unmatched))
+    }
+    return df.assign(
+        Category=[
+            suggested[key, first_word] or category
+            for key, first_word, category in zip(keys, unmatched, df.Category.tolist())
+        ]
+    )
+
+
+def column_buffers(df: pd.DataFrame) -> dict[str, list]:
+    """Convert each column to a list of the values sqlite3 binds directly.
+
+    Timestamps become the text sqlite3 would store for a datetime and missing
+    values become None.
+
+    >>> column_buffers(
+    ...     pd.DataFrame({"PostedDate": pd.to_datetime(["2024-10-01"]), "Note": [float("nan")]})
+    ... )
+    {'PostedDate': ['2024-10-01 00:00:00'], 'Note': [None]}
+    """
+    columns = {}
+    for name, values in df.items():
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime("%Y-%m-%d %H:%M:%S")
+        columns[str(name)] = values.astype(object).where(values.notna(), None).tolist()
+    return columns
+
+
+def upload_csv(
+    model: "Model",
+    filepath: str | Path,
+    chunksize: int | None = None,
+    defer_indexes: bool | None = None,
+    overlap_days: int = WATERMARK_OVERLAP_DAYS,
+) -> IngestReport:
+    """Stream a csv file into the database `chunksize` rows at a time.
+
+    Only the rows at or after the watermark of their account are cleaned and
+    stored (see `new_rows`), so importing an export that overlaps what is
+    already stored costs little more than reading it. Back-filling a
+    statement older than the watermark needs a larger `overlap_days`.
+
+    Every chunk is cleaned, categorized and appended in its own transaction,
+    so peak memory depends on the chunk size rather than the file size. When
+    the indexes are deferred the whole file is one transaction instead, and
+    the secondary indexes are rebuilt once at the end.
+
+    Args:
+    model (Model): The model whose database the rows are appended to.
+    filepath (str | Path): The csv file exported from the bank.
+    chunksize (int | None): The number of csv rows held in memory at once,
+        DEFAULT_CHUNKSIZE if not given.
+    defer_indexes (bool | None): Rebuild the indexes after the load instead of
+        updating them row by row. By default only for large files loaded into
+        an empty table.
+    overlap_days (int): Days before the latest stored transaction of each
+        account to read again.
+
+    Returns:
+    IngestReport: Row counts, throughput and peak RSS for the import.
+    """
+    report = IngestReport(filepath=str(filepath))
+    start = time.perf_counter()
+    matcher = model.category_matcher()
+    suggester = model.category_suggester()
+    watermarks = model.account_watermarks(overlap_days)
+    if defer_indexes is None:
+        # How many rows are past the watermarks is only known after reading
+        # the file, so only loads into an empty table rebuild the indexes.
+        defer_indexes = not watermarks and should_defer_indexes(
+            model.con, estimate_rows(filepath)
+        )
+    with read_csv_chunks(filepath, chunksize) as reader:
+        if defer_indexes:
+            with BulkLoader(model.con, True, report.load) as loader:
+                for chunk in reader:
+                    report.rows_read += len(chunk)
+                    report.rows_written += append_chunk(
+                        model, chunk, matcher, suggester, watermarks, loader, report
+                    )
+        else:
+            for chunk in reader:
+                report.rows_read += len(chunk)
+                report.rows_written += append_chunk(
+                    model, chunk, matcher, suggester, watermarks, report=report
+                )
+    report.seconds = time.perf_counter() - start
+    report.peak_rss_kb = peak_rss_kb()
+    return report
+
+
+def append_chunk(
+    model: "Model",
+    chunk: pd.DataFrame,
+    matcher: CategoryMatcher | None = None,
+    suggester: CategorySuggester | None = None,
+    watermarks: dict[str, str] | None = None,
+    loader: BulkLoader | None = None,
+    report: IngestReport | None = None,
+) -> int:
+    """Clean, categorize and append one chunk of a csv file.
+
+    Transactions that are already stored are skipped by the UNIQUE index on
+    MyAccounts.Fingerprint, so existing rows never have to be read back.
+
+    Args:
+    watermarks (dict[str, str] | None): See `new_rows`.
+    loader (BulkLoader | None): The open load to add the chunk to; the chunk
+        is written in a transaction of its own if not given.
+    report (IngestReport | None): Where the invalid rows are counted and that
+        transaction adds its timings.
+
+    Returns:
+    int: The number of rows appended to MyAccounts.
+    """
+    columns, invalid = prepare_chunk(chunk, matcher, suggester, watermarks)
+    if report is not None:
+        report.rows_invalid += invalid
+    if columns is None:
+        return 0
+    if loader is not None:
+        return loader.load(columns)
+    stats = None if report is None else report.load
+    with BulkLoader(model.con, stats=stats) as loader:
+        return loader.load(columns)
+
+
+def new_rows(chunk: pd.DataFrame, watermarks: dict[str, str] | None) -> pd.Series:
+    """Select the dated rows posted on or after the watermark of their account.
+
+    Accounts without a watermark have nothing stored yet, so all their rows
+    are new.
+
+    Args:
+    chunk (pd.DataFrame): Rows read by `read_csv_chunks`.
+    watermarks (dict[str, str] | None): YYYY-MM-DD dates by account number,
+        from `Model.account_watermarks`.
+
+    >>> dates = pd.to_datetime(["2024-01-31", "2024-02-01", "2020-01-31"])
+    >>> chunk = pd.DataFrame({"AccountNumber": [1000, 1000, 2000], "Posted Date": dates})
+    >>> new_rows(chunk, {"1000": "2024-02-01"}).tolist()
+    [False, True, True]
+    """
+    dates = chunk["Posted Date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
+    dated = dates.notna()
+    if not watermarks:
+        return dated
+    codes, accounts = pd.factorize(chunk.AccountNumber)
+    # The last entry is for rows without an account number (code -1).
+    since = pd.to_datetime(
+        [watermarks.get(fingerprint_text(account)) for account in accounts] + [None]
+    )
+    old = dates.to_numpy() < since.to_numpy()[codes]
+    return dated & ~old
+
+
+def prepare_chunk(
+    chunk: pd.DataFrame,
+    matcher: CategoryMatcher | None = None,
+    suggester: CategorySuggester | None = None,
+    watermarks: dict[str, str] | None = None,
+) -> tuple[dict[str, list] | None, int]:
+    """Clean and categorize the new rows of one chunk into column buffers.
+
+    Rows older than the watermarks are dropped before anything else is done
+    with the chunk. Rows without a valid Amount and Balance are dropped once
+    those are parsed, rather than stored, and fingerprinted, as zero.
+
+    Returns:
+    tuple[dict[str, list] | None, int]: The MyAccounts columns of the rows to
+        store, or None if the chunk has none, and the number of rows dropped
+        as invalid.
+    """
+    df_new: pd.DataFrame = chunk.loc[
+        new_rows(chunk, watermarks), READ_COLUMNS
+    ].rename(columns={"Posted Date": "PostedDate"})
+    if df_new.empty:
+        return None, 0
+    df_clean = tweak_incoming_dataframe(df_new, matcher)
+    valid = df_clean.Amount.notna() & df_clean.Balance.notna()
+    invalid = len(df_clean) - int(valid.sum())
+    if invalid == len(df_clean):
+        return None, invalid
+    df_clean = df_clean[valid].astype({"Amount": "int64", "Balance": "int64"})
+    df_final: pd.DataFrame = apply_suggestions(
+        add_merchant_keys(add_fingerprints(df_clean)), suggester
+    )
+    # A description kept as the category means no category: it is stored
+    # without a CategoryId rather than as a category of its own.
+    df_final["Category"] = df_final.Category.where(
+        df_final.Category != df_final.Description
+    )
+    return column_buffers(df_final), invalid
+
+
+def read_csv_chunks(filepath: str | Path, chunksize: int | None = None):
+    """Open a bank csv export for reading `chunksize` rows at a time.
+
+    Only READ_COLUMNS are materialized, with READ_DTYPES.
+    """
+    return pd.read_csv(
+        filepath,
+        usecols=READ_COLUMNS,
+        dtype=READ_DTYPES,
+        parse_dates=["Posted Date"],
+        chunksize=chunksize or DEFAULT_CHUNKSIZE,
+    )
+
+
+@dataclass
+class PreparedFile:
+    """A csv file parsed, cleaned and categorized, ready to be written.
+
+    Attributes:
+    filepath (str): The file that was parsed.
+    rows_read (int): Rows parsed from the csv file.
+    rows_invalid (int): Rows dropped for a missing or invalid Amount or Balance.
+    chunks (list[dict[str, list]]): The column buffers of every chunk with
+        rows to store.
+    seconds (float): Time spent preparing the file.
+    """
+
+    filepath: str
+    rows_read: int = 0
+    rows_invalid: int = 0
+    chunks: list[dict[str, list]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        """Rows to store."""
+        return sum(len(columns["Fingerprint"]) for columns in self.chunks)
+
+
+def prepare_csv(
+    filepath: str,
+    rules: tuple[Rule, ...],
+    suggester: CategorySuggester | None = None,
+    chunksize: int | None = None,
+    watermarks: dict[str, str] | None = None,
+) -> PreparedFile:
+    """Parse, clean and categorize a whole csv file without touching the database.
+
+    This is the part of an import that runs in the worker processes of
+    `upload_csvs`, so it takes the rules rather than a compiled matcher.
+    """
+    start = time.perf_counter()
+    prepared = PreparedFile(filepath=filepath)
+    matcher = compile_rules(rules)
+    with read_csv_chunks(filepath, chunksize) as reader:
+        for chunk in reader:
+            prepared.rows_read += len(chunk)
+            columns, invalid = prepare_chunk(chunk, matcher, suggester, watermarks)
+            prepared.rows_invalid += invalid
+            if columns is not None:
+                prepared.chunks.append(columns)
+    prepared.seconds = time.perf_counter() - start
+    return prepared
+
+
+def write_prepared(
+    model: "Model",
+    prepared: PreparedFile,
+    report: IngestReport,
+    defer_indexes: bool | None = None,
+) -> None:
+    """Append a prepared file to MyAccounts in a single transaction.
+
+    Either every new row of the file is stored or, if anything fails, none.
+    """
+    if defer_indexes is None:
+        defer_indexes = should_defer_indexes(model.con, prepared.rows)
+    report.rows_read = prepared.rows_read
+    report.rows_invalid = prepared.rows_invalid
+    with BulkLoader(model.con, defer_indexes, report.load) as loader:
+        for columns in prepared.chunks:
+            report.rows_written += loader.load(columns)
+
+
+def default_workers(files: int) -> int:
+    """Parse every file at once, but never more of them than there are cores."""
+    return max(1, min(files, os.cpu_count() or 1))
+
+
+def upload_csvs(
+    model: "Model",
+    filepaths: Iterable[str | Path],
+    chunksize: int | None = None,
+    workers: int | None = None,
+    progress: Callable[[IngestReport], None] | None = None,
+    overlap_days: int = WATERMARK_OVERLAP_DAYS,
+) -> list[IngestReport]:
+    """Import several csv files, parsing them in parallel.
+
+    Worker processes parse, clean and categorize one file each, while this
+    process stays the only writer: it stores every file in a transaction of
+    its own as soon as that file is ready, in whatever order they finish. A
+    file that fails to parse or write is reported with its error and does not
+    stop the others.
+
+    Args:
+    model (Model): The model whose database the rows are appended to.
+    filepaths (Iterable[str | Path]): The csv files exported from the bank.
+    chunksize (int | None): The number of csv rows parsed at once.
+    workers (int | None): Processes parsing files, `default_workers` if not
+        given. With one worker the files are parsed in this process.
+    progress (Callable[[IngestReport], None] | None): Called with the report
+        of each file once it has been imported or has failed.
+    overlap_days (int): Days before the latest stored transaction of each
+        account to read again.
+
+    Returns:
+    list[IngestReport]: One report per file, in the order given.
+    """
+    reports = [IngestReport(filepath=str(filepath)) for filepath in filepaths]
+    rules = tuple(model.retrieve_category_rules())
+    suggester = model.category_suggester()
+    # Files of one batch do not move each other's watermarks; rows they
+    # share are skipped by their fingerprints.
+    watermarks = model.account_watermarks(overlap_days)
+    workers = workers or default_workers(len(reports))
+    arguments = (rules, suggester, chunksize, watermarks)
+
+    def prepared_files() -> Iterator[tuple[int, PreparedFile | Exception]]:
+        if workers == 1:
+            for index, report in enumerate(reports):
+                try:
+                    yield index, prepare_csv(report.filepath, *arguments)
+                except Exception as error:
+                    yield index, error
+            return
+        # The app runs threads, which must not be forked.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(prepare_csv, report.filepath, *arguments): index
+                for index, report in enumerate(reports)
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as error:
+                    yield futures[future], error
+
+    for index, prepared in prepared_files():
+        report = reports[index]
+        try:
+            if isinstance(prepared, Exception):
+                raise prepared
+            write_prepared(model, prepared, report)
+            report.seconds = prepared.seconds + report.load.seconds
+        except Exception as error:
+            report.error = str(error) or type(error).__name__
+        report.peak_rss_kb = peak_rss_kb()
+        if progress is not None:
+            progress(report)
+    return reports
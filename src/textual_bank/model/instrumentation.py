@@ -0,0 +1,289 @@
+"""Per-statement timing for every query and commit Model makes.
+
+`InstrumentedConnection` is passed to `sqlite3.connect` as the connection
+factory. Every statement, whether run through a cursor, `Connection.execute`
+or pandas, is timed and aggregated by its normalized SQL in a shared
+`QueryStats`: call count, total and worst latency, a latency histogram, rows
+returned or changed, errors and lock waits. Statements slower than the
+threshold are also written to a slow-query log.
+
+sqlite does not tell Python about busy-handler retries that eventually succeed,
+so those only show up as latency. A lock wait is counted when a statement gives
+up with "database is locked" after the busy timeout.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Upper bounds of the latency histogram buckets, in milliseconds. The last
+# bucket counts everything slower.
+HISTOGRAM_BOUNDS_MS: tuple[float, ...] = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+SLOW_QUERY_MS: float = 100.0
+
+WHITESPACE = re.compile(r"\s+")
+slow_query_logger = logging.getLogger("textual_bank.slow_queries")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so the same statement always has the same key.
+
+    >>> normalize_sql('''
+    ...     SELECT id
+    ...     FROM MyAccounts  WHERE id = ?
+    ... ''')
+    'SELECT id FROM MyAccounts WHERE id = ?'
+    """
+    return WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class StatementStats:
+    """Aggregated timings of one normalized statement.
+
+    Attributes:
+    sql (str): The normalized statement.
+    calls (int): How often it was executed.
+    seconds (float): Total time spent executing it and fetching its rows.
+    max_seconds (float): The slowest single execution.
+    rows (int): Rows fetched for queries, rows changed for writes.
+    errors (int): Executions that raised.
+    lock_waits (int): Executions that gave up waiting for a lock.
+    histogram (list[int]): Executions per HISTOGRAM_BOUNDS_MS bucket.
+    """
+
+    sql: str
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    errors: int = 0
+    lock_waits: int = 0
+    histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    )
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class QueryStats:
+    """Thread-safe registry of StatementStats, shared by all connections.
+
+    Args:
+    slow_query_ms (float): Executions slower than this are logged.
+    slow_query_log (str | Path | None): File the slow-query log is written to.
+    """
+
+    def __init__(
+        self,
+        slow_query_ms: float = SLOW_QUERY_MS,
+        slow_query_log: str | Path | None = None,
+    ) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.statements: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        if slow_query_log is not None:
+            self._log_to(Path(slow_query_log))
+
+    @staticmethod
+    def _log_to(path: Path) -> None:
+        """Attach a file handler for `path`, once per process."""
+        for handler in slow_query_logger.handlers:
+            if getattr(handler, "baseFilename", None) == str(path.resolve()):
+                return
+        handler = logging.FileHandler(path, delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_query_logger.addHandler(handler)
+        slow_query_logger.setLevel(logging.INFO)
+        slow_query_logger.propagate = False
+
+    def record(
+        self,
+        sql: str,
+        seconds: float,
+        rows: int = 0,
+        calls: int = 1,
+        error: BaseException | None = None,
+    ) -> None:
+        """Add one execution, or the fetch that finishes one, to `sql`'s stats."""
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(key)
+            stats.calls += calls
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += max(rows, 0)
+            if calls:
+                stats.histogram[bucket(seconds)] += 1
+            if error is not None:
+                stats.errors += 1
+                if "locked" in str(error):
+                    stats.lock_waits += 1
+
+    def log_if_slow(self, sql: str, seconds: float, rows: int, params: Any) -> bool:
+        """Write `sql` to the slow-query log if it took longer than the threshold."""
+        if seconds * 1000 < self.slow_query_ms:
+            return False
+        slow_query_logger.info(
+            "%.1f ms rows=%d %s params=%.200r",
+            seconds * 1000,
+            rows,
+            normalize_sql(sql),
+            params,
+        )
+        return True
+
+    def snapshot(self) -> list[StatementStats]:
+        """Copies of every statement's stats, slowest in total first."""
+        with self._lock:
+            copies = [
+                StatementStats(**{**vars(stats), "histogram": list(stats.histogram)})
+                for stats in self.statements.values()
+            ]
+        return sorted(copies, key=lambda stats: -stats.seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.statements.clear()
+
+
+def bucket(seconds: float) -> int:
+    """Index of the histogram bucket `seconds` falls in.
+
+    >>> bucket(0.00005), bucket(0.003), bucket(5)
+    (0, 3, 9)
+    """
+    milliseconds = seconds * 1000
+    for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+        if milliseconds <= bound:
+            return index
+    return len(HISTOGRAM_BOUNDS_MS)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports its executions and fetches to the connection's stats."""
+
+    _sql: str = ""
+    _params: Any = None
+    _seconds: float = 0.0
+    _logged: bool = False
+
+    def _stats(self) -> QueryStats:
+        return self.connection.stats
+
+    def _timed(self, method, sql: str, params: Any, calls: int):
+        self._sql, self._params, self._logged = sql, params, False
+        start = time.perf_counter()
+        try:
+            result = method(sql, params)
+        except sqlite3.Error as e:
+            self._stats().record(sql, time.perf_counter() - start, error=e)
+            raise
+        self._seconds = time.perf_counter() - start
+        # rowcount is the number of changed rows for writes and -1 for queries,
+        # whose rows are counted as they are fetched.
+        self._stats().record(sql, self._seconds, self.rowcount, calls=calls)
+        # A batch is logged without its parameters, which can be a whole import.
+        if method.__name__ == "executemany":
+            params = "executemany"
+        self._params = params
+        self._logged = self._stats().log_if_slow(
+            sql, self._seconds, self.rowcount, params
+        )
+        return result
+
+    def execute(self, sql: str, parameters: Any = ()):
+        return self._timed(super().execute, sql, parameters, calls=1)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters, calls=1)
+
+    def executescript(self, sql_script: str):
+        start = time.perf_counter()
+        result = super().executescript(sql_script)
+        self._stats().record(sql_script, time.perf_counter() - start)
+        return result
+
+    def _fetched(self, start: float, rows: int) -> None:
+        seconds = time.perf_counter() - start
+        self._seconds += seconds
+        self._stats().record(self._sql, seconds, rows, calls=0)
+        if not self._logged:
+            self._logged = self._stats().log_if_slow(
+                self._sql, self._seconds, rows, self._params
+            )
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size: int | None = None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose statements, commits and rollbacks are all timed.
+
+    `stats` is assigned by whoever opens the connection; until then a private
+    QueryStats is used.
+
+        >>> con = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+        >>> con.execute("SELECT 1 UNION SELECT 2").fetchall()
+        [(1,), (2,)]
+        >>> [(s.sql, s.calls, s.rows) for s in con.stats.snapshot()][0]
+        ('SELECT 1 UNION SELECT 2', 1, 2)
+
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = QueryStats()
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str):
+        return self.cursor().executescript(sql_script)
+
+    def _timed(self, name: str, method) -> None:
+        start = time.perf_counter()
+        try:
+            method()
+        except sqlite3.Error as e:
+            self.stats.record(name, time.perf_counter() - start, error=e)
+            raise
+        seconds = time.perf_counter() - start
+        self.stats.record(name, seconds)
+        self.stats.log_if_slow(name, seconds, 0, ())
+
+    def commit(self) -> None:
+        self._timed("COMMIT", super().commit)
+
+    def rollback(self) -> None:
+        self._timed("ROLLBACK", super().rollback)
@@ -1,294 +1,535 @@
-import sqlite3
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date
 from pathlib import Path
-from sqlite3 import Connection, Cursor, OperationalError
-from typing import Any
+from sqlite3 import Connection, Cursor, DatabaseError, OperationalError
+from typing import TYPE_CHECKING, Any
+
+from model.connection import DEFAULT_DB_PATH, ConnectionFactory
+from model.rules import CategoryMatcher, Rule, compile_rules
+from model.schema import (
+    CATEGORY_NAME,
+    REBUILD_CATEGORY_SUGGESTIONS,
+    REBUILD_MONTHLY_CATEGORY_TOTALS,
+    category_ids,
+    merchant_key,
+    migrate,
+)
+from model.search import fts_query
+from model.suggestions import CategorySuggester, suggestion_tokens
+
+if TYPE_CHECKING:
+    from model.analytics import SpendingReport, TransactionSnapshot
+    from model.ingest import IngestReport
+
+# Full-text matches scored for relevance per search, newest first.
+SEARCH_CANDIDATES: int = 2_000
+# The category name of a MyAccounts row, looked up by its primary key.
+CATEGORY_LOOKUP: str = (
+    "COALESCE((SELECT c.name FROM categories AS c "
+    "WHERE c.id = MyAccounts.CategoryId), Description)"
+)
+
+
+def month_key(months_from_now: int = 0, today: date | None = None) -> int:
+    """Return the YYYYMM bucket `months_from_now` months away from today.
+
+    >>> month_key(-1, today=date(2024, 1, 31))
+    202312
+    >>> month_key(2, today=date(2024, 11, 30))
+    202501
+    """
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 + months_from_now
+    return (index // 12) * 100 + index % 12 + 1
 
-import pandas as pd
-from pandas.errors import DatabaseError
 
+@dataclass
+class Model:
+    """Data model for the application.
 
-def tweak_incoming_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    """Clean up incoming DataFrame.
+    Writes go through the single writer connection, `con`, which the controller
+    only uses from its DatabaseWorker writer thread. Reads use the calling
+    thread's own reader connection, so they never queue behind a write.
 
-    Args:
-    df (pd.DataFrame): Incoming DataFrame
+    Attributes:
+    db_path (str | Path): The path to the database. Defaults to the_bank.db in
+        the package directory, wherever the app is started from.
+    connections (ConnectionFactory): Opens the connections on first use.
 
-    >>> df = pd.DataFrame(
-    ...     {
-    ...         "Posted Date": ["2021-01-01", "2021-01-02", "2021-01-03"],
-    ...         "Description": ["desc1", "desc2", "desc3"],
-    ...         "Amount": ["$1.00", "$2.00", "$3.00"],
-    ...         "Balance": ["$1.00", "$2.00", "$3.00"],
-    ...         "Category": ["cat1", "cat2", "cat3"],
-    ...         "Labels": ["", "", ""],
-    ...         "Note": ["", "", ""],
-    ...     }
-    ... )
+        >>> model = Model()
 
-        >>> tweak_incoming_dataframe(df)
-        AccountNumber AccountType PostedDate  Amount Description Check Number  \
-        0            1    Checking 2021-01-01     1.0       desc1          NaN
-        1            1    Checking 2021-01-02     2.0       desc2          NaN
-        2            1    Checking 2021-01-03     3.0       desc3          NaN
+    """
 
-        Balance Category Labels Note Processed Flagged
-        0      1.0     cat1            No
-        1      2.0     cat2            No
-        2      3.0     cat3            No
+    db_path: str | Path = DEFAULT_DB_PATH
+    connections: ConnectionFactory = field(init=False, repr=False)
+    _cursor: Cursor | None = field(default=None, init=False, repr=False)
+    _snapshot: "TransactionSnapshot | None" = field(
+        default=None, init=False, repr=False
+    )
 
+    def __post_init__(self) -> None:
+        """Create or upgrade every table, index and trigger once, at startup."""
+        self.connections = ConnectionFactory(self.db_path)
+        migrate(self.con)
+
+    @property
+    def con(self) -> Connection:
+        """The writer connection."""
+        return self.connections.writer
+
+    @property
+    def cursor(self) -> Cursor:
+        """A cursor on the writer connection."""
+        if self._cursor is None:
+            self._cursor = self.con.cursor()
+        return self._cursor
+
+    def upload_dataframe(
+        self, filepath: str | Path, chunksize: int | None = None
+    ) -> "IngestReport":
+        """Stream a csv file into the database.
+
+        pandas is only imported here, on the first upload, so every other
+        screen starts without it. See `model.ingest.upload_csv`.
+
+        Args:
+        filepath (str | Path): The csv file exported from the bank.
+        chunksize (int | None): The number of csv rows held in memory at once.
+
+        Returns:
+        IngestReport: Row counts, throughput and peak RSS for the import.
+        """
+        from model.ingest import upload_csv
 
-    Returns:
-    df (pd.DataFrame): Cleaned up DataFrame
+        return upload_csv(self, filepath, chunksize)
 
-    """
-    return df.assign(
-        Processed="No",
-        Category=lambda x: x.Description.case_when(
-            caselist=[
-                (
-                    x.Description.str.contains("dividend paid", case=False),
-                    "Money towards savings",
-                ),
-                (x.Description.str.contains("netflix.com", case=False), "Netflix"),
-                (
-                    x.Description.str.contains("schnucks", case=False),
-                    "Groceries/House Supplies",
-                ),
-                (x.Description.str.contains("animal hospitals", case=False), "Dog"),
-                (
-                    x.Description.str.contains("google storage", case=False),
-                    "Google Storage",
-                ),
-                (
-                    x.Description.str.contains("tmobile", case=False),
-                    "T-Mobile Internet",
-                ),
-                (x.Description.str.contains("autozone", case=False), "Car Expenses"),
-                (
-                    x.Description.str.contains("ach:discover -e-payment", case=False),
-                    "Discover Card",
-                ),
-                (
-                    x.Description.str.contains(
-                        "ach:jpmorgan chase -chase ach",
-                        case=False,
-                    ),
-                    "JPMorgan Chase - Mortgage",
-                ),
-                (
-                    x.Description.str.contains("small wonders", case=False),
-                    "Daycare expenses",
-                ),
-                (
-                    x.Description.str.contains("university of wi -dir dep", case=False),
-                    "Adam Paycheck",
-                ),
-                (
-                    x.Description.str.contains("ach:black & veatch", case=False),
-                    "Nicole Paycheck",
-                ),
-                (x.Description.str.contains("Gas / Fuel", case=False), "Gas"),
-                (
-                    x.Description.str.contains("Transfer", case=False),
-                    "Money towards savings",
-                ),
-                (x.Description.str.contains("Dining Out", case=False), "Eating Out"),
-                (x.Description.str.contains("Doctor", case=False), "Medical"),
-                (x.Description.str.contains("Veterinary", case=False), "Dog"),
-                (
-                    x.Description.str.contains("Auto Insurance", case=False),
-                    "Auto Insurance",
-                ),
-                (pd.Series(True, index=x.index), x.Description),
-            ],
-        ),
-        Amount=lambda x: x.Amount.str.replace("$", "")
-        .str.replace("(", "-")
-        .str.replace(")", "")
-        .str.replace(",", "")
-        .astype("float64"),
-        Balance=lambda x: x.Balance.str.replace("$", "")
-        .str.replace("(", "-")
-        .str.replace(")", "")
-        .str.replace(",", "")
-        .astype("float64"),
-        Flagged="",
-    ).rename(
-        columns={
-            "Posted Date": "PostedDate",
-            "Check Number": "CheckNumber",
-        }
-    )
+    def upload_files(
+        self,
+        filepaths: list[str | Path],
+        progress: Callable[["IngestReport"], None] | None = None,
+    ) -> list["IngestReport"]:
+        """Import several csv files, parsing them in parallel.
 
+        See `model.ingest.upload_csvs`.
 
-@dataclass
-class Model:
-    """Data model for the application.
+        Args:
+        filepaths (list[str | Path]): The csv files exported from the bank.
+        progress (Callable[[IngestReport], None] | None): Called with the
+            report of each file as soon as it has been imported or has failed.
 
-    Attributes:
-    db_path (str): The path to the database.
-    con (Connection): The connection to the database.
-    cursor (Cursor): The cursor to the database.
+        Returns:
+        list[IngestReport]: One report per file, in the order given.
+        """
+        from model.ingest import upload_csvs
 
-        >>> model = Model()
+        return upload_csvs(self, filepaths, progress=progress)
 
-    """
+    def account_watermarks(self, overlap_days: int) -> dict[str, str]:
+        """Return, per account, the first date an import still has to read.
 
-    db_path: str = "the_bank.db"
-    con: Connection = sqlite3.connect(db_path)
-    cursor: Cursor = con.cursor()
-
-    def upload_dataframe(self, filepath: str | Path) -> bool:
-        """Upload a csv file to the database."""
-        df: pd.DataFrame = pd.read_csv(filepath, parse_dates=["Posted Date"])
-        df_refined: pd.DataFrame = (
-            df.loc[df["Posted Date"] >= "2024-10-01"]
-            .rename(columns={"Posted Date": "PostedDate"})
-            .groupby(["Description", "PostedDate"])
-            .agg("first")
-        )
-        df_filtered: pd.DataFrame = self.compare_dataframes(df_new=df_refined)
-        df_final: pd.DataFrame = tweak_incoming_dataframe(df_filtered)
-        df_final.to_sql("MyAccounts", con=self.con, index=False, if_exists="append")
-        return True
+        That is the latest date already stored for the account, less
+        `overlap_days` for transactions that post late.
 
-    def compare_dataframes(self, df_new: pd.DataFrame) -> pd.DataFrame:
-        """Compares the two dataframes to avoid adding duplicate data"""
-        try:
-            df_old = pd.read_sql("select * from MyAccounts", self.con)
-        except DatabaseError:
-            return df_new.reset_index()
-        df_old = (
-            df_old.assign(PostedDate=lambda x: pd.to_datetime(x.PostedDate))
-            .groupby(["Description", "PostedDate"])
-            .agg("first")
+        Args:
+        overlap_days (int): Days before the latest stored date to read again.
+
+        Returns:
+        dict[str, str]: YYYY-MM-DD dates by account number.
+        """
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
+            """
+        SELECT AccountNumber, date(MAX(PostedDate), ?)
+        FROM MyAccounts
+        WHERE AccountNumber IS NOT NULL
+        GROUP BY AccountNumber
+            """,
+            (f"-{int(overlap_days)} days",),
         )
-        df_filtered = (df_new.loc[(~df_new.index.isin(df_old.index))]).reset_index()
-        return df_filtered[
-            [
-                "AccountNumber",
-                "AccountType",
-                "PostedDate",
-                "Amount",
-                "Description",
-                "Check Number",
-                "Category",
-                "Balance",
-                "Labels",
-                "Note",
-            ]
-        ]
+        return {account: since for account, since in cursor if since is not None}
 
-    def close_database_connection(self):
-        """Close the database connection."""
-        self.con.close()
-        return True
+    def ingest_manifest(self) -> dict[str, tuple[int, int, str]]:
+        """Return the size, mtime_ns and sha1 of every file the watcher has seen."""
+        cursor = self.connections.reader().cursor()
+        cursor.execute("SELECT path, size, mtime_ns, sha1 FROM ingest_manifest")
+        return {path: (size, mtime_ns, sha1) for path, size, mtime_ns, sha1 in cursor}
 
-    def update_status(self, category, description, amount, balance, processed, flagged):
-        """Update the processing status of a transaction."""
-        print(
-            f"UPDATE STATUS: {category, description, amount, balance, processed, flagged}"
-        )
+    def record_ingested_file(
+        self,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        sha1: str,
+        rows_read: int = 0,
+        rows_written: int = 0,
+        error: str | None = None,
+    ) -> bool:
+        """Add a file to the ingest manifest, or update its entry.
+
+        Args:
+        path (str): The absolute path of the file.
+        size (int): Its size in bytes when it was hashed.
+        mtime_ns (int): Its modification time when it was hashed.
+        sha1 (str): The hash of its content.
+        rows_read (int): Rows parsed from it, 0 if it was not parsed.
+        rows_written (int): Rows it added to MyAccounts.
+        error (str | None): Why it could not be imported, if it failed.
+        """
         try:
             self.cursor.execute(
                 """
-            UPDATE MyAccounts
-            SET Processed = ?
-            WHERE Category = ?
-            AND Description = ?
-            AND Amount = ?
-            AND Balance = ?
-            AND Flagged = ?
+            INSERT INTO ingest_manifest (
+                path, size, mtime_ns, sha1, rows_read, rows_written, error
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (path) DO UPDATE SET
+                size = excluded.size,
+                mtime_ns = excluded.mtime_ns,
+                sha1 = excluded.sha1,
+                rows_read = excluded.rows_read,
+                rows_written = excluded.rows_written,
+                error = excluded.error,
+                imported_at = CURRENT_TIMESTAMP
                 """,
-                (
-                    processed,
-                    category,
-                    description,
-                    amount,
-                    balance,
-                    flagged,
-                ),
+                (path, size, mtime_ns, sha1, rows_read, rows_written, error),
             )
             self.con.commit()
         except Exception:
             self.con.rollback()
-            print("FAILED TO UPDATE CATEGORY")
+            print("FAILED TO RECORD INGESTED FILE")
+            return False
         return True
 
-    def flag_transaction(self, category, description, amount, balance):
-        """Update the processing status of a transaction."""
-        self.cursor.execute(
+    def spending_report(self) -> "SpendingReport":
+        """Compute spending statistics from the in-memory analytics snapshot.
+
+        NumPy is only imported here, the first time statistics are shown. The
+        snapshot is read in full once and afterwards only catches up on the
+        transactions added or changed since. See `model.analytics`.
+        """
+        from model.analytics import TransactionSnapshot
+
+        if self._snapshot is None:
+            self._snapshot = TransactionSnapshot()
+        return self._snapshot.report(self.connections.reader())
+
+    def retrieve_category_rules(self) -> list[Rule]:
+        """Retrieve every categorization rule in priority order."""
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
+            """
+        SELECT pattern, priority, category
+        FROM category_rules
+        ORDER BY priority, id
+            """
+        )
+        return cursor.fetchall()
+
+    def category_matcher(self) -> CategoryMatcher:
+        """Return the compiled matcher for the stored rules.
+
+        The compiled matcher is cached, so it is only rebuilt when a rule changes.
+        """
+        return compile_rules(tuple(self.retrieve_category_rules()))
+
+    def category_suggester(self) -> CategorySuggester:
+        """Load every learned category suggestion into memory for an import."""
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
             """
-        UPDATE MyAccounts
-        SET Flagged = 'Flagged'
-        WHERE Category = ?
-        AND Description = ?
-        AND Amount = ?
-        AND Balance = ?
+        SELECT s.token, c.name, s.count
+        FROM category_suggestions AS s
+        JOIN categories AS c ON c.id = s.category_id
+            """
+        )
+        return CategorySuggester.from_rows(cursor.fetchall())
+
+    def suggest_categories(self, description: str) -> list[str]:
+        """Return the categories chosen before for a description, most chosen first."""
+        key = merchant_key(description)
+        tokens = suggestion_tokens(key)
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
+            f"""
+        SELECT s.token, c.name, s.count
+        FROM category_suggestions AS s
+        JOIN categories AS c ON c.id = s.category_id
+        WHERE s.token IN ({", ".join("?" * len(tokens))})
             """,
-            (category, description, amount, balance),
+            tokens,
         )
+        return CategorySuggester.from_rows(cursor.fetchall()).ranked(key)
+
+    def retrieve_categories(self) -> list[str]:
+        """Retrieve every category name, in the order they were added."""
+        cursor = self.connections.reader().cursor()
+        cursor.execute("SELECT name FROM categories ORDER BY id")
+        return [row[0] for row in cursor.fetchall()]
+
+    def category_id(self, category: str | None) -> int | None:
+        """Return the id of a category name, adding the category if it is new."""
+        return category_ids(self.con, [category])[0]
+
+    def close_database_connection(self):
+        """Close the writer and every reader connection."""
+        self._cursor = None
+        self.connections.close()
+        return True
+
+    def apply_transaction_updates(
+        self,
+        categories: dict[int, str],
+        statuses: dict[int, str],
+        flagged: set[int],
+    ) -> int:
+        """Apply a batch of triage edits in a single transaction.
+
+        Args:
+        categories (dict[int, str]): New category per transaction id.
+        statuses (dict[int, str]): New processing status per transaction id.
+        flagged (set[int]): Ids of transactions to flag.
+
+        Returns:
+        int: The number of rows updated.
+
+        Raises:
+        sqlite3.Error: If the batch could not be written; nothing is applied.
+        """
         try:
+            self.cursor.executemany(
+                "UPDATE MyAccounts SET CategoryId = ?, Processed = 'Yes' WHERE id = ?",
+                zip(category_ids(self.con, list(categories.values())), categories),
+            )
+            updated = self.cursor.rowcount
+            self.cursor.executemany(
+                "UPDATE MyAccounts SET Processed = ? WHERE id = ?",
+                [(status, id) for id, status in statuses.items()],
+            )
+            updated += self.cursor.rowcount
+            self.cursor.executemany(
+                "UPDATE MyAccounts SET Flagged = 'Flagged' WHERE id = ?",
+                [(id,) for id in flagged],
+            )
+            updated += self.cursor.rowcount
             self.con.commit()
         except Exception:
             self.con.rollback()
-            print("FAILED TO UPDATE FLAG STATUS")
-        return True
+            print("FAILED TO APPLY TRANSACTION UPDATES")
+            raise
+        return updated
 
-    def update_category(
-        self,
-        category: str,
-        old_category: str,
-        description: str,
-        amount: float,
-        balance: float,
-    ):
-        """Update the category of a transaction."""
+    def recategorize_similar(
+        self, transaction_id: int, category: str, exact: bool = False
+    ) -> list[int]:
+        """Categorize every unprocessed transaction like this one in one UPDATE.
+
+        Transactions match on MerchantKey, the description without store and
+        reference numbers, or on the whole description when `exact` is set. The
+        transaction itself is updated as well, even if it was already processed.
+
+        Args:
+        transaction_id (int): The transaction the others should match.
+        category (str): The category to apply.
+        exact (bool): Only match identical descriptions.
+
+        Returns:
+        list[int]: Ids of every transaction that was updated.
+
+        Raises:
+        sqlite3.Error: If the update failed; nothing is applied.
+        """
+        same_description = (
+            "AND Description = (SELECT Description FROM MyAccounts WHERE id = :id)"
+            if exact
+            else ""
+        )
         try:
-            self.cursor.execute(
-                """
-            UPDATE MyAccounts 
-            SET Category = ?, Processed = 'Yes'
-            WHERE Category = ? 
-            AND Description = ?
-            AND Amount = ?
-            AND Balance = ?
+            category_id = self.category_id(category)
+            # The scalar subquery is evaluated once, so the UPDATE is a single
+            # range scan of the (Processed, MerchantKey) index.
+            updated = self.cursor.execute(
+                f"""
+            UPDATE MyAccounts
+            SET CategoryId = :category_id, Processed = 'Yes'
+            WHERE Processed = 'No'
+            AND MerchantKey = (SELECT MerchantKey FROM MyAccounts WHERE id = :id)
+            {same_description}
+            RETURNING id
                 """,
-                (
-                    category,
-                    old_category,
-                    description,
-                    amount,
-                    balance,
-                ),
+                {"category_id": category_id, "id": transaction_id},
+            ).fetchall()
+            self.cursor.execute(
+                "UPDATE MyAccounts SET CategoryId = ?, Processed = 'Yes' WHERE id = ?",
+                (category_id, transaction_id),
             )
             self.con.commit()
         except Exception:
             self.con.rollback()
-            print("FAILED TO UPDATE CATEGORY")
-        return True
+            print("FAILED TO RECATEGORIZE SIMILAR TRANSACTIONS")
+            raise
+        ids = [row[0] for row in updated]
+        return ids if transaction_id in ids else [transaction_id, *ids]
 
-    def get_unprocessed_transactions(self):
-        """Retrieve all unprocessed records from database."""
-        self.cursor.execute(
-            """
-        SELECT
-        AccountType, 
-        strftime('%Y-%m-%d', PostedDate), 
-        Balance 
-            Description, 
-            Category, 
-            Amount,
-            Processed,
-            Flagged
-        FROM MyAccounts 
+    def get_unprocessed_transactions_page(
+        self,
+        limit: int,
+        before: tuple[str, int] | None = None,
+        after: tuple[str, int] | None = None,
+    ) -> list[tuple]:
+        """Retrieve one page of unprocessed records, newest first.
+
+        Pages are addressed by keyset rather than OFFSET: `before` returns the
+        rows that sort after the (PostedDate, id) cursor and `after` the rows
+        that sort before it, so every page is an index range scan no matter how
+        deep the user has scrolled.
+
+        Args:
+        limit (int): The maximum number of rows to return.
+        before (tuple[str, int] | None): Cursor of the last row already shown.
+        after (tuple[str, int] | None): Cursor of the first row already shown.
+
+        Returns:
+        list[tuple]: Rows of id, raw PostedDate (the cursor), AccountType, the
+        posted day, Balance, Description, Category, Amount, Processed, Flagged.
+        """
+        cursor = self.connections.reader().cursor()
+        columns = f"""
+        id,
+        PostedDate,
+        AccountType,
+        strftime('%Y-%m-%d', PostedDate),
+        Balance,
+        Description,
+        {CATEGORY_LOOKUP},
+        Amount,
+        Processed,
+        Flagged
+        """
+        if after is not None:
+            cursor.execute(
+                f"""
+            SELECT {columns}
+            FROM MyAccounts
+            WHERE Processed = 'No'
+            AND (PostedDate, id) > (?, ?)
+            ORDER BY PostedDate ASC, id ASC
+            LIMIT ?
+                """,
+                (*after, limit),
+            )
+            return cursor.fetchall()[::-1]
+        if before is not None:
+            cursor.execute(
+                f"""
+            SELECT {columns}
+            FROM MyAccounts
+            WHERE Processed = 'No'
+            AND (PostedDate, id) < (?, ?)
+            ORDER BY PostedDate DESC, id DESC
+            LIMIT ?
+                """,
+                (*before, limit),
+            )
+            return cursor.fetchall()
+        cursor.execute(
+            f"""
+        SELECT {columns}
+        FROM MyAccounts
         WHERE Processed = 'No'
-        ORDER BY PostedDate DESC
-            """
+        ORDER BY PostedDate DESC, id DESC
+        LIMIT ?
+            """,
+            (limit,),
         )
-        unprocessed_data = self.cursor.fetchall()
-        return unprocessed_data
+        return cursor.fetchall()
+
+    def search_transactions(
+        self,
+        query: str,
+        start: str | None = None,
+        end: str | None = None,
+        min_cents: int | None = None,
+        max_cents: int | None = None,
+        limit: int = 500,
+    ) -> list[tuple]:
+        """Full-text search every transaction, best match first.
+
+        `query` is translated by `model.search.fts_query` and matched against the
+        transaction_search index, so no row is read that does not contain the
+        search terms. Scoring every match of a common word would cost time in
+        proportion to the table, so only the newest SEARCH_CANDIDATES matches
+        are ranked and older matches are left out; the Candidates column tells
+        the caller when that happened. Amounts are compared by size, so a
+        filter of 50 to 100 finds both purchases and deposits of that size.
+
+        Args:
+        query (str): The words, prefixes and phrases to look for.
+        start (str | None): The first posted date to include, YYYY-MM-DD.
+        end (str | None): The last posted date to include, YYYY-MM-DD.
+        min_cents (int | None): The smallest amount to include.
+        max_cents (int | None): The largest amount to include.
+        limit (int): The maximum number of rows to return.
+
+        Returns:
+        list[tuple]: Rows of id, AccountType, PostedDate, Description, Category,
+        Amount, Processed, Flagged and Candidates, the number of matches that
+        were ranked. Candidates equal to SEARCH_CANDIDATES means older matches
+        were not considered.
+
+        Raises:
+        sqlite3.OperationalError: If the query is not valid FTS5.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        filters = []
+        params: list[Any] = [match]
+        if start:
+            filters.append("AND a.PostedDate >= ?")
+            params.append(start)
+        if end:
+            filters.append("AND a.PostedDate < date(?, '+1 day')")
+            params.append(end)
+        if min_cents is not None:
+            filters.append("AND abs(a.Amount) >= ?")
+            params.append(min_cents)
+        if max_cents is not None:
+            filters.append("AND abs(a.Amount) <= ?")
+            params.append(max_cents)
+        cursor = self.connections.reader().cursor()
+        # The index returns matches in rowid order, so the newest candidates are
+        # found without sorting and only they are scored.
+        cursor.execute(
+            f"""
+        SELECT
+            id, AccountType, Posted, Description, Category, Amount, Processed, Flagged,
+            COUNT(*) OVER () AS Candidates
+        FROM (
+            SELECT
+                a.id,
+                a.AccountType,
+                strftime('%Y-%m-%d', a.PostedDate) AS Posted,
+                a.Description,
+                {CATEGORY_NAME} AS Category,
+                a.Amount,
+                a.Processed,
+                a.Flagged,
+                s.rank AS rank
+            FROM transaction_search AS s
+            JOIN MyAccounts AS a ON a.id = s.rowid
+            LEFT JOIN categories AS c ON c.id = a.CategoryId
+            WHERE transaction_search MATCH ?
+            {" ".join(filters)}
+            ORDER BY s.rowid DESC
+            LIMIT ?
+        )
+        ORDER BY rank, Posted DESC
+        LIMIT ?
+            """,
+            (*params, SEARCH_CANDIDATES, limit),
+        )
+        return cursor.fetchall()
 
         ####################
         ####################
@@ -314,42 +555,46 @@ class Model:
 
     def retrieve_all_goals(self):
         """Retrieve all goals from the database."""
-        self.cursor.execute(
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
             """
         SELECT
-            id,
-            category,
-            goal,
-            active,
-            date_added,
-            date_modified
-        FROM budget_goals
-        ORDER BY category, active DESC
+            bg.id,
+            c.name,
+            bg.goal,
+            bg.active,
+            bg.date_added,
+            bg.date_modified
+        FROM budget_goals AS bg
+        LEFT JOIN categories AS c ON c.id = bg.category_id
+        ORDER BY c.name, bg.active DESC
             """
         )
-        goals = self.cursor.fetchall()
+        goals = cursor.fetchall()
         return goals
 
     def retrieve_active_goals(self) -> list[Any]:
         """Retrieve all active goals from the database."""
         # try to execute the query, if it fails, return none.
         try:
-            self.cursor.execute(
+            cursor = self.connections.reader().cursor()
+            cursor.execute(
                 """
             SELECT
-                id,
-                category,
-                goal,
-                active,
-                date_added,
-                date_modified
-            FROM budget_goals
-            WHERE active = TRUE
-            ORDER BY category, active DESC
+                bg.id,
+                c.name,
+                bg.goal,
+                bg.active,
+                bg.date_added,
+                bg.date_modified
+            FROM budget_goals AS bg
+            LEFT JOIN categories AS c ON c.id = bg.category_id
+            WHERE bg.active = TRUE
+            ORDER BY c.name, bg.active DESC
                 """
             )
 
-            goals = self.cursor.fetchall()
+            goals = cursor.fetchall()
             return goals
         except Exception as e:
             print(f"Failed to retrieve active goals: {e}")
@@ -358,44 +603,21 @@ class Model:
     def insert_new_goals(
         self, category: str, amount: int, active: bool, timestamp: str
     ):
-        """Insert new goals into the database."""
-        self.cursor.execute(
-            """
-        CREATE TABLE IF NOT EXISTS budget_goals (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        category TEXT,
-        goal INTEGER,
-        active INTEGER,
-        date_added TEXT,
-        date_modified TEXT
-            )
-            """
-        )
-        self.con.commit()
-        self.cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='trigger' AND name='deactivate_old_budget_goals'"
-        )
-        if self.cursor.fetchone() is None:
-            self.cursor.execute(
-                """
-            CREATE TRIGGER deactivate_old_budget_goals
-            AFTER INSERT ON `budget_goals` FOR EACH ROW
-            BEGIN
-            UPDATE budget_goals SET active = FALSE
-            WHERE category = NEW.category
-            AND NOT (id = NEW.id);
-            END
-                """
-            )
+        """Insert new goals into the database. `amount` is given in cents.
+
+        The deactivate_old_budget_goals trigger retires the previous goal of the
+        same category.
+        """
         self.cursor.execute(
             """
         INSERT INTO budget_goals 
-        (category, goal, active, date_added)
+        (category_id, goal, active, date_added)
         VALUES (?, ?, ?, ?)
             """,
-            (category, amount, active, timestamp),
+            (self.category_id(category), amount, active, timestamp),
         )
         self.con.commit()
+        return True
 
     def update_existing_goals(
         self, category: str, goal: int, active: bool, timestamp: str, id: int
@@ -404,15 +626,16 @@ class Model:
         self.cursor.execute(
             """
         UPDATE budget_goals
-        SET category = ?,
+        SET category_id = ?,
         goal = ?,
         active = ?,
         date_modified = ?
         WHERE id = ?
             """,
-            (category, goal, active, timestamp, id),
+            (self.category_id(category), goal, active, timestamp, id),
         )
         self.con.commit()
+        return True
 
     ##########################
     ##########################
@@ -420,103 +643,106 @@ class Model:
     ##########################
     ##########################
 
-    def retrieve_month_bwd_progress(
-        self, number_of_months: int
+    def retrieve_month_progress(
+        self, month: int
     ) -> list[tuple[int, int, int, str, str]]:
-        self.cursor.execute(
+        """Retrieve goal vs. actual spend per category for one YYYYMM month.
+
+        Reads the monthly_category_totals rollup, so the cost depends on the
+        number of categories rather than the number of transactions.
+        """
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
             """
         SELECT
         bg.goal as "Goal",
-        SUM(acct.Amount) as "Actual",
-        SUM(acct.Amount) - bg.goal as "Difference",
-        acct.Category,
-        strftime('%Y-%m', acct.PostedDate)
-        FROM MyAccounts acct
+        totals.total as "Actual",
+        totals.total - bg.goal as "Difference",
+        c.name,
+        printf('%04d-%02d', totals.month / 100, totals.month % 100)
+        FROM monthly_category_totals totals
         INNER JOIN budget_goals bg
-            on bg.category = acct.Category
+            on bg.category_id = totals.category_id
+        INNER JOIN categories c
+            on c.id = totals.category_id
         WHERE bg.active = 1
-            and acct.Processed = 'Yes'
-            and strftime('%Y-%m', date('now', '-' || ? || ' month')) = strftime('%Y-%m', acct.PostedDate)
-        GROUP BY acct.Category, strftime('%Y-%m', acct.PostedDate)
-        order by strftime('%y-%m', acct.posteddate) desc, acct.category
+            and totals.month = ?
+        ORDER BY c.name
         """,
-            (str(number_of_months)),
+            (month,),
         )
-        items = self.cursor.fetchall()
+        items = cursor.fetchall()
         return items
 
+    def retrieve_month_bwd_progress(
+        self, number_of_months: int
+    ) -> list[tuple[int, int, int, str, str]]:
+        return self.retrieve_month_progress(month_key(-number_of_months))
+
     def retrieve_month_fwd_progress(
         self, number_of_months: int
     ) -> list[tuple[int, int, int, str, str]]:
-        self.cursor.execute(
-            """
-        select
-        bg.goal as "goal",
-        sum(acct.amount) as "actual",
-        sum(acct.amount) - bg.goal as "difference",
-        acct.Category,
-        strftime('%Y-%m', acct.PostedDate)
-        FROM MyAccounts acct
-        INNER JOIN budget_goals bg
-            on bg.category = acct.Category
-        WHERE bg.active = 1
-            and acct.Processed = 'Yes'
-            and strftime('%Y-%m', date('now', + ? || 'month')) = strftime('%Y-%m', acct.PostedDate)
-        GROUP BY acct.Category, strftime('%Y-%m', acct.PostedDate)
-        ORDER BY strftime('%Y-%m', acct.PostedDate) DESC, acct.Category
-        """,
-            (str(number_of_months)),
-        )
-        items = self.cursor.fetchall()
-        return items
+        return self.retrieve_month_progress(month_key(number_of_months))
 
     def retrieve_budget_progress(self) -> list[tuple[int, int, int, str, str]] | None:
         try:
-            self.cursor.execute(
-                """
-            SELECT
-            bg.goal as "Goal",
-            SUM(acct.Amount) as "Actual",
-            SUM(acct.Amount) - bg.goal as "Difference",
-            acct.Category,
-            strftime('%Y-%m', acct.PostedDate)
-            FROM MyAccounts acct
-            INNER JOIN budget_goals bg
-                on bg.category = acct.Category
-            WHERE bg.active = 1
-                and acct.Processed = 'Yes'
-                and strftime('%Y-%m', date('now')) = strftime('%Y-%m', acct.PostedDate)
-            GROUP BY acct.Category, strftime('%Y-%m', acct.PostedDate)
-            ORDER BY strftime('%Y-%m', acct.PostedDate) DESC, acct.Category
-    """
-            )
-            budget_progress = self.cursor.fetchall()
-            return budget_progress
+            return self.retrieve_month_progress(month_key())
         except OperationalError:
             print("FAILED TO RETRIEVE BUDGET PROGRESS TABLE")
             return None
 
     def retrieve_all_budget_progress(self):
         try:
-            self.cursor.execute(
+            cursor = self.connections.reader().cursor()
+            cursor.execute(
                 """
             SELECT
             bg.goal as "Goal", 
-            SUM(acct.Amount) as "Actual",
-            SUM(acct.Amount) - bg.goal as "Difference",
-            acct.Category, 
-            strftime('%Y-%m', acct.PostedDate) 
-            FROM MyAccounts acct 
+            totals.total as "Actual",
+            totals.total - bg.goal as "Difference",
+            c.name, 
+            printf('%04d-%02d', totals.month / 100, totals.month % 100)
+            FROM monthly_category_totals totals 
             INNER JOIN budget_goals bg 
-                on bg.category = acct.Category 
+                on bg.category_id = totals.category_id 
+            INNER JOIN categories c 
+                on c.id = totals.category_id 
             WHERE bg.active = 1 
-                and acct.Processed = 'Yes' 
-            GROUP BY acct.Category, strftime('%Y-%m', acct.PostedDate)
-            ORDER BY strftime('%Y-%m', acct.PostedDate) DESC, acct.Category
+            ORDER BY totals.month DESC, c.name
         """
             )
-            budget_progress = self.cursor.fetchall()
+            budget_progress = cursor.fetchall()
             return budget_progress
         except OperationalError:
             print("FAILED TO RETRIEVE ALL BUDGET PROGRESS TABLE")
             return False
+
+    def rebuild_monthly_category_totals(self) -> bool:
+        """Recompute the monthly_category_totals rollup from MyAccounts.
+
+        The rollup is maintained by triggers; this is only needed for repair.
+        """
+        try:
+            for statement in REBUILD_MONTHLY_CATEGORY_TOTALS:
+                self.cursor.execute(statement)
+            self.con.commit()
+        except Exception:
+            self.con.rollback()
+            print("FAILED TO REBUILD MONTHLY CATEGORY TOTALS")
+            return False
+        return True
+
+    def rebuild_category_suggestions(self) -> bool:
+        """Recompute the category_suggestions counts from MyAccounts.
+
+        The counts are maintained by triggers; this is only needed for repair.
+        """
+        try:
+            for statement in REBUILD_CATEGORY_SUGGESTIONS:
+                self.cursor.execute(statement)
+            self.con.commit()
+        except Exception:
+            self.con.rollback()
+            print("FAILED TO REBUILD CATEGORY SUGGESTIONS")
+            return False
+        return True
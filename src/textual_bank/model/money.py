@@ -0,0 +1,74 @@
+"""Money is stored as an integer number of cents and only formatted for display."""
+
+from collections.abc import Iterable, Sequence
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+
+def format_cents(cents: int) -> str:
+    """Format a number of cents as dollars.
+
+    >>> format_cents(123456)
+    '$1,234.56'
+    >>> format_cents(-1200)
+    '-$12.00'
+    """
+    sign = "-" if cents < 0 else ""
+    dollars, remainder = divmod(abs(int(cents)), 100)
+    return f"{sign}${dollars:,}.{remainder:02d}"
+
+
+def cents_to_dollars_text(cents: int) -> str:
+    """Render cents as a plain decimal suitable for an Input widget.
+
+    >>> cents_to_dollars_text(-1205)
+    '-12.05'
+    """
+    sign = "-" if cents < 0 else ""
+    dollars, remainder = divmod(abs(int(cents)), 100)
+    return f"{sign}{dollars}.{remainder:02d}"
+
+
+def dollars_to_cents(value: Any) -> int:
+    """Convert a user-entered dollar amount such as "$1,234.56" or "(12)" to cents.
+
+    >>> dollars_to_cents("$1,234.56")
+    123456
+    >>> dollars_to_cents("(12)")
+    -1200
+
+    Raises:
+    ValueError: If `value` is not a number.
+    """
+    text = str(value).strip().replace("$", "").replace(",", "")
+    if text.startswith("(") and text.endswith(")"):
+        text = "-" + text[1:-1]
+    try:
+        return int((Decimal(text) * 100).to_integral_value())
+    except InvalidOperation as e:
+        raise ValueError(f"{value!r} is not a dollar amount") from e
+
+
+class Cents(int):
+    """An integer number of cents that displays itself as dollars.
+
+    It is still an `int`, so it can be bound straight back into a query.
+
+    >>> str(Cents(-1999))
+    '-$19.99'
+    """
+
+    def __str__(self) -> str:
+        return format_cents(self)
+
+
+def with_cents(rows: Iterable[Sequence], *indexes: int) -> list[tuple]:
+    """Wrap the money columns at `indexes` of every row in `Cents`."""
+    wrapped = []
+    for row in rows:
+        row = list(row)
+        for index in indexes:
+            if row[index] is not None:
+                row[index] = Cents(row[index])
+        wrapped.append(tuple(row))
+    return wrapped
@@ -0,0 +1,110 @@
+"""Categorization rules compiled into a single multi-pattern matcher.
+
+A rule is a case-insensitive substring `pattern`, a `priority` and the `category`
+assigned when the pattern occurs in a transaction description. When several rules
+match, the one with the lowest priority wins, exactly like the first matching
+branch of the old `case_when` chain.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from math import inf
+
+Rule = tuple[str, int, str]
+
+# Descriptions whose category each matcher remembers.
+MATCH_CACHE_SIZE: int = 1 << 17
+
+
+@dataclass
+class _Node:
+    children: dict[str, "_Node"] = field(default_factory=dict)
+    rank: float = inf
+
+
+class CategoryMatcher:
+    """Every rule compiled into one trie-shaped regular expression.
+
+    The patterns are merged into a trie and rendered as a single lookahead regex,
+    with an empty capture group marking the end of each pattern. One `finditer`
+    scan reports, at every position of the description, the deepest pattern
+    that ends there, so the cost of a lookup depends on the length of the
+    description rather than on the number of rules.
+
+    >>> matcher = CategoryMatcher([("transfer", 20, "Savings"), ("netflix", 10, "Netflix")])
+    >>> matcher.match("Transfer for NETFLIX.COM")
+    'Netflix'
+    >>> matcher.match("Grocery run") is None
+    True
+    """
+
+    def __init__(self, rules: list[Rule]):
+        root = _Node()
+        ordered = sorted(enumerate(rules), key=lambda item: (item[1][1], item[0]))
+        self._categories: list[str] = []
+        for rank, (_, (pattern, _priority, category)) in enumerate(ordered):
+            self._categories.append(category)
+            node = root
+            for char in pattern.casefold():
+                node = node.children.setdefault(char, _Node())
+            node.rank = min(node.rank, rank)
+        self._group_ranks: list[int] = []
+        body = self._render(root, inf)
+        self._pattern = re.compile(f"(?={body})", re.IGNORECASE) if body else None
+        self._matches: dict[str, str | None] = {}
+
+    def _render(self, node: _Node, path_rank: float) -> str:
+        """Render the subtree below `node` as regex alternatives.
+
+        Each pattern end is marked with `()`, and the group remembers the best
+        rank seen on the way down so shorter patterns that share a prefix are
+        not lost when a longer one also matches.
+        """
+        branches = []
+        for char, child in node.children.items():
+            branch = re.escape(char)
+            rank = min(path_rank, child.rank)
+            if child.rank is not inf:
+                self._group_ranks.append(int(rank))
+                branch += "()"
+            if child.children:
+                rest = self._render(child, rank)
+                branch += f"(?:{rest})?" if child.rank is not inf else rest
+            branches.append(branch)
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    def match(self, description: str) -> str | None:
+        """Return the category of the highest priority rule found in `description`.
+
+        Imports see the same descriptions chunk after chunk, so the result is
+        remembered, for up to MATCH_CACHE_SIZE distinct descriptions at a time.
+        """
+        try:
+            return self._matches[description]
+        except KeyError:
+            pass
+        if len(self._matches) >= MATCH_CACHE_SIZE:
+            self._matches.clear()
+        category = self._matches[description] = self._scan(description)
+        return category
+
+    def _scan(self, description: str) -> str | None:
+        if self._pattern is None:
+            return None
+        best = None
+        for found in self._pattern.finditer(description):
+            rank = self._group_ranks[found.lastindex - 1]
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return None if best is None else self._categories[best]
+
+
+@lru_cache(maxsize=8)
+def compile_rules(rules: tuple[Rule, ...]) -> CategoryMatcher:
+    """Compile `rules` once, reusing the matcher until the rules change."""
+    return CategoryMatcher(list(rules))
@@ -0,0 +1,1021 @@
+"""Schema bootstrap and numbered migrations for the_bank.db.
+
+Every migration runs exactly once, inside its own transaction, and is recorded in
+the `schema_version` table. Migrations are append-only: never edit one that has
+shipped, add a new one to `MIGRATIONS` instead.
+"""
+
+import hashlib
+import json
+import re
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from sqlite3 import Connection
+from typing import Any
+
+from constants_cat import DEFAULT_CATEGORY_RULES, SELECT_OPTIONS
+
+
+def fingerprint_text(value: Any) -> str:
+    """Render a value the same way whether it came from pandas or sqlite."""
+    if value is None or value != value:  # None or NaN
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def transaction_fingerprint(
+    account_number: Any,
+    posted_date: Any,
+    amount_cents: int,
+    description: Any,
+    balance_cents: int,
+) -> str:
+    """Hash the fields that identify a single bank transaction.
+
+    The running balance is part of the key so that two identical purchases on the
+    same day are still stored as two transactions.
+
+    >>> transaction_fingerprint(1000, "2024-10-01 00:00:00", -1250, "NETFLIX", 4250) == (
+    ...     transaction_fingerprint("1000", "2024-10-01", -1250.0, "NETFLIX", 4250)
+    ... )
+    True
+    """
+    key = "\x1f".join(
+        (
+            fingerprint_text(account_number),
+            fingerprint_text(posted_date)[:10],
+            str(int(amount_cents)),
+            fingerprint_text(description),
+            str(int(balance_cents)),
+        )
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+# Store numbers, references and dates: "#1234", "000123", "AMZN.COM/BILL*2K4".
+NUMBERED_TOKEN = re.compile(r"\S*\d\S*")
+WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1 << 17)
+def merchant_key(description: Any) -> str:
+    """Normalize a description to the merchant it names.
+
+    Tokens containing a digit are dropped, so the same merchant matches across
+    stores and reference numbers. A description made up of numbers only is
+    kept whole rather than matching every other such description. Exports
+    repeat the same descriptions, so recent keys are cached.
+
+    >>> merchant_key("SCHNUCKS #12 ST LOUIS MO"), merchant_key("Schnucks #77 St Louis")
+    ('SCHNUCKS ST LOUIS MO', 'SCHNUCKS ST LOUIS')
+    >>> merchant_key("AMAZON MKTPLACE PMTS AMZN.COM/BILL WA 981")
+    'AMAZON MKTPLACE PMTS AMZN.COM/BILL WA'
+    >>> merchant_key("1234 5678")
+    '1234 5678'
+    """
+    text = WHITESPACE.sub(" ", fingerprint_text(description).upper()).strip()
+    return WHITESPACE.sub(" ", NUMBERED_TOKEN.sub("", text)).strip() or text
+
+
+def _sql_fingerprint(account_number, posted_date, amount, description, balance) -> str:
+    """`transaction_fingerprint` for legacy rows that still store dollars as REAL."""
+    return transaction_fingerprint(
+        account_number,
+        posted_date,
+        round((amount or 0) * 100),
+        description,
+        round((balance or 0) * 100),
+    )
+
+
+def table_exists(con: Connection, name: str) -> bool:
+    """Check sqlite_master for a table called `name`."""
+    row = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def table_columns(con: Connection, name: str) -> list[str]:
+    """Return the column names of `name` in declaration order."""
+    return [row[1] for row in con.execute(f"PRAGMA table_info({name})")]
+
+
+def category_ids(con: Connection, names: Sequence[str | None]) -> list[int | None]:
+    """Return the categories id of every name, storing the names that are new.
+
+    None stays None: the transaction is uncategorized.
+    """
+    distinct = list(dict.fromkeys(name for name in names if name is not None))
+    if not distinct:
+        return [None] * len(names)
+    con.executemany(
+        "INSERT OR IGNORE INTO categories (name) VALUES (?)",
+        [(name,) for name in distinct],
+    )
+    ids = dict(
+        con.execute(
+            "SELECT name, id FROM categories "
+            "WHERE name IN (SELECT value FROM json_each(?))",
+            (json.dumps(distinct),),
+        )
+    )
+    return [ids.get(name) for name in names]
+
+
+def _001_transaction_fingerprints(con: Connection) -> None:
+    """Declare MyAccounts explicitly and deduplicate it on a hashed fingerprint."""
+    if not table_exists(con, "MyAccounts"):
+        con.execute(
+            """
+        CREATE TABLE MyAccounts (
+            AccountNumber TEXT,
+            AccountType TEXT,
+            PostedDate TIMESTAMP,
+            Amount REAL,
+            Description TEXT,
+            CheckNumber TEXT,
+            Category TEXT,
+            Balance REAL,
+            Labels TEXT,
+            Note TEXT,
+            Processed TEXT,
+            Flagged TEXT,
+            Fingerprint TEXT
+        )
+            """
+        )
+    elif "Fingerprint" not in table_columns(con, "MyAccounts"):
+        con.create_function("fingerprint", 5, _sql_fingerprint, deterministic=True)
+        con.execute("ALTER TABLE MyAccounts ADD COLUMN Fingerprint TEXT")
+        con.execute(
+            """
+        UPDATE MyAccounts
+        SET Fingerprint = fingerprint(
+            AccountNumber, PostedDate, Amount, Description, Balance
+        )
+            """
+        )
+        con.execute(
+            """
+        DELETE FROM MyAccounts
+        WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM MyAccounts GROUP BY Fingerprint
+        )
+            """
+        )
+    con.execute(
+        "CREATE UNIQUE INDEX ux_myaccounts_fingerprint ON MyAccounts (Fingerprint)"
+    )
+
+
+def _002_category_rules(con: Connection) -> None:
+    """Move the hard-coded categorization rules into a table."""
+    con.execute(
+        """
+    CREATE TABLE category_rules (
+        id INTEGER PRIMARY KEY,
+        pattern TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        category TEXT NOT NULL
+    )
+        """
+    )
+    con.executemany(
+        "INSERT INTO category_rules (pattern, priority, category) VALUES (?, ?, ?)",
+        DEFAULT_CATEGORY_RULES,
+    )
+
+
+def _003_integer_cents(con: Connection) -> None:
+    """Store money as INTEGER cents instead of REAL dollars.
+
+    SQLite cannot change a column type in place, so MyAccounts is rebuilt.
+    """
+    con.execute(
+        """
+    CREATE TABLE MyAccounts_new (
+        AccountNumber TEXT,
+        AccountType TEXT,
+        PostedDate TIMESTAMP,
+        Amount INTEGER,
+        Description TEXT,
+        CheckNumber TEXT,
+        Category TEXT,
+        Balance INTEGER,
+        Labels TEXT,
+        Note TEXT,
+        Processed TEXT,
+        Flagged TEXT,
+        Fingerprint TEXT
+    )
+        """
+    )
+    con.execute(
+        """
+    INSERT INTO MyAccounts_new
+    SELECT
+        AccountNumber,
+        AccountType,
+        PostedDate,
+        CAST(ROUND(Amount * 100) AS INTEGER),
+        Description,
+        CheckNumber,
+        Category,
+        CAST(ROUND(Balance * 100) AS INTEGER),
+        Labels,
+        Note,
+        Processed,
+        Flagged,
+        Fingerprint
+    FROM MyAccounts
+        """
+    )
+    con.execute("DROP TABLE MyAccounts")
+    con.execute("ALTER TABLE MyAccounts_new RENAME TO MyAccounts")
+    con.execute(
+        "CREATE UNIQUE INDEX ux_myaccounts_fingerprint ON MyAccounts (Fingerprint)"
+    )
+    if table_exists(con, "budget_goals"):
+        con.execute("UPDATE budget_goals SET goal = CAST(ROUND(goal * 100) AS INTEGER)")
+
+
+def _004_transaction_ids(con: Connection) -> None:
+    """Give MyAccounts an INTEGER PRIMARY KEY so rows can be addressed by id."""
+    con.execute(
+        """
+    CREATE TABLE MyAccounts_new (
+        id INTEGER PRIMARY KEY,
+        AccountNumber TEXT,
+        AccountType TEXT,
+        PostedDate TIMESTAMP,
+        Amount INTEGER,
+        Description TEXT,
+        CheckNumber TEXT,
+        Category TEXT,
+        Balance INTEGER,
+        Labels TEXT,
+        Note TEXT,
+        Processed TEXT,
+        Flagged TEXT,
+        Fingerprint TEXT
+    )
+        """
+    )
+    con.execute(
+        """
+    INSERT INTO MyAccounts_new
+    SELECT
+        rowid,
+        AccountNumber,
+        AccountType,
+        PostedDate,
+        Amount,
+        Description,
+        CheckNumber,
+        Category,
+        Balance,
+        Labels,
+        Note,
+        Processed,
+        Flagged,
+        Fingerprint
+    FROM MyAccounts
+        """
+    )
+    con.execute("DROP TABLE MyAccounts")
+    con.execute("ALTER TABLE MyAccounts_new RENAME TO MyAccounts")
+    con.execute(
+        "CREATE UNIQUE INDEX ux_myaccounts_fingerprint ON MyAccounts (Fingerprint)"
+    )
+
+
+def _005_budget_goals_and_indexes(con: Connection) -> None:
+    """Create budget_goals up front and index the hot query predicates."""
+    con.execute(
+        """
+    CREATE TABLE IF NOT EXISTS budget_goals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category TEXT,
+        goal INTEGER,
+        active INTEGER,
+        date_added TEXT,
+        date_modified TEXT
+    )
+        """
+    )
+    con.execute(
+        """
+    CREATE TRIGGER IF NOT EXISTS deactivate_old_budget_goals
+    AFTER INSERT ON budget_goals FOR EACH ROW
+    BEGIN
+        UPDATE budget_goals SET active = FALSE
+        WHERE category = NEW.category
+        AND NOT (id = NEW.id);
+    END
+        """
+    )
+    con.execute(
+        "CREATE INDEX ix_budget_goals_category_active ON budget_goals (category, active)"
+    )
+    con.execute(
+        "CREATE INDEX ix_myaccounts_processed_posteddate "
+        "ON MyAccounts (Processed, PostedDate)"
+    )
+    con.execute("CREATE INDEX ix_myaccounts_posteddate ON MyAccounts (PostedDate)")
+    con.execute("CREATE INDEX ix_myaccounts_category ON MyAccounts (Category)")
+
+
+def _006_posted_month(con: Connection) -> None:
+    """Bucket transactions by an indexed YYYYMM integer month.
+
+    PostedMonth is a generated column, so it is always in sync with PostedDate
+    and progress queries can use equality and range lookups instead of calling
+    strftime() on every row.
+    """
+    con.execute(
+        """
+    ALTER TABLE MyAccounts ADD COLUMN PostedMonth INTEGER
+    GENERATED ALWAYS AS (CAST(strftime('%Y%m', PostedDate) AS INTEGER)) VIRTUAL
+        """
+    )
+    con.execute(
+        "CREATE INDEX ix_myaccounts_month_processed_category "
+        "ON MyAccounts (PostedMonth, Processed, Category, Amount)"
+    )
+
+
+def _trigger(name: str, event: str, *body: str, when: str | None = None) -> str:
+    """SQL that creates the trigger `name`, running `body` for each row of MyAccounts.
+
+    >>> print(_trigger("log", "AFTER DELETE", "SELECT OLD.id;", when="OLD.id > 0"))
+    CREATE TRIGGER log
+    AFTER DELETE ON MyAccounts FOR EACH ROW
+    WHEN OLD.id > 0
+    BEGIN
+    SELECT OLD.id;
+    END
+    """
+    lines = [f"CREATE TRIGGER {name}", f"{event} ON MyAccounts FOR EACH ROW"]
+    if when:
+        lines.append(f"WHEN {when}")
+    return "\n".join([*lines, "BEGIN", *body, "END"])
+
+
+# The rollup, suggestion, search and change log triggers are built below from
+# the column MyAccounts stores the category in. Migrations 007 to 011 build
+# them for the Category name and _014_categories rebuilds them for CategoryId,
+# so both versions always do the same work.
+
+
+def _rebuild_totals(column: str, key: str, missing: str) -> list[str]:
+    """Statements that recompute monthly_category_totals from MyAccounts.
+
+    Args:
+    column (str): The MyAccounts column holding the category.
+    key (str): The monthly_category_totals column it is stored in.
+    missing (str): SQL for the key of uncategorized transactions.
+    """
+    return [
+        "DELETE FROM monthly_category_totals",
+        f"""
+    INSERT INTO monthly_category_totals (month, {key}, total, row_count)
+    SELECT PostedMonth, COALESCE({column}, {missing}), SUM(Amount), COUNT(*)
+    FROM MyAccounts
+    WHERE Processed = 'Yes'
+    GROUP BY PostedMonth, COALESCE({column}, {missing})
+    """,
+    ]
+
+
+def _totals_triggers(column: str, key: str, missing: str) -> dict[str, str]:
+    """Triggers that keep monthly_category_totals current, by name.
+
+    Takes the same arguments as `_rebuild_totals`.
+    """
+    add = f"""
+    INSERT INTO monthly_category_totals (month, {key}, total, row_count)
+    SELECT NEW.PostedMonth, COALESCE(NEW.{column}, {missing}), NEW.Amount, 1
+    WHERE NEW.Processed = 'Yes'
+    ON CONFLICT (month, {key}) DO UPDATE
+    SET total = total + excluded.total, row_count = row_count + excluded.row_count;
+    """
+    subtract = f"""
+    UPDATE monthly_category_totals
+    SET total = total - OLD.Amount, row_count = row_count - 1
+    WHERE OLD.Processed = 'Yes'
+    AND month = OLD.PostedMonth
+    AND {key} = COALESCE(OLD.{column}, {missing});
+    DELETE FROM monthly_category_totals
+    WHERE OLD.Processed = 'Yes'
+    AND month = OLD.PostedMonth
+    AND {key} = COALESCE(OLD.{column}, {missing})
+    AND row_count = 0;
+    """
+    return {
+        "monthly_category_totals_insert": _trigger(
+            "monthly_category_totals_insert",
+            "AFTER INSERT",
+            add,
+            when="NEW.Processed = 'Yes'",
+        ),
+        "monthly_category_totals_delete": _trigger(
+            "monthly_category_totals_delete",
+            "AFTER DELETE",
+            subtract,
+            when="OLD.Processed = 'Yes'",
+        ),
+        "monthly_category_totals_update": _trigger(
+            "monthly_category_totals_update",
+            f"AFTER UPDATE OF {column}, Processed, Amount, PostedDate",
+            subtract,
+            add,
+            when="OLD.Processed = 'Yes' OR NEW.Processed = 'Yes'",
+        ),
+    }
+
+
+def _007_monthly_category_totals(con: Connection) -> None:
+    """Keep processed spend per (month, category) in a trigger-maintained rollup."""
+    con.execute(
+        """
+    CREATE TABLE monthly_category_totals (
+        month INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        PRIMARY KEY (month, category)
+    ) WITHOUT ROWID
+        """
+    )
+    for trigger in _totals_triggers("Category", "category", "''").values():
+        con.execute(trigger)
+    for statement in _rebuild_totals("Category", "category", "''"):
+        con.execute(statement)
+
+
+def _008_merchant_keys(con: Connection) -> None:
+    """Store each transaction's merchant key for bulk recategorization.
+
+    Indexed together with Processed, so every unprocessed transaction from one
+    merchant is a single index range.
+    """
+    con.create_function("merchant_key", 1, merchant_key, deterministic=True)
+    con.execute("ALTER TABLE MyAccounts ADD COLUMN MerchantKey TEXT")
+    con.execute("UPDATE MyAccounts SET MerchantKey = merchant_key(Description)")
+    con.execute(
+        "CREATE INDEX ix_myaccounts_processed_merchant "
+        "ON MyAccounts (Processed, MerchantKey)"
+    )
+
+
+def _first_word(key: str) -> str:
+    """SQL for the first word of a merchant key, NULL if it is a single word."""
+    return (
+        f"CASE WHEN instr({key}, ' ') > 0 "
+        f"THEN substr({key}, 1, instr({key}, ' ') - 1) END"
+    )
+
+
+def _rebuild_suggestions(column: str, key: str) -> list[str]:
+    """Statements that recount category_suggestions from MyAccounts.
+
+    Args:
+    column (str): The MyAccounts column holding the category.
+    key (str): The category_suggestions column it is stored in.
+    """
+    return [
+        "DELETE FROM category_suggestions",
+        f"""
+    INSERT INTO category_suggestions (token, {key}, count)
+    SELECT token, {column}, COUNT(*)
+    FROM (
+        SELECT MerchantKey AS token, {column}
+        FROM MyAccounts WHERE Processed = 'Yes'
+        UNION ALL
+        SELECT {_first_word("MerchantKey")}, {column}
+        FROM MyAccounts WHERE Processed = 'Yes'
+    )
+    WHERE token IS NOT NULL AND token != '' AND {column} IS NOT NULL
+    GROUP BY token, {column}
+    """,
+    ]
+
+
+def _suggestion_triggers(column: str, key: str) -> dict[str, str]:
+    """Triggers that keep category_suggestions current, by name.
+
+    Takes the same arguments as `_rebuild_suggestions`.
+    """
+    add = f"""
+    INSERT INTO category_suggestions (token, {key}, count)
+    SELECT token, NEW.{column}, 1
+    FROM (
+        SELECT NEW.MerchantKey AS token
+        UNION ALL
+        SELECT {_first_word("NEW.MerchantKey")}
+    )
+    WHERE NEW.Processed = 'Yes' AND NEW.{column} IS NOT NULL
+    AND token IS NOT NULL AND token != ''
+    ON CONFLICT (token, {key}) DO UPDATE SET count = count + 1;
+    """
+    subtract = f"""
+    UPDATE category_suggestions
+    SET count = count - 1
+    WHERE OLD.Processed = 'Yes'
+    AND {key} = OLD.{column}
+    AND token IN (OLD.MerchantKey, {_first_word("OLD.MerchantKey")});
+    DELETE FROM category_suggestions
+    WHERE OLD.Processed = 'Yes'
+    AND {key} = OLD.{column}
+    AND token IN (OLD.MerchantKey, {_first_word("OLD.MerchantKey")})
+    AND count = 0;
+    """
+    return {
+        "category_suggestions_insert": _trigger(
+            "category_suggestions_insert",
+            "AFTER INSERT",
+            add,
+            when="NEW.Processed = 'Yes'",
+        ),
+        "category_suggestions_delete": _trigger(
+            "category_suggestions_delete",
+            "AFTER DELETE",
+            subtract,
+            when="OLD.Processed = 'Yes'",
+        ),
+        "category_suggestions_update": _trigger(
+            "category_suggestions_update",
+            f"AFTER UPDATE OF {column}, Processed, MerchantKey",
+            subtract,
+            add,
+            when="OLD.Processed = 'Yes' OR NEW.Processed = 'Yes'",
+        ),
+    }
+
+
+def _009_category_suggestions(con: Connection) -> None:
+    """Count the categories chosen per merchant token to suggest them later.
+
+    See `model.suggestions`. Like the monthly rollup, the counts are kept
+    current by triggers, so every way a transaction gets categorized is
+    learned from.
+    """
+    con.execute(
+        """
+    CREATE TABLE category_suggestions (
+        token TEXT NOT NULL,
+        category TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (token, category)
+    ) WITHOUT ROWID
+        """
+    )
+    for trigger in _suggestion_triggers("Category", "category").values():
+        con.execute(trigger)
+    for statement in _rebuild_suggestions("Category", "category"):
+        con.execute(statement)
+
+
+def _search_triggers(
+    column: str, category: Callable[[str], str], indexing: str | None = None
+) -> dict[str, str]:
+    """Triggers that keep the transaction_search index current, by name.
+
+    Args:
+    column (str): The MyAccounts column holding the category.
+    category (Callable[[str], str]): SQL for the category name of the NEW or
+        OLD row.
+    indexing (str | None): A condition that must hold for inserted rows to be
+        indexed.
+    """
+
+    def row(values: str) -> str:
+        return (
+            f"{values}.id, {values}.Description, {category(values)}, "
+            f"{values}.Labels, {values}.Note"
+        )
+
+    index = f"""
+    INSERT INTO transaction_search (rowid, Description, Category, Labels, Note)
+    VALUES ({row("NEW")});
+    """
+    remove = f"""
+    INSERT INTO transaction_search (
+        transaction_search, rowid, Description, Category, Labels, Note
+    )
+    VALUES ('delete', {row("OLD")});
+    """
+    return {
+        "transaction_search_insert": _trigger(
+            "transaction_search_insert", "AFTER INSERT", index, when=indexing
+        ),
+        "transaction_search_delete": _trigger(
+            "transaction_search_delete", "AFTER DELETE", remove
+        ),
+        "transaction_search_update": _trigger(
+            "transaction_search_update",
+            f"AFTER UPDATE OF Description, {column}, Labels, Note",
+            remove,
+            index,
+        ),
+    }
+
+
+def _010_transaction_search(con: Connection) -> None:
+    """Index the text columns of MyAccounts for full-text search.
+
+    transaction_search is an external-content FTS5 table: it only stores the
+    index and reads the text back from MyAccounts, whose triggers keep the two in
+    sync. Prefixes of two and three characters are indexed so prefix queries do
+    not scan the term list, and matches in the description rank highest.
+    """
+    con.execute(
+        """
+    CREATE VIRTUAL TABLE transaction_search USING fts5(
+        Description,
+        Category,
+        Labels,
+        Note,
+        content = 'MyAccounts',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+        """
+    )
+    triggers = _search_triggers("Category", lambda row: f"{row}.Category")
+    for trigger in triggers.values():
+        con.execute(trigger)
+    con.execute(
+        "INSERT INTO transaction_search (transaction_search, rank) "
+        "VALUES ('rank', 'bm25(10.0, 4.0, 2.0, 2.0)')"
+    )
+    con.execute(
+        "INSERT INTO transaction_search (transaction_search) VALUES ('rebuild')"
+    )
+
+
+def _change_log_triggers(column: str) -> dict[str, str]:
+    """Triggers that log changed transactions in transaction_changes, by name.
+
+    Args:
+    column (str): The MyAccounts column holding the category.
+    """
+    log = "INSERT INTO transaction_changes (id) VALUES ({}.id);"
+    return {
+        "transaction_changes_update": _trigger(
+            "transaction_changes_update",
+            f"AFTER UPDATE OF PostedDate, Amount, {column}, MerchantKey",
+            log.format("NEW"),
+        ),
+        "transaction_changes_delete": _trigger(
+            "transaction_changes_delete", "AFTER DELETE", log.format("OLD")
+        ),
+    }
+
+
+def _011_transaction_changes(con: Connection) -> None:
+    """Log which transactions change, so in-memory copies can catch up.
+
+    New transactions are found by id; the log covers existing ones whose
+    analytics columns are updated and those that are deleted. See
+    `model.analytics.TransactionSnapshot`.
+    """
+    con.execute(
+        """
+    CREATE TABLE transaction_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER NOT NULL
+    )
+        """
+    )
+    for trigger in _change_log_triggers("Category").values():
+        con.execute(trigger)
+
+
+def _012_ingest_manifest(con: Connection) -> None:
+    """Remember the csv files the folder watcher has imported.
+
+    A file is only read again when its size or modification time changes,
+    and only parsed again when its content hash is new. See `watch_folder.py`.
+    """
+    con.execute(
+        """
+    CREATE TABLE ingest_manifest (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha1 TEXT NOT NULL,
+        rows_read INTEGER NOT NULL DEFAULT 0,
+        rows_written INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        imported_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+        """
+    )
+    con.execute("CREATE INDEX ix_ingest_manifest_sha1 ON ingest_manifest (sha1)")
+
+
+def _013_account_watermarks(con: Connection) -> None:
+    """Index the latest posted date of each account for incremental imports."""
+    con.execute(
+        "CREATE INDEX ix_myaccounts_account_posteddate "
+        "ON MyAccounts (AccountNumber, PostedDate)"
+    )
+
+
+# Uncategorized transactions have no CategoryId and show their description.
+CATEGORY_NAME = "COALESCE(c.name, a.Description)"
+
+REBUILD_MONTHLY_CATEGORY_TOTALS: list[str] = _rebuild_totals(
+    "CategoryId", "category_id", "0"
+)
+REBUILD_CATEGORY_SUGGESTIONS: list[str] = _rebuild_suggestions(
+    "CategoryId", "category_id"
+)
+
+
+def _category_name(row: str) -> str:
+    """SQL for the category name of the NEW or OLD row, its description if none."""
+    return (
+        f"COALESCE((SELECT name FROM categories WHERE id = {row}.CategoryId), "
+        f"{row}.Description)"
+    )
+
+
+# Every trigger and index on MyAccounts that reads the Category column.
+_CATEGORY_TRIGGERS: tuple[str, ...] = (
+    "monthly_category_totals_insert",
+    "monthly_category_totals_delete",
+    "monthly_category_totals_update",
+    "category_suggestions_insert",
+    "category_suggestions_delete",
+    "category_suggestions_update",
+    "transaction_search_insert",
+    "transaction_search_delete",
+    "transaction_search_update",
+    "transaction_changes_update",
+)
+_CATEGORY_INDEXES: tuple[str, ...] = (
+    "ix_myaccounts_category",
+    "ix_myaccounts_month_processed_category",
+)
+
+
+def _014_categories(con: Connection) -> None:
+    """Store every category name once and reference it by an integer id.
+
+    MyAccounts.Category and budget_goals.category become CategoryId and
+    category_id, so the rollup and the suggestion counts are keyed, joined
+    and grouped by integer. Uncategorized transactions used to store their
+    description as the category; they now have no CategoryId, and every
+    query shows the description for them, as before. The rules keep their
+    category names, which are all in the table.
+
+    The full-text index reads the category name through the
+    transaction_search_content view, and is rebuilt from it.
+    """
+    con.execute(
+        """
+    CREATE TABLE categories (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+        """
+    )
+    con.executemany(
+        "INSERT OR IGNORE INTO categories (name) VALUES (?)",
+        [(value,) for _, value in SELECT_OPTIONS],
+    )
+    con.execute(
+        """
+    INSERT OR IGNORE INTO categories (name)
+    SELECT category FROM category_rules
+    UNION ALL
+    SELECT category FROM budget_goals WHERE category IS NOT NULL
+    UNION ALL
+    SELECT Category FROM MyAccounts
+    WHERE Category IS NOT NULL
+    AND (Processed = 'Yes' OR Category IS NOT Description)
+        """
+    )
+
+    for trigger in _CATEGORY_TRIGGERS:
+        con.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for index in _CATEGORY_INDEXES:
+        con.execute(f"DROP INDEX IF EXISTS {index}")
+    con.execute("DROP TABLE transaction_search")
+    con.execute("DROP TABLE monthly_category_totals")
+    con.execute("DROP TABLE category_suggestions")
+
+    con.execute(
+        "ALTER TABLE MyAccounts ADD COLUMN CategoryId INTEGER REFERENCES categories (id)"
+    )
+    con.execute(
+        """
+    UPDATE MyAccounts
+    SET CategoryId = (SELECT id FROM categories WHERE name = Category)
+    WHERE Category IS NOT NULL
+    AND (Processed = 'Yes' OR Category IS NOT Description)
+        """
+    )
+    con.execute("ALTER TABLE MyAccounts DROP COLUMN Category")
+    con.execute(
+        "CREATE INDEX ix_myaccounts_month_processed_category "
+        "ON MyAccounts (PostedMonth, Processed, CategoryId, Amount)"
+    )
+
+    con.execute("DROP TRIGGER deactivate_old_budget_goals")
+    con.execute("DROP INDEX ix_budget_goals_category_active")
+    con.execute(
+        "ALTER TABLE budget_goals "
+        "ADD COLUMN category_id INTEGER REFERENCES categories (id)"
+    )
+    con.execute(
+        """
+    UPDATE budget_goals
+    SET category_id = (SELECT id FROM categories WHERE name = category)
+        """
+    )
+    con.execute("ALTER TABLE budget_goals DROP COLUMN category")
+    con.execute(
+        """
+    CREATE TRIGGER deactivate_old_budget_goals
+    AFTER INSERT ON budget_goals FOR EACH ROW
+    BEGIN
+        UPDATE budget_goals SET active = FALSE
+        WHERE category_id = NEW.category_id
+        AND NOT (id = NEW.id);
+    END
+        """
+    )
+    con.execute(
+        "CREATE INDEX ix_budget_goals_category_active "
+        "ON budget_goals (category_id, active)"
+    )
+
+    con.execute(
+        """
+    CREATE TABLE monthly_category_totals (
+        month INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        PRIMARY KEY (month, category_id)
+    ) WITHOUT ROWID
+        """
+    )
+    for trigger in _totals_triggers("CategoryId", "category_id", "0").values():
+        con.execute(trigger)
+    for statement in REBUILD_MONTHLY_CATEGORY_TOTALS:
+        con.execute(statement)
+
+    con.execute(
+        """
+    CREATE TABLE category_suggestions (
+        token TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (token, category_id)
+    ) WITHOUT ROWID
+        """
+    )
+    for trigger in _suggestion_triggers("CategoryId", "category_id").values():
+        con.execute(trigger)
+    for statement in REBUILD_CATEGORY_SUGGESTIONS:
+        con.execute(statement)
+
+    con.execute(
+        f"""
+    CREATE VIEW transaction_search_content AS
+    SELECT a.id, a.Description, {CATEGORY_NAME} AS Category, a.Labels, a.Note
+    FROM MyAccounts AS a
+    LEFT JOIN categories AS c ON c.id = a.CategoryId
+        """
+    )
+    con.execute(
+        """
+    CREATE VIRTUAL TABLE transaction_search USING fts5(
+        Description,
+        Category,
+        Labels,
+        Note,
+        content = 'transaction_search_content',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+        """
+    )
+    for trigger in _search_triggers("CategoryId", _category_name).values():
+        con.execute(trigger)
+    con.execute(
+        "INSERT INTO transaction_search (transaction_search, rank) "
+        "VALUES ('rank', 'bm25(10.0, 4.0, 2.0, 2.0)')"
+    )
+    con.execute(
+        "INSERT INTO transaction_search (transaction_search) VALUES ('rebuild')"
+    )
+
+    con.execute(_change_log_triggers("CategoryId")["transaction_changes_update"])
+
+
+def _015_bulk_load_guard(con: Connection) -> None:
+    """Let bulk loads switch off per-row full-text indexing without DDL.
+
+    While the bulk_load table has a row, transaction_search_insert does
+    nothing; `model.bulk.BulkLoader` adds the row inside its transaction and
+    indexes the new rows with one statement before removing it, so no other
+    connection ever sees the row or a half-indexed table.
+    """
+    con.execute("CREATE TABLE bulk_load (active INTEGER PRIMARY KEY)")
+    con.execute("DROP TRIGGER transaction_search_insert")
+    triggers = _search_triggers(
+        "CategoryId", _category_name, indexing="NOT EXISTS (SELECT 1 FROM bulk_load)"
+    )
+    con.execute(triggers["transaction_search_insert"])
+
+
+# transaction_changes keeps about this many of its newest entries; snapshots
+# that fell further behind read every row again.
+CHANGE_LOG_LIMIT: int = 10_000
+# Old entries are removed whenever this many new ones have been logged.
+CHANGE_LOG_TRIM_EVERY: int = 1_000
+
+
+def _016_cap_transaction_changes(con: Connection) -> None:
+    """Stop transaction_changes from growing with every edit ever made.
+
+    Each time CHANGE_LOG_TRIM_EVERY entries have been logged, everything but
+    the newest CHANGE_LOG_LIMIT is deleted. `TransactionSnapshot` notices when
+    an entry it has not applied yet is gone and rebuilds itself instead.
+    """
+    con.execute(
+        f"""
+    CREATE TRIGGER transaction_changes_cap
+    AFTER INSERT ON transaction_changes FOR EACH ROW
+    WHEN NEW.seq % {CHANGE_LOG_TRIM_EVERY} = 0
+    BEGIN
+        DELETE FROM transaction_changes WHERE seq <= NEW.seq - {CHANGE_LOG_LIMIT};
+    END
+        """
+    )
+    con.execute(
+        f"DELETE FROM transaction_changes WHERE seq <= "
+        f"(SELECT MAX(seq) FROM transaction_changes) - {CHANGE_LOG_LIMIT}"
+    )
+
+
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _001_transaction_fingerprints,
+    _002_category_rules,
+    _003_integer_cents,
+    _004_transaction_ids,
+    _005_budget_goals_and_indexes,
+    _006_posted_month,
+    _007_monthly_category_totals,
+    _008_merchant_keys,
+    _009_category_suggestions,
+    _010_transaction_search,
+    _011_transaction_changes,
+    _012_ingest_manifest,
+    _013_account_watermarks,
+    _014_categories,
+    _015_bulk_load_guard,
+    _016_cap_transaction_changes,
+]
+
+
+def schema_version(con: Connection) -> int:
+    """Return the number of the last migration applied to the database."""
+    con.execute(
+        """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+        """
+    )
+    return con.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(con: Connection) -> int:
+    """Apply every pending migration, each in its own transaction.
+
+    Returns:
+    int: The schema version the database is at afterwards.
+    """
+    current = schema_version(con)
+    for version, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+        con.execute("BEGIN")
+        try:
+            migration(con)
+            con.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+    return len(MIGRATIONS)
@@ -0,0 +1,55 @@
+"""Turn what the user types in the search box into an FTS5 query.
+
+Raw FTS5 syntax rejects most of what appears in bank descriptions, such as
+"AMZN.COM/BILL" or "CVS/PHARMACY #123", so every term is quoted. The parts of
+the syntax worth typing are kept:
+
+- `groc*` matches any word starting with "groc";
+- `"whole foods"` matches the words next to each other, in order;
+- `category:groceries` only searches that column;
+- AND, OR and NOT combine terms; terms without one must all match.
+"""
+
+import re
+
+SEARCH_COLUMNS: tuple[str, ...] = ("Description", "Category", "Labels", "Note")
+OPERATORS: frozenset[str] = frozenset({"AND", "OR", "NOT"})
+
+TERM = re.compile(r'(?:(\w+):)?("[^"]*"?\*?|\S+)')
+
+
+def fts_query(text: str) -> str:
+    """Quote every term of `text` so it is a valid FTS5 MATCH expression.
+
+    >>> fts_query('amzn.com/bill groc* "whole foods"')
+    '"amzn.com/bill" "groc"* "whole foods"'
+    >>> fts_query('category:gas OR note:"road trip"* NOT "')
+    'Category:"gas" OR Note:"road trip"*'
+    """
+    columns = {column.lower(): column for column in SEARCH_COLUMNS}
+    terms = []
+    for found in TERM.finditer(text):
+        column, body = found.groups()
+        if column is None and body in OPERATORS:
+            terms.append(body)
+            continue
+        if column is not None and column.lower() not in columns:
+            # Not a column filter, just a word with a colon in it.
+            body, column = found.group(0), None
+        prefix = body.endswith("*")
+        body = body.rstrip("*").strip('"').replace('"', "")
+        if not body.strip():
+            continue
+        term = f'"{body}"' + ("*" if prefix else "")
+        if column is not None:
+            term = f"{columns[column.lower()]}:{term}"
+        terms.append(term)
+    # An operator needs a term on either side of it.
+    cleaned: list[str] = []
+    for term in terms:
+        if term in OPERATORS and (not cleaned or cleaned[-1] in OPERATORS):
+            continue
+        cleaned.append(term)
+    while cleaned and cleaned[-1] in OPERATORS:
+        cleaned.pop()
+    return " ".join(cleaned)
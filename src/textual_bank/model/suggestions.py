@@ -0,0 +1,108 @@
+"""Category suggestions learned from transactions that were already categorized.
+
+Every processed transaction counts one vote for its category under two tokens:
+its merchant key (see `model.schema.merchant_key`) and the first word of that
+key, so "SCHNUCKS ST LOUIS MO" also suggests a category for a new
+"SCHNUCKS CLAYTON MO". A first word is shared by unrelated merchants
+("TRANSFER TO ..."), so it is only trusted once enough votes agree. The votes
+live in the trigger-maintained category_suggestions table; `CategorySuggester`
+holds them in a dict so a suggestion is at most two lookups, however many
+transactions are imported.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+# A first-word token only suggests its winner with at least this many votes
+# and at least this share of the token's votes.
+FIRST_WORD_MIN_VOTES: int = 3
+FIRST_WORD_MIN_SHARE: float = 0.5
+
+
+def suggestion_tokens(key: str | None) -> list[str]:
+    """The tokens a merchant key is looked up by, most specific first.
+
+    >>> suggestion_tokens("SCHNUCKS ST LOUIS MO"), suggestion_tokens("NETFLIX.COM")
+    (['SCHNUCKS ST LOUIS MO', 'SCHNUCKS'], ['NETFLIX.COM'])
+    """
+    if not key:
+        return []
+    first_word = key.split(" ", 1)[0]
+    return [key] if first_word == key else [key, first_word]
+
+
+@dataclass
+class CategorySuggester:
+    """Category votes per token, with the winner of each token precomputed.
+
+    Attributes:
+    counts (dict[str, dict[str, int]]): Votes per category for each token.
+
+        >>> suggester = CategorySuggester.from_rows(
+        ...     [("SCHNUCKS ST LOUIS MO", "Groceries", 3), ("SCHNUCKS", "Groceries", 3),
+        ...      ("SCHNUCKS", "Pharmacy", 5)]
+        ... )
+        >>> suggester.suggest("SCHNUCKS ST LOUIS MO"), suggester.suggest("SCHNUCKS MO")
+        ('Groceries', 'Pharmacy')
+        >>> suggester.ranked("SCHNUCKS ST LOUIS MO")
+        ['Groceries', 'Pharmacy']
+        >>> suggester.suggest("ALDI") is None
+        True
+        >>> suggester.suggest("SCHNUCKS MO", first_word=False) is None
+        True
+        >>> CategorySuggester.from_rows([("TRANSFER", "Mortgage", 1)]).suggest(
+        ...     "TRANSFER TO SAVINGS"
+        ... ) is None
+        True
+
+    """
+
+    counts: dict[str, dict[str, int]] = field(default_factory=dict)
+    _best: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+    _trusted: set[str] = field(default_factory=set, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._best = {
+            token: max(votes, key=votes.__getitem__)
+            for token, votes in self.counts.items()
+        }
+        self._trusted = {
+            token
+            for token, votes in self.counts.items()
+            if votes[self._best[token]] >= FIRST_WORD_MIN_VOTES
+            and votes[self._best[token]] >= FIRST_WORD_MIN_SHARE * sum(votes.values())
+        }
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[str, str, int]]) -> "CategorySuggester":
+        """Build a suggester from (token, category, count) rows."""
+        counts: dict[str, dict[str, int]] = {}
+        for token, category, count in rows:
+            counts.setdefault(token, {})[category] = count
+        return cls(counts)
+
+    def suggest(self, key: str | None, first_word: bool = True) -> str | None:
+        """The most chosen category for a merchant key, or None if it is unknown.
+
+        Args:
+        key (str | None): The merchant key.
+        first_word (bool): Fall back to the key's first word, if enough votes
+            agree on it.
+        """
+        tokens = suggestion_tokens(key)
+        if not tokens:
+            return None
+        best = self._best.get(tokens[0])
+        if best is not None or not first_word or len(tokens) == 1:
+            return best
+        return self._best[tokens[1]] if tokens[1] in self._trusted else None
+
+    def ranked(self, key: str | None) -> list[str]:
+        """Every category chosen for a merchant key, most chosen first."""
+        ranked: list[str] = []
+        for token in suggestion_tokens(key):
+            votes = self.counts.get(token, {})
+            for category in sorted(votes, key=lambda category: -votes[category]):
+                if category not in ranked:
+                    ranked.append(category)
+        return ranked
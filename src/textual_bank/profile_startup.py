@@ -0,0 +1,121 @@
+"""Profile cold start of the TUI and check it against a time budget.
+
+Starts the app headless in a fresh interpreter with `-X importtime`, then
+reports the slowest imports and the time from launch to the first painted
+HomeScreen. Exits non-zero when startup is over budget or when a module that
+belongs on the upload path only is imported at startup.
+
+Usage:
+    python profile_startup.py
+    python profile_startup.py --budget 1.0 --top 20
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR: Path = Path(__file__).resolve().parent
+STARTUP_BUDGET: float = 1.0
+# Only the csv ingest path may import these.
+INGEST_ONLY_MODULES: tuple[str, ...] = ("pandas", "numpy")
+
+# Run in the child interpreter: build the app the way app.py does and print the
+# wall clock once the first frame of the HomeScreen has been painted. The
+# database path, if any, is the child's only argument.
+CHILD = """
+import sys
+import time
+from app import Controller
+from data_handler import DataHandler
+from model.model import Model
+
+
+painted = []
+
+
+async def first_paint(pilot) -> None:
+    painted.append(time.time())
+    pilot.app.exit()
+
+
+model = Model(*sys.argv[1:])
+app = Controller(model, DataHandler(model))
+app.run(headless=True, auto_pilot=first_paint)
+model.close_database_connection()
+print(painted[0])
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Parse `-X importtime` output into (module, self us, cumulative us) rows.
+
+    >>> parse_importtime("import time:       308 |     139980 |   textual._on")
+    [('textual._on', 308, 139980)]
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line.removeprefix("import time:").split("|")
+        imports.append((module.strip(), int(own), int(cumulative)))
+    return imports
+
+
+def profile_startup(
+    db_path: str | Path | None = None,
+) -> tuple[float, list[tuple[str, int, int]]]:
+    """Launch the app once and return the seconds to first paint and its imports.
+
+    Args:
+    db_path (str | Path | None): The database to open, defaults to the app's own.
+    """
+    launched = time.time()
+    database = [] if db_path is None else [str(db_path)]
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, *database],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if child.returncode:
+        errors = [
+            line
+            for line in child.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        raise RuntimeError("The app failed to start:\n" + "\n".join(errors))
+    first_paint = float(child.stdout.split()[-1])
+    return first_paint - launched, parse_importtime(child.stderr)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    seconds, imports = profile_startup()
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for module, own, cumulative in sorted(imports, key=lambda row: -row[1])[
+        : args.top
+    ]:
+        print(f"{cumulative / 1000:>14.1f} {own / 1000:>8.1f}  {module}")
+    print(f"\nImports: {sum(own for _, own, _ in imports) / 1e6:.3f}s")
+    print(f"First HomeScreen paint: {seconds:.3f}s (budget {args.budget:.3f}s)")
+
+    failed = False
+    imported = {module for module, _, _ in imports}
+    for module in INGEST_ONLY_MODULES:
+        if module in imported:
+            print(f"FAIL: {module} is imported at startup")
+            failed = True
+    if seconds > args.budget:
+        print("FAIL: startup is over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
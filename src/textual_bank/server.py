@@ -1,9 +1,73 @@
+"""Serve the app in the browser with textual-serve.
+
+Usage:
+    python server.py             # start a fresh app process per session
+    python server.py --pool 2    # hand sessions to warm, pre-forked processes
+"""
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+
 from textual_serve.server import Server
 
+import warm_pool
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--pool",
+        type=int,
+        default=0,
+        help="number of idle app processes to keep warm (0 starts each cold)",
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=warm_pool.DEFAULT_MAX_SESSIONS,
+        help="sessions handed out before the pool recycles itself",
+    )
+    parser.add_argument(
+        "--idle-minutes",
+        type=float,
+        default=warm_pool.DEFAULT_IDLE_MINUTES,
+        help="minutes an idle app process waits before it is replaced",
+    )
+    parser.add_argument("--socket", default=str(warm_pool.DEFAULT_SOCKET))
+    args = parser.parse_args(argv)
+
+    zygote = None
+    command = "python app.py"
+    # The pool forks and passes file descriptors over a unix socket.
+    if args.pool > 0 and hasattr(os, "fork"):
+        script = str(warm_pool.APP_DIR / "warm_pool.py")
+        zygote = subprocess.Popen(
+            [
+                sys.executable,
+                script,
+                "zygote",
+                "--socket",
+                args.socket,
+                "--size",
+                str(args.pool),
+                "--max-sessions",
+                str(args.max_sessions),
+                "--idle-minutes",
+                str(args.idle_minutes),
+            ]
+        )
+        command = shlex.join([sys.executable, script, "attach", "--socket", args.socket])
+    try:
+        server = Server(command, title="Textual Bank")
+        server.serve()
+    finally:
+        if zygote is not None:
+            zygote.terminate()
+            zygote.wait()
 
-def main() -> None:
-    server = Server("python app.py")
-    server.serve()
 
-    if __name__ == "__main__":
-        main()
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,6 @@ This module contains classes for creating, updating, and deleting budget items i
 It uses the textual library to create interactive screens for each operation.
 """
 
-from constants_cat import SELECT_OPTIONS
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import Center, Vertical
@@ -21,16 +20,22 @@ from textual.widgets import (
     Select,
 )
 
+from views.cat_modal import category_options
+
 
 class UpdateBudgetItem(Screen):
     """Screen for updating a budget item."""
 
+    def __init__(self, categories: list[str]):
+        super().__init__()
+        self.categories = categories
+
     def compose(self) -> ComposeResult:
         yield Header()
         with Center():
             yield Input(id="update_item_id", disabled=True)
             yield Select(
-                options=SELECT_OPTIONS,
+                options=category_options(self.categories),
                 prompt="Select a Category",
                 id="update_item_category",
                 allow_blank=False,
@@ -66,11 +71,15 @@ class UpdateBudgetItem(Screen):
 class CreateBudgetItem(Screen):
     """Screen for creating a budget item."""
 
+    def __init__(self, categories: list[str] | None = None):
+        super().__init__()
+        self.categories = categories or []
+
     def compose(self) -> ComposeResult:
         yield Header()
         with Center():
             yield Select(
-                options=SELECT_OPTIONS,
+                options=category_options(self.categories),
                 id="budget_item_category",
                 prompt="Category",
             )
@@ -106,6 +115,11 @@ class BudgetCRUD(Screen):
     2. Budget Item Table.
     """
 
+    def __init__(self):
+        super().__init__()
+        # Category names for the create and update screens, loaded by the app.
+        self.categories: list[str] = []
+
     def compose(self) -> ComposeResult:
         yield Header(id="budget_crud_header", classes="budget_crud")
         yield Footer()
@@ -227,7 +241,9 @@ class BudgetCRUD(Screen):
     @on(Button.Pressed, "#create_budget_item")
     def budget_creation_screen(self):
         """Push the create budget item screen to the app."""
-        self.app.push_screen(screen=CreateBudgetItem(), callback=self.save_budget_item)
+        self.app.push_screen(
+            screen=CreateBudgetItem(self.categories), callback=self.save_budget_item
+        )
 
     @on(DataTable.RowHighlighted, "#budget_data_table")
     def store_highlighted_row(self, event: DataTable.RowHighlighted):
@@ -240,5 +256,6 @@ class BudgetCRUD(Screen):
         """Push the update budget item screen to the app."""
         self.post_message(self.StartBudgetItemUpdate(row_data=self.row_data))
         self.app.push_screen(
-            screen=UpdateBudgetItem(), callback=self.update_budget_item
+            screen=UpdateBudgetItem(self.categories),
+            callback=self.update_budget_item,
         )
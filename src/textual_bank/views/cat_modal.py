@@ -1,20 +1,39 @@
-from constants_cat import SELECT_OPTIONS
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import Container, Vertical
+from textual.message import Message
 from textual.screen import ModalScreen
 from textual.widgets import Button, Label, Select
 
+# Which transactions the chosen category is applied to.
+APPLY_TO_ROW = "row"
+APPLY_TO_SIMILAR = "similar"
+APPLY_TO_EXACT = "exact"
+
+
+def category_options(categories: list[str]) -> list[tuple[str, str]]:
+    """Select options for category names, each shown as itself."""
+    return [(category, category) for category in categories]
+
 
 class CategorySelection(ModalScreen):
     """Modal Screen for selecting transaction categories."""
 
-    def __init__(self, row_values: str):
+    def __init__(self, row_values: str, categories: list[str]):
         super().__init__(row_values)
         self.row_values = row_values
+        self.categories = categories
         self.transaction_description = self.row_values[3]
         self.current_category = self.row_values[4]
 
+    class SuggestionsRequested(Message):
+        """Message to let app know the categories chosen before should be fetched"""
+
+        def __init__(self, modal: "CategorySelection", description: str):
+            self.modal = modal
+            self.description = description
+            super().__init__()
+
     def compose(self) -> ComposeResult:
         yield Vertical(
             Label(
@@ -22,7 +41,7 @@ class CategorySelection(ModalScreen):
                 id="question",
             ),
             Select(
-                options=SELECT_OPTIONS,
+                options=category_options(self.categories),
                 id="category_list",
                 prompt="Select Category",
             ),
@@ -31,6 +50,11 @@ class CategorySelection(ModalScreen):
                 Button("Cancel", id="cancel"),
                 classes="cat_buttons",
             ),
+            Container(
+                Button("All Similar", id="accept_similar"),
+                Button("All Exact Matches", id="accept_exact"),
+                classes="cat_buttons",
+            ),
             id="dialog",
             classes="modal",
         )
@@ -38,8 +62,42 @@ class CategorySelection(ModalScreen):
     def on_mount(self) -> None:
         self.sub_title = "Select Category"
         self.query_one("#category_list", expect_type=Select).expanded = True
+        self.post_message(
+            self.SuggestionsRequested(self, self.transaction_description)
+        )
+
+    def rank_options(self, suggested: list[str]) -> None:
+        """Move the categories chosen before for this merchant to the top."""
+        if not suggested:
+            return
+        select = self.query_one("#category_list", expect_type=Select)
+        select.set_options(
+            category_options(suggested)
+            + category_options(
+                [category for category in self.categories if category not in suggested]
+            )
+        )
+        select.expanded = True
+
+    def accept(self, apply_to: str) -> None:
+        """Return the chosen category, unless none has been picked yet."""
+        select = self.query_one(Select)
+        if select.is_blank():
+            self.notify("Pick a category first", severity="warning")
+            return
+        self.dismiss(result=(select.value, apply_to))
 
     @on(Button.Pressed, "#accept")
     def on_accept(self):
         """Send category and row to DataHandler for updating the database."""
-        self.dismiss(result=self.query_one(Select).value)
+        self.accept(APPLY_TO_ROW)
+
+    @on(Button.Pressed, "#accept_similar")
+    def on_accept_similar(self):
+        """Apply the category to every unprocessed transaction from this merchant."""
+        self.accept(APPLY_TO_SIMILAR)
+
+    @on(Button.Pressed, "#accept_exact")
+    def on_accept_exact(self):
+        """Apply the category to every unprocessed transaction with this description."""
+        self.accept(APPLY_TO_EXACT)
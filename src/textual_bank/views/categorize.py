@@ -1,3 +1,5 @@
+from collections import deque
+
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import Horizontal
@@ -5,14 +7,33 @@ from textual.message import Message
 from textual.reactive import reactive
 from textual.screen import Screen
 from textual.widgets import Button, DataTable, Footer, Header
-from textual.widgets.data_table import ColumnKey
+from textual.widgets.data_table import ColumnKey, RowKey
+
+from views.cat_modal import APPLY_TO_EXACT, APPLY_TO_ROW, CategorySelection
 
-from views.cat_modal import CategorySelection
+
+MAX_PAGES_IN_WINDOW: int = 5
+PREFETCH_ROWS: int = 20
 
 
 class LabelTransactions(Screen):
+    """Screen for triaging unprocessed transactions.
+
+    The table is a sliding window over the unprocessed transactions: pages are
+    requested from the app by keyset as the cursor nears either edge, and at
+    most MAX_PAGES_IN_WINDOW pages are held at once.
+    """
+
     def __init__(self):
         super().__init__()
+        self.loaded_pages: deque[list[tuple[str, int]]] = deque()
+        self.at_newest = True
+        self.at_oldest = False
+        self.page_requested = False
+        # Row key under the cursor, None until the first page is shown.
+        self.current_highlighted_row: RowKey | None = None
+        # Category names for the picker, loaded by the app.
+        self.categories: list[str] = []
 
     BINDINGS = {
         ("a", "accept_transaction()", "Accept Transaction"),
@@ -36,6 +57,16 @@ class LabelTransactions(Screen):
             self.table = table
             super().__init__()
 
+    class CategoryAcceptedForSimilar(Message):
+        """Message to let app know a category applies to every similar transaction"""
+
+        def __init__(self, category: str, row_key, table: DataTable, exact: bool):
+            self.category = category
+            self.row_key = row_key
+            self.table = table
+            self.exact = exact
+            super().__init__()
+
     class ProcessingStatusChange(Message):
         """Message to let app know that the processing status is changing to 'Yes'"""
 
@@ -54,6 +85,23 @@ class LabelTransactions(Screen):
             self.table = table
             super().__init__()
 
+    class PageRequested(Message):
+        """Message to let app know the table needs another page of transactions"""
+
+        def __init__(
+            self,
+            table: DataTable,
+            before: tuple[str, int] | None = None,
+            after: tuple[str, int] | None = None,
+        ):
+            self.table = table
+            self.before = before
+            self.after = after
+            super().__init__()
+
+    class ScreenLeft(Message):
+        """Message to let app know queued edits should be written now"""
+
     def compose(self) -> ComposeResult:
         yield Header()
         yield Footer()
@@ -69,6 +117,85 @@ class LabelTransactions(Screen):
         self.post_message(self.TableMounted(self.table))
         self.table.focus()
 
+    def on_screen_suspend(self) -> None:
+        """Flush queued edits as soon as the user leaves the screen."""
+        self.post_message(self.ScreenLeft())
+
+    def add_page(self, rows: list[tuple], newer: bool = False) -> None:
+        """Add a page of (id, PostedDate, *cells) rows to the window.
+
+        Args:
+        rows (list[tuple]): The page, newest first.
+        newer (bool): True if the page sorts before the rows already shown.
+        """
+        self.page_requested = False
+        if not rows:
+            if newer:
+                self.at_newest = True
+            else:
+                self.at_oldest = True
+            return
+        cursors = [(posted_date, id) for id, posted_date, *_ in rows]
+        highlighted = self.current_highlighted_row
+        # Reshaping the window moves the cursor; those highlights are not the
+        # user's and must not trigger further page requests.
+        with self.table.prevent(DataTable.RowHighlighted):
+            self._reshape_window(rows, cursors, newer)
+            if highlighted is not None and highlighted in self.table.rows:
+                self.table.move_cursor(row=self.table.get_row_index(highlighted))
+        # The highlight events were suppressed, so record the row the cursor
+        # actually landed on.
+        if self.table.row_count:
+            self.current_highlighted_row = self.table.coordinate_to_cell_key(
+                self.table.cursor_coordinate
+            ).row_key
+
+    def _reshape_window(
+        self, rows: list[tuple], cursors: list[tuple[str, int]], newer: bool
+    ) -> None:
+        """Add `rows` at the matching edge of the window and drop the furthest page."""
+        if newer:
+            # DataTable can only append, so the window is redrawn with the new
+            # page on top. The window is bounded, so this stays cheap.
+            kept = [
+                (str(id), self.table.get_row(str(id)))
+                for page in self.loaded_pages
+                for _, id in page
+            ]
+            self.loaded_pages.appendleft(cursors)
+            if len(self.loaded_pages) > MAX_PAGES_IN_WINDOW:
+                dropped = self.loaded_pages.pop()
+                kept = kept[: len(kept) - len(dropped)]
+                self.at_oldest = False
+            self.table.clear()
+            for id, _, *cells in rows:
+                self.table.add_row(*cells, key=str(id))
+            for key, cells in kept:
+                self.table.add_row(*cells, key=key)
+        else:
+            for id, _, *cells in rows:
+                self.table.add_row(*cells, key=str(id))
+            self.loaded_pages.append(cursors)
+            if len(self.loaded_pages) > MAX_PAGES_IN_WINDOW:
+                for _, id in self.loaded_pages.popleft():
+                    self.table.remove_row(str(id))
+                self.at_newest = False
+
+    def request_page_near(self, row_index: int) -> None:
+        """Ask the app for the next page when the cursor nears an edge of the window."""
+        if self.page_requested or not self.loaded_pages:
+            return
+        if row_index >= self.table.row_count - PREFETCH_ROWS and not self.at_oldest:
+            self.page_requested = True
+            self.post_message(
+                self.PageRequested(table=self.table, before=self.loaded_pages[-1][-1])
+            )
+        elif row_index < PREFETCH_ROWS and not self.at_newest:
+            self.page_requested = True
+            self.post_message(
+                self.PageRequested(table=self.table, after=self.loaded_pages[0][0])
+            )
+
     def change_status_to_processed(self):
         """Change the status of the selected transaction to processed."""
         self.table.update_cell(
@@ -86,8 +213,17 @@ class LabelTransactions(Screen):
         )
         self.table.refresh_row(self.table.get_row_index(self.current_highlighted_row))
 
+    def has_highlighted_row(self) -> bool:
+        """True if the cursor is on a row that is still in the table."""
+        return (
+            self.current_highlighted_row is not None
+            and self.current_highlighted_row in self.table.rows
+        )
+
     def action_accept_transaction(self):
         """Accept the selected transaction. Update UI & send message to update DB"""
+        if not self.has_highlighted_row():
+            return
         self.post_message(
             self.ProcessingStatusChange(
                 row_key=self.current_highlighted_row,
@@ -99,23 +235,44 @@ class LabelTransactions(Screen):
 
     def action_flag_transaction(self):
         """Flag the selected transaction. Update UI & send message to update DB"""
+        if not self.has_highlighted_row():
+            return
         self.post_message(
             self.FlagTransaction(row_key=self.current_highlighted_row, table=self.table)
         )
         self.change_status_to_flagged()
 
-    def update_data_table(self, result: str) -> None:
-        """Send a message to controller to update the category of the selected cell."""
-        self.post_message(
-            self.CategoryAccepted(
-                category=result, row_key=self.current_row_key, table=self.table
+    def update_data_table(self, result: tuple[str, str]) -> None:
+        """Send a message to controller to update the category of the selected cell.
+
+        Args:
+        result (tuple[str, str]): The category and what it applies to, see
+            CategorySelection.
+        """
+        category, apply_to = result
+        if not category:
+            return
+        if apply_to == APPLY_TO_ROW:
+            self.post_message(
+                self.CategoryAccepted(
+                    category=category, row_key=self.current_row_key, table=self.table
+                )
+            )
+        else:
+            self.post_message(
+                self.CategoryAcceptedForSimilar(
+                    category=category,
+                    row_key=self.current_row_key,
+                    table=self.table,
+                    exact=apply_to == APPLY_TO_EXACT,
+                )
             )
-        )
 
     @on(DataTable.RowHighlighted, "#transaction_data_table")
     def store_highlighted_row(self, event: DataTable.RowHighlighted):
         """Store the row key of the highlighted row."""
         self.current_highlighted_row = event.row_key
+        self.request_page_near(event.cursor_row)
 
     @on(DataTable.RowSelected, "#transaction_data_table")
     def on_data_table_row_selected(self, event: DataTable.RowSelected):
@@ -123,7 +280,8 @@ class LabelTransactions(Screen):
         self.current_row_key = event.row_key
         self.app.push_screen(
             screen=CategorySelection(
-                row_values=event.data_table.get_row(event.row_key)
+                row_values=event.data_table.get_row(event.row_key),
+                categories=self.categories,
             ),
             callback=self.update_data_table,
         )
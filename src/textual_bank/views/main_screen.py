@@ -17,6 +17,7 @@ class HomeScreen(Screen):
                     "Categorize Transactions", id="categories", classes="mainmenu"
                 )
                 yield Button("Budget Progress", id="budget_review", classes="mainmenu")
+                yield Button("Search Transactions", id="search", classes="mainmenu")
         with Vertical(id="right_column", classes="mainmenu"):
             with Center(id="right_center_menu"):
                 yield Button("Budget CRUD", id="budget_crud", classes="mainmenu")
@@ -0,0 +1,63 @@
+from textual.app import ComposeResult
+from textual.message import Message
+from textual.screen import Screen
+from textual.widgets import DataTable, Footer, Header
+
+REFRESH_SECONDS: float = 1.0
+SPARKS = " ▁▂▃▄▅▆▇█"
+
+
+def sparkline(counts: list[int]) -> str:
+    """Draw a latency histogram as one block character per bucket.
+
+    >>> sparkline([0, 4, 8])
+    ' ▄█'
+    """
+    peak = max(counts) or 1
+    return "".join(SPARKS[round(count / peak * (len(SPARKS) - 1))] for count in counts)
+
+
+class QueryStatsScreen(Screen):
+    """Hidden debug screen with live per-statement database timings.
+
+    Not on the main menu; opened with ctrl+d from anywhere in the app.
+    """
+
+    BINDINGS = [("r", "reset_stats", "Reset counters")]
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield DataTable(id="query_stats_table")
+        yield Footer()
+
+    class StatsRequested(Message):
+        """Message to ask the app for the latest query timings"""
+
+        def __init__(self, table: DataTable, reset: bool = False):
+            self.table = table
+            self.reset = reset
+            super().__init__()
+
+    def on_mount(self) -> None:
+        self.sub_title = "Query Timings"
+        self.table = self.query_one("#query_stats_table", expect_type=DataTable)
+        self.table.cursor_type = "row"
+        self.table.add_columns(
+            "Total ms",
+            "Calls",
+            "Mean ms",
+            "Max ms",
+            "Rows",
+            "Errors",
+            "Lock waits",
+            "Latency (0.1ms..1s+)",
+            "Statement",
+        )
+        self.request_stats()
+        self.set_interval(REFRESH_SECONDS, self.request_stats)
+
+    def request_stats(self) -> None:
+        self.post_message(self.StatsRequested(table=self.table))
+
+    def action_reset_stats(self) -> None:
+        self.post_message(self.StatsRequested(table=self.table, reset=True))
@@ -0,0 +1,85 @@
+from textual import on
+from textual.app import ComposeResult
+from textual.containers import Horizontal
+from textual.message import Message
+from textual.screen import Screen
+from textual.widgets import DataTable, Footer, Header, Input, Label
+
+
+class TransactionSearch(Screen):
+    """Full-text search over every transaction, processed or not.
+
+    Results are requested from the app on every change to the query or the
+    filters; the app cancels a search still running when the next one starts.
+    """
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Horizontal(id="search_filters"):
+            yield Input(
+                placeholder='amazon  groc*  "whole foods"  category:gas',
+                id="search_query",
+            )
+            yield Input(placeholder="From YYYY-MM-DD", id="search_start")
+            yield Input(placeholder="To YYYY-MM-DD", id="search_end")
+            yield Input(placeholder="Min $", id="search_min")
+            yield Input(placeholder="Max $", id="search_max")
+        yield Label(id="search_status")
+        yield DataTable(id="search_results")
+        yield Footer()
+
+    class SearchRequested(Message):
+        """Message to ask the app for the transactions matching the search"""
+
+        def __init__(
+            self,
+            table: DataTable,
+            status: Label,
+            query: str,
+            start: str,
+            end: str,
+            min_amount: str,
+            max_amount: str,
+        ):
+            self.table = table
+            self.status = status
+            self.query = query
+            self.start = start
+            self.end = end
+            self.min_amount = min_amount
+            self.max_amount = max_amount
+            super().__init__()
+
+    def on_mount(self) -> None:
+        self.sub_title = "Search Transactions"
+        self.table = self.query_one("#search_results", expect_type=DataTable)
+        self.table.cursor_type = "row"
+        self.table.add_columns(
+            "AccountType",
+            "PostedDate",
+            "Description",
+            "Category",
+            "Amount",
+            "Processed",
+            "Flagged",
+        )
+        self.query_one("#search_query", expect_type=Input).focus()
+
+    @on(Input.Changed)
+    def request_search(self) -> None:
+        """Search again with the current query and filters."""
+
+        def value(id: str) -> str:
+            return self.query_one(f"#{id}", expect_type=Input).value.strip()
+
+        self.post_message(
+            self.SearchRequested(
+                table=self.table,
+                status=self.query_one("#search_status", expect_type=Label),
+                query=value("search_query"),
+                start=value("search_start"),
+                end=value("search_end"),
+                min_amount=value("search_min"),
+                max_amount=value("search_max"),
+            )
+        )
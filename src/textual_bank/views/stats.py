@@ -1,13 +1,69 @@
 from textual.app import ComposeResult
+from textual.containers import Horizontal, Vertical
+from textual.message import Message
 from textual.screen import Screen
-from textual.widgets import Footer, Header, Placeholder
+from textual.widgets import DataTable, Footer, Header, Label
 
 
 class SpendingStats(Screen):
+    """Spending by category, savings rate and top merchants for the last year.
+
+    The statistics are requested from the app every time the screen is shown;
+    the app computes them from its in-memory snapshot of the transactions.
+    """
+
     def compose(self) -> ComposeResult:
         yield Header()
-        yield Placeholder("This is where spendings stats would go")
+        yield Label(id="stats_status")
+        with Vertical(id="stats_categories_block"):
+            yield Label("Monthly spend by category", classes="stats_title")
+            yield DataTable(id="stats_categories")
+        with Horizontal(id="stats_lower_block"):
+            with Vertical():
+                yield Label("Savings rate", classes="stats_title")
+                yield DataTable(id="stats_savings")
+            with Vertical():
+                yield Label("Top merchants", classes="stats_title")
+                yield DataTable(id="stats_merchants")
         yield Footer()
 
+    class StatsRequested(Message):
+        """Message to ask the app for the latest spending statistics"""
+
+        def __init__(
+            self,
+            status: Label,
+            categories: DataTable,
+            savings: DataTable,
+            merchants: DataTable,
+        ):
+            self.status = status
+            self.categories = categories
+            self.savings = savings
+            self.merchants = merchants
+            super().__init__()
+
     def on_mount(self) -> None:
         self.sub_title = "Monitor Spending/Savings Habits"
+        self.query_one("#stats_categories", expect_type=DataTable).add_columns(
+            "Category", "Latest month", "Month before", "3-month avg", "12-month avg"
+        )
+        self.query_one("#stats_savings", expect_type=DataTable).add_columns(
+            "Month", "Income", "Spend", "Saved", "Rate"
+        )
+        self.query_one("#stats_merchants", expect_type=DataTable).add_columns(
+            "Merchant", "Spend", "Purchases"
+        )
+        for table in self.query(DataTable):
+            table.cursor_type = "row"
+
+    def on_screen_resume(self) -> None:
+        """Refresh the statistics whenever the screen is shown."""
+        self.post_message(
+            self.StatsRequested(
+                status=self.query_one("#stats_status", expect_type=Label),
+                categories=self.query_one("#stats_categories", expect_type=DataTable),
+                savings=self.query_one("#stats_savings", expect_type=DataTable),
+                merchants=self.query_one("#stats_merchants", expect_type=DataTable),
+            )
+        )
@@ -3,11 +3,29 @@ from typing import Iterable
 
 from textual.app import ComposeResult
 from textual.screen import Screen
-from textual.widgets import Button, DirectoryTree, Footer, Header, Input
+from textual.widgets import Button, DataTable, DirectoryTree, Footer, Header, Input
 from textual.containers import Horizontal, Vertical, Center
 from textual import on
 
 
+def selected_files(value: str) -> list[Path]:
+    """Expand what was typed in the file box into the csv files to upload.
+
+    A directory stands for every csv file directly inside it, and a path
+    containing * or ? for every file it matches.
+    """
+    path = Path(value.strip()).expanduser()
+    if path.is_dir():
+        return sorted(
+            child for child in path.iterdir() if child.suffix.lower() == ".csv"
+        )
+    if "*" in path.name or "?" in path.name:
+        return sorted(
+            child for child in path.parent.glob(path.name) if child.is_file()
+        )
+    return [path]
+
+
 class FilteredDirectoryTree(DirectoryTree):
     def filter_paths(self, paths: Iterable[Path]) -> Iterable[Path]:
         return [path for path in paths if not path.name.startswith(".")]
@@ -25,8 +43,12 @@ class UploadScreen(Screen):
                 id="upload_prompt_button",
             )
         with Vertical(id="second_block"):
-            yield Input("Select File to Upload", id="file_name")
+            yield Input(
+                placeholder="Select a file, or a folder to upload every csv in it",
+                id="file_name",
+            )
             yield Button("Submit", id="upload_transactions")
+            yield DataTable(id="upload_progress")
         with Center(id="file_tree_block"):
             yield FilteredDirectoryTree(
                 "../../../",
@@ -38,6 +60,10 @@ class UploadScreen(Screen):
         self.sub_title = "Enter Bank Transcations"
         self.query_one("Header", expect_type=Header).tall = True
         self.query_one("#tree_view").display = False
+        progress = self.query_one("#upload_progress", expect_type=DataTable)
+        for column in ("File", "Status", "Rows", "Written", "Seconds"):
+            progress.add_column(column, key=column)
+        progress.display = False
 
     def on_directory_tree_file_selected(
         self, event: DirectoryTree.FileSelected
@@ -46,6 +72,12 @@ class UploadScreen(Screen):
         self.query_one("#file_name", expect_type=Input).value = str(event.path)
         self.query_one("#file_name").focus()
 
+    def on_directory_tree_directory_selected(
+        self, event: DirectoryTree.DirectorySelected
+    ) -> None:
+        """Called when the user picks a folder, to upload every csv file in it."""
+        self.query_one("#file_name", expect_type=Input).value = str(event.path)
+
     @on(Button.Pressed, "#upload_prompt_button")
     def toggle_file_tree(self):
         tree = self.query_one("#tree_view")
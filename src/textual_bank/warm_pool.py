@@ -0,0 +1,302 @@
+"""A pool of warm, pre-forked app processes for textual-serve.
+
+textual-serve starts its command once per browser session, so every session
+used to pay for a fresh interpreter importing pandas and Textual. In pool mode
+the command is a thin relay instead: it hands its stdin, stdout and stderr to
+an idle app process and waits for it to finish. App processes are forked from a
+zygote that has already imported the app and migrated the database, and each
+one opens its own connections and parses its stylesheets before it goes idle.
+
+Usage:
+    python warm_pool.py zygote --socket /tmp/textual-bank.sock --size 2
+    python warm_pool.py attach --socket /tmp/textual-bank.sock
+
+The socket lives in a directory only the user can enter, and each side checks
+the other is the same user before any file descriptor changes hands, since the
+relay hands over the browser session's stdio.
+
+Only the standard library is imported at module level so the relay starts fast.
+"""
+
+import argparse
+import getpass
+import json
+import os
+import select
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+APP_DIR: Path = Path(__file__).resolve().parent
+# $XDG_RUNTIME_DIR is private to the user; otherwise a private directory is made
+# in the temporary directory.
+DEFAULT_SOCKET: Path = (
+    Path(os.environ["XDG_RUNTIME_DIR"]) / "textual-bank.sock"
+    if os.environ.get("XDG_RUNTIME_DIR")
+    else Path(tempfile.gettempdir()) / f"textual-bank-{getpass.getuser()}" / "pool.sock"
+)
+DEFAULT_POOL_SIZE: int = 2
+DEFAULT_MAX_SESSIONS: int = 50
+DEFAULT_IDLE_MINUTES: float = 30.0
+CONNECT_TIMEOUT: float = 5.0
+
+# Textual reads these when it is imported, so the zygote sets them up front to
+# the values textual-serve gives every app.
+WEB_ENVIRONMENT: dict[str, str] = {
+    "TEXTUAL_DRIVER": "textual.drivers.web_driver:WebDriver",
+    "TEXTUAL_FPS": "60",
+    "TEXTUAL_COLOR_SYSTEM": "truecolor",
+}
+# Set by textual-serve per session and forwarded by the relay.
+SESSION_ENVIRONMENT: tuple[str, ...] = (
+    "COLUMNS",
+    "ROWS",
+    "TERM_PROGRAM",
+    "TERM_PROGRAM_VERSION",
+    "TEXTUAL",
+    "TEXTUAL_LOG",
+)
+
+
+def check_private_directory(path: Path, create: bool = False) -> None:
+    """Make sure only this user can reach the sockets in `path`.
+
+    Raises:
+    PermissionError: If `path` is a symlink, belongs to another user, or can be
+        entered by anyone else.
+    FileNotFoundError: If `path` does not exist and `create` is not set.
+    """
+    if create:
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    status = os.lstat(path)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by this user")
+    if status.st_mode & 0o077:
+        raise PermissionError(f"{path} can be reached by other users; chmod 700 it")
+
+
+def peer_uid(connection: socket.socket) -> int | None:
+    """The user id of the process at the other end, if the platform reports it."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = connection.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _pid, uid, _gid = struct.unpack("3i", credentials)
+    return uid
+
+
+def warm_up() -> None:
+    """Import the app and migrate the database, once."""
+    os.environ.update(WEB_ENVIRONMENT)
+    sys.path.insert(0, str(APP_DIR))
+    import app  # noqa: F401
+    from model.model import Model
+
+    Model().close_database_connection()
+
+
+def run_worker(listener: socket.socket, busy: int, idle_seconds: float) -> int:
+    """Wait for one session in a freshly forked process and run the app for it.
+
+    Args:
+    listener (socket): The pool socket relays connect to.
+    busy (int): Pipe the zygote reads to learn a worker has taken a session.
+    idle_seconds (float): How long to wait for a session before retiring.
+
+    Returns:
+    int: The exit code of the app, or 0 if the worker retired idle.
+    """
+    from textual.css.stylesheet import Stylesheet
+
+    from app import Controller
+    from data_handler import DataHandler
+    from model.model import Model
+
+    model = Model()
+    data_handler = DataHandler(model)
+    # The app itself is built once the session's environment is in place, but
+    # a stylesheet caches the rules it parses, so the app is handed one that
+    # has already parsed its files.
+    idle_app = Controller(model, data_handler)
+    stylesheet = Stylesheet(variables=idle_app.get_css_variables())
+    stylesheet.read_all(idle_app.css_path)
+    stylesheet.parse()
+    listener.settimeout(idle_seconds)
+    try:
+        connection, _ = listener.accept()
+    except TimeoutError:
+        model.close_database_connection()
+        return 0
+    try:
+        os.write(busy, f"{os.getpid()}\n".encode())
+    except OSError:
+        pass  # The zygote is gone; there is nobody to replace us.
+    with connection:
+        if peer_uid(connection) not in (None, os.getuid()):
+            return 1
+        message, fds, _, _ = socket.recv_fds(connection, 64 * 1024, 3)
+        os.environ.update(json.loads(message))
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        app = Controller(model, data_handler)
+        app.stylesheet = stylesheet
+        app.run()
+        data_handler.flush_pending_writes()
+        return_code = app.return_code or 0
+        connection.sendall(str(return_code).encode())
+    return return_code
+
+
+def fork_worker(listener: socket.socket, busy: int, idle_seconds: float) -> int:
+    """Fork a worker off the zygote and return its pid."""
+    pid = os.fork()
+    if pid:
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        return_code = run_worker(listener, busy, idle_seconds)
+    except BaseException:
+        traceback.print_exc()
+        return_code = 1
+    os._exit(return_code)
+
+
+def serve_pool(
+    listener: socket.socket,
+    args: argparse.Namespace,
+    busy: tuple[int, int] | None = None,
+    idle: set[int] | None = None,
+) -> None:
+    """Keep `args.size` idle workers forked until `args.max_sessions` are handed out.
+
+    Idle workers retire after `args.idle_minutes` and are replaced. After
+    `args.max_sessions` the zygote re-executes itself, so a long-running server
+    picks up code changes and sheds any state that built up in the zygote. The
+    socket, the busy pipe and the idle workers are all handed over to the new
+    image, so no session is refused or cut short while it warms up.
+    """
+    busy_read, busy_write = busy or os.pipe()
+    idle = idle or set()
+    sessions = 0
+
+    def stop(signum, frame) -> None:
+        for pid in idle:
+            os.kill(pid, signal.SIGTERM)
+        args.socket.unlink(missing_ok=True)
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    while sessions < args.max_sessions:
+        while len(idle) < args.size:
+            idle.add(fork_worker(listener, busy_write, args.idle_minutes * 60))
+        readable, _, _ = select.select([busy_read], [], [], 1.0)
+        if readable:
+            for line in os.read(busy_read, 4096).split():
+                idle.discard(int(line))
+                sessions += 1
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                break
+            idle.discard(pid)
+    for fd in (listener.fileno(), busy_read, busy_write):
+        os.set_inheritable(fd, True)
+    argv = [sys.executable, __file__, "zygote"]
+    for name in ("socket", "size", "max_sessions", "idle_minutes"):
+        argv += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    argv += ["--fd", str(listener.fileno()), "--busy-fds", f"{busy_read},{busy_write}"]
+    if idle:
+        argv += ["--adopt", ",".join(map(str, idle))]
+    os.execv(sys.executable, argv)
+
+
+def zygote(args: argparse.Namespace) -> int:
+    """Warm up, then serve the pool on the socket."""
+    warm_up()
+    if args.fd is not None:
+        listener = socket.socket(fileno=args.fd)
+    else:
+        check_private_directory(args.socket.parent, create=True)
+        args.socket.unlink(missing_ok=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(str(args.socket))
+        listener.listen()
+    busy = tuple(map(int, args.busy_fds.split(","))) if args.busy_fds else None
+    idle = set(map(int, args.adopt.split(","))) if args.adopt else None
+    serve_pool(listener, args, busy, idle)
+    return 0
+
+
+def start_cold(reason: str) -> None:
+    """Replace this process with a fresh app, explaining why on stderr."""
+    print(f"{reason}, starting cold", file=sys.stderr)
+    os.chdir(APP_DIR)
+    os.execv(sys.executable, [sys.executable, "app.py"])
+
+
+def attach(args: argparse.Namespace) -> int:
+    """Hand this process's stdio to a warm worker and wait for the app to exit.
+
+    Falls back to starting the app cold if the pool cannot be reached, or if
+    the socket or the process listening on it belongs to another user.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        try:
+            check_private_directory(args.socket.parent)
+            if os.lstat(args.socket).st_uid != os.getuid():
+                raise PermissionError(f"{args.socket} belongs to another user")
+            connection.connect(str(args.socket))
+            if peer_uid(connection) not in (None, os.getuid()):
+                raise PermissionError(f"{args.socket} is served by another user")
+            break
+        except PermissionError as error:
+            start_cold(f"Warm pool refused: {error}")
+        except OSError:
+            if time.monotonic() > deadline:
+                start_cold("Warm pool unavailable")
+            time.sleep(0.05)
+    environment = {
+        name: os.environ[name] for name in SESSION_ENVIRONMENT if name in os.environ
+    }
+    with connection:
+        socket.send_fds(connection, [json.dumps(environment).encode()], [0, 1, 2])
+        return_code = connection.recv(16)
+    return int(return_code or 1)
+
+
+COMMANDS = {
+    "zygote": zygote,
+    "attach": attach,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET)
+    parser.add_argument("--size", type=int, default=DEFAULT_POOL_SIZE)
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    parser.add_argument("--idle-minutes", type=float, default=DEFAULT_IDLE_MINUTES)
+    # Used by the zygote to hand its state over when it recycles itself.
+    parser.add_argument("--fd", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--busy-fds", help=argparse.SUPPRESS)
+    parser.add_argument("--adopt", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+"""Import bank csv exports as they appear in a folder, without the UI.
+
+Usage:
+    python watch_folder.py ~/Downloads
+    python watch_folder.py ~/Downloads --pattern "*transactions*.csv" --interval 10
+    python watch_folder.py ~/Downloads --once
+
+Every poll lists the folder and compares each matching file's size and
+modification time with the ingest_manifest table, so a folder with nothing
+new costs one stat per file. A file whose size or mtime changed is hashed,
+and only parsed when its content has not been imported before, under any
+name. Imports go through `Model.upload_dataframe`, the same pipeline as the
+upload screen, and a failed file is not retried until it changes again.
+
+pandas is only loaded by the first import, so an idle watcher stays small.
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from model.model import Model
+
+DEFAULT_PATTERN: str = "*.csv"
+DEFAULT_INTERVAL: float = 5.0
+# Files modified more recently than this may still be downloading.
+SETTLE_SECONDS: float = 2.0
+HASH_BLOCK_BYTES: int = 1 << 20
+
+
+def file_sha1(path: Path) -> str:
+    """Hash the content of a file without reading it into memory at once."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        while block := file.read(HASH_BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class FolderWatcher:
+    """Polls a folder and imports the csv files that are new or changed.
+
+    Attributes:
+    model (Model): The model whose database files are imported into.
+    folder (Path): The folder that is watched, not recursively.
+    pattern (str): Glob the file names have to match.
+    manifest (dict[str, tuple[int, int, str]]): Size, mtime_ns and sha1 of
+        every file seen, by path, as stored in ingest_manifest.
+    """
+
+    model: Model
+    folder: Path
+    pattern: str = DEFAULT_PATTERN
+    manifest: dict[str, tuple[int, int, str]] = field(default_factory=dict)
+    _hashes: set[str] = field(default_factory=set, repr=False)
+
+    def __post_init__(self) -> None:
+        self.folder = self.folder.expanduser().resolve()
+        self.manifest = self.model.ingest_manifest()
+        self._hashes = {sha1 for _, _, sha1 in self.manifest.values()}
+
+    def changed_files(self) -> list[tuple[Path, os.stat_result]]:
+        """Return the settled files whose size or mtime differ from the manifest."""
+        settled = time.time() - SETTLE_SECONDS
+        changed = []
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                path = Path(entry.path)
+                if not path.match(self.pattern) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > settled:
+                    continue
+                known = self.manifest.get(entry.path)
+                if known is None or known[:2] != (stat.st_size, stat.st_mtime_ns):
+                    changed.append((path, stat))
+        return sorted(changed, key=lambda item: item[1].st_mtime_ns)
+
+    def poll(self) -> int:
+        """Import every new or changed file in the folder.
+
+        Returns:
+        int: The number of files parsed.
+        """
+        parsed = 0
+        for path, stat in self.changed_files():
+            sha1 = file_sha1(path)
+            if sha1 in self._hashes:
+                # Touched, copied or downloaded again: nothing new to parse.
+                print(f"Skipped {path.name}: already imported")
+                self.record(path, stat, sha1)
+                continue
+            parsed += 1
+            try:
+                report = self.model.upload_dataframe(path)
+            except Exception as e:
+                print(f"Failed to import {path.name}: {e}")
+                self.record(path, stat, sha1, error=str(e) or type(e).__name__)
+                continue
+            print(report)
+            self.record(path, stat, sha1, report.rows_read, report.rows_written)
+        return parsed
+
+    def record(
+        self,
+        path: Path,
+        stat: os.stat_result,
+        sha1: str,
+        rows_read: int = 0,
+        rows_written: int = 0,
+        error: str | None = None,
+    ) -> None:
+        """Store the file in the manifest so it is skipped until it changes."""
+        self.model.record_ingested_file(
+            str(path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            sha1,
+            rows_read,
+            rows_written,
+            error,
+        )
+        self.manifest[str(path)] = (stat.st_size, stat.st_mtime_ns, sha1)
+        if error is None:
+            self._hashes.add(sha1)
+
+    def run(self, interval: float = DEFAULT_INTERVAL) -> None:
+        """Poll the folder every `interval` seconds until interrupted."""
+        print(f"Watching {self.folder / self.pattern} every {interval:g}s")
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("folder", type=Path)
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument(
+        "--once", action="store_true", help="poll a single time and exit"
+    )
+    args = parser.parse_args(argv)
+    if not args.folder.expanduser().is_dir():
+        parser.error(f"{args.folder} is not a folder")
+    model = Model()
+    try:
+        watcher = FolderWatcher(model, args.folder, args.pattern)
+        if args.once:
+            watcher.poll()
+        else:
+            watcher.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        model.close_database_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
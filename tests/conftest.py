@@ -0,0 +1,41 @@
+import csv
+from pathlib import Path
+
+import pytest
+
+from model.ingest import CSV_COLUMNS
+from model.model import Model
+
+
+def export_row(
+    posted: str,
+    description: str,
+    amount: str,
+    balance: str,
+    account: str = "1000",
+) -> list[str]:
+    """One row of a bank export, in CSV_COLUMNS order."""
+    account_type = "Savings" if account == "2000" else "Checking"
+    return [account, account_type, posted, amount, description, "", "", balance, "", ""]
+
+
+@pytest.fixture
+def write_export(tmp_path):
+    """Write rows to a csv export in the test's directory and return its path."""
+
+    def write(rows: list[list[str]], name: str = "export.csv") -> Path:
+        path = tmp_path / name
+        with path.open("w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_COLUMNS)
+            writer.writerows(rows)
+        return path
+
+    return write
+
+
+@pytest.fixture
+def model(tmp_path):
+    model = Model(db_path=tmp_path / "the_bank.db")
+    yield model
+    model.close_database_connection()
@@ -0,0 +1,45 @@
+from model.analytics import TransactionSnapshot, spending_report
+from tests.conftest import export_row
+
+
+def test_transfers_between_accounts_are_left_out_of_savings(model, write_export):
+    model.upload_dataframe(
+        write_export(
+            [
+                export_row("2025-03-01", "ACH:BLACK & VEATCH", "$2,000.00", "$2,000"),
+                export_row("2025-03-02", "SCHNUCKS #42", "($500.00)", "$1,500.00"),
+                export_row("2025-03-03", "Transfer out", "($1,000.00)", "$500.00"),
+                export_row("2025-03-03", "Transfer in", "$1,000.00", "$1,000", "2000"),
+            ]
+        )
+    )
+
+    report = model.spending_report()
+
+    assert report.savings == [("2025-03", 200000, 50000, 150000, 0.75)]
+
+
+def test_snapshot_rebuilds_when_the_change_log_was_trimmed(model, write_export):
+    model.upload_dataframe(
+        write_export(
+            [
+                export_row("2025-03-01", "SCHNUCKS #42", "($10.00)", "$990.00"),
+                export_row("2025-03-02", "SCHNUCKS #43", "($20.00)", "$970.00"),
+            ]
+        )
+    )
+    snapshot = TransactionSnapshot()
+    snapshot.refresh(model.con)
+    model.con.execute("UPDATE MyAccounts SET Amount = -1500 WHERE id = 1")
+    model.con.execute("UPDATE MyAccounts SET Amount = -2500 WHERE id = 2")
+    # What the cap does once the log is long: the oldest entry is gone.
+    model.con.execute(
+        "DELETE FROM transaction_changes WHERE seq = "
+        "(SELECT MIN(seq) FROM transaction_changes)"
+    )
+    model.con.commit()
+
+    snapshot.refresh(model.con)
+
+    assert snapshot.amounts.tolist() == [-1500, -2500]
+    assert spending_report(snapshot).savings[0][2] == 4000
@@ -0,0 +1,211 @@
+import sqlite3
+
+import pytest
+
+from model.bulk import BulkLoader
+from model.model import Model
+from model.schema import MIGRATIONS, schema_version
+from tests.conftest import export_row
+
+# Two identical coffees on the same day differ only in the running balance, so
+# they are two transactions and both must be kept.
+EXPORT_ROWS: list[list[str]] = [
+    export_row("2025-03-03", "STARBUCKS 123", "($4.50)", "$995.50"),
+    export_row("2025-03-03", "STARBUCKS 123", "($4.50)", "$991.00"),
+    export_row("2025-03-03", "SCHNUCKS #42", "($60.00)", "$931.00"),
+    export_row("2025-03-04", "DIVIDEND PAID", "$1,200.00", "$2,131.00"),
+    export_row("2025-03-04", "STARBUCKS 123", "($4.50)", "$95.50", "2000"),
+]
+
+# The tables as the app created them before the schema was versioned.
+BASELINE_SCHEMA: str = """
+CREATE TABLE "MyAccounts" (
+"Description" TEXT,
+  "PostedDate" TIMESTAMP,
+  "AccountNumber" INTEGER,
+  "AccountType" TEXT,
+  "Amount" REAL,
+  "CheckNumber" REAL,
+  "Category" TEXT,
+  "Balance" REAL,
+  "Labels" REAL,
+  "Note" REAL,
+  "Processed" TEXT,
+  "Flagged" TEXT
+);
+CREATE TABLE budget_goals (
+id INTEGER PRIMARY KEY AUTOINCREMENT,
+category TEXT,
+goal INTEGER,
+active INTEGER,
+date_added TEXT,
+date_modified TEXT
+    );
+CREATE TRIGGER deactivate_old_budget_goals
+AFTER INSERT ON `budget_goals` FOR EACH ROW
+BEGIN
+UPDATE budget_goals SET active = FALSE
+WHERE category = NEW.category
+AND NOT (id = NEW.id);
+END;
+"""
+
+
+@pytest.fixture
+def export(write_export):
+    return write_export(EXPORT_ROWS)
+
+
+def test_import_keeps_same_day_duplicates(model, export):
+    report = model.upload_dataframe(export)
+
+    assert report.error is None
+    assert report.rows_written == len(EXPORT_ROWS)
+    coffees = model.con.execute(
+        "SELECT Amount, Balance FROM MyAccounts "
+        "WHERE Description = 'STARBUCKS 123' AND AccountNumber = '1000' "
+        "ORDER BY Balance"
+    ).fetchall()
+    assert coffees == [(-450, 99100), (-450, 99550)]
+
+
+def test_reimporting_an_export_writes_nothing(model, export):
+    model.upload_dataframe(export)
+
+    report = model.upload_dataframe(export)
+
+    assert report.error is None
+    assert report.rows_written == 0
+    count = model.con.execute("SELECT COUNT(*) FROM MyAccounts").fetchone()[0]
+    assert count == len(EXPORT_ROWS)
+
+
+def test_rows_before_the_account_watermark_are_skipped(model, write_export):
+    model.upload_dataframe(
+        write_export(
+            [export_row("2025-03-20", "SCHNUCKS #42", "($60.00)", "$940.00")],
+            "march.csv",
+        )
+    )
+
+    report = model.upload_dataframe(
+        write_export(
+            [
+                # Before 2025-03-20 less WATERMARK_OVERLAP_DAYS: never read.
+                export_row("2025-03-12", "LATE POSTING", "($1.00)", "$999.00"),
+                export_row("2025-03-13", "POSTED LATE", "($2.00)", "$998.00"),
+                export_row("2025-03-25", "STARBUCKS 123", "($4.50)", "$935.50"),
+                # Nothing is stored for this account, so all of it is new.
+                export_row("2024-01-01", "OPENING DEPOSIT", "$95.50", "$95.50", "2000"),
+            ],
+            "april.csv",
+        )
+    )
+
+    assert report.rows_written == 3
+    stored = model.con.execute(
+        "SELECT Description FROM MyAccounts ORDER BY id"
+    ).fetchall()
+    assert stored == [
+        ("SCHNUCKS #42",),
+        ("POSTED LATE",),
+        ("STARBUCKS 123",),
+        ("OPENING DEPOSIT",),
+    ]
+
+
+def test_rows_without_a_valid_amount_or_balance_are_skipped(model, write_export):
+    report = model.upload_dataframe(
+        write_export(
+            [
+                export_row("2025-03-03", "STARBUCKS 123", "($4.50)", "$995.50"),
+                export_row("2025-03-03", "PENDING", "", "$995.50"),
+                export_row("2025-03-03", "SCHNUCKS #42", "($60.00)", "n/a"),
+            ]
+        )
+    )
+
+    assert (report.rows_read, report.rows_written, report.rows_invalid) == (3, 1, 2)
+    stored = model.con.execute("SELECT Description, Amount FROM MyAccounts").fetchall()
+    assert stored == [("STARBUCKS 123", -450)]
+
+
+def test_chunks_are_written_in_transactions_of_their_own(model, export):
+    report = model.upload_dataframe(export, chunksize=2)
+
+    assert (report.rows_read, report.rows_written) == (5, 5)
+    count = model.con.execute("SELECT COUNT(*) FROM MyAccounts").fetchone()[0]
+    assert count == len(EXPORT_ROWS)
+
+
+def test_a_failing_chunk_only_rolls_back_its_own_rows(model, export, monkeypatch):
+    load = BulkLoader.load
+    calls = []
+
+    def load_then_fail_on_the_second_chunk(self, columns):
+        calls.append(load(self, columns))
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("disk I/O error")
+        return calls[-1]
+
+    monkeypatch.setattr(BulkLoader, "load", load_then_fail_on_the_second_chunk)
+
+    with pytest.raises(sqlite3.OperationalError):
+        model.upload_dataframe(export, chunksize=2)
+
+    assert calls == [2, 2]
+    stored = model.con.execute(
+        "SELECT Description, Balance FROM MyAccounts ORDER BY id"
+    ).fetchall()
+    assert stored == [("STARBUCKS 123", 99550), ("STARBUCKS 123", 99100)]
+    searchable = model.con.execute(
+        "SELECT COUNT(*) FROM transaction_search WHERE transaction_search MATCH ?",
+        ('"STARBUCKS"',),
+    ).fetchone()[0]
+    assert searchable == 2
+
+
+def test_import_indexes_for_search_without_changing_the_schema(model, export):
+    cookie = model.con.execute("PRAGMA schema_version").fetchone()[0]
+
+    model.upload_dataframe(export)
+
+    assert model.con.execute("PRAGMA schema_version").fetchone()[0] == cookie
+    assert model.con.execute("SELECT COUNT(*) FROM bulk_load").fetchone()[0] == 0
+    matches = model.con.execute(
+        "SELECT COUNT(*) FROM transaction_search WHERE transaction_search MATCH ?",
+        ('"STARBUCKS"',),
+    ).fetchone()[0]
+    assert matches == 3
+
+
+def test_migrate_upgrades_a_baseline_database(tmp_path):
+    db_path = tmp_path / "the_bank.db"
+    con = sqlite3.connect(db_path)
+    con.executescript(BASELINE_SCHEMA)
+    con.execute(
+        "INSERT INTO MyAccounts VALUES "
+        "('NETFLIX.COM', '2025-03-01 00:00:00', 1000, 'Checking', -15.99, NULL, "
+        "'Netflix', 984.01, NULL, NULL, 'Yes', '')"
+    )
+    con.executemany(
+        "INSERT INTO budget_goals (category, goal, active, date_added) "
+        "VALUES (?, ?, ?, ?)",
+        [("Netflix", 15.99, True, "2025-03-01"), ("Gas", 120, True, "2025-03-01")],
+    )
+    con.commit()
+    con.close()
+
+    model = Model(db_path=db_path)
+    try:
+        assert schema_version(model.con) == len(MIGRATIONS) == 16
+        assert model.con.execute(
+            "SELECT Amount, Balance FROM MyAccounts"
+        ).fetchall() == [(-1599, 98401)]
+        goals = model.con.execute(
+            "SELECT c.name, bg.goal FROM budget_goals AS bg "
+            "JOIN categories AS c ON c.id = bg.category_id ORDER BY c.name"
+        ).fetchall()
+        assert goals == [("Gas", 12000), ("Netflix", 1599)]
+    finally:
+        model.close_database_connection()
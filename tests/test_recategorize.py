@@ -0,0 +1,52 @@
+import pytest
+
+from tests.conftest import export_row
+
+
+@pytest.fixture
+def transactions(model, write_export):
+    model.upload_dataframe(
+        write_export(
+            [
+                export_row("2025-03-01", "SCHNUCKS #42", "($10.00)", "$990.00"),
+                export_row("2025-03-02", "SCHNUCKS #42", "($20.00)", "$970.00"),
+                export_row("2025-03-03", "SCHNUCKS #43", "($30.00)", "$940.00"),
+                export_row("2025-03-04", "SCHNUCKS #44", "($40.00)", "$900.00"),
+                export_row("2025-03-05", "STARBUCKS 123", "($4.50)", "$895.50"),
+            ]
+        )
+    )
+    # The last SCHNUCKS was categorized already and must keep its category.
+    model.apply_transaction_updates({4: "Groceries/House Supplies"}, {}, set())
+    return model
+
+
+def categories(model) -> list[tuple[int, str | None, str]]:
+    return model.con.execute(
+        "SELECT a.id, c.name, a.Processed FROM MyAccounts AS a "
+        "LEFT JOIN categories AS c ON c.id = a.CategoryId ORDER BY a.id"
+    ).fetchall()
+
+
+def test_similar_updates_unprocessed_rows_of_the_same_merchant(transactions):
+    updated = transactions.recategorize_similar(1, "Dog Food")
+
+    assert sorted(updated) == [1, 2, 3]
+    assert categories(transactions) == [
+        (1, "Dog Food", "Yes"),
+        (2, "Dog Food", "Yes"),
+        (3, "Dog Food", "Yes"),
+        (4, "Groceries/House Supplies", "Yes"),
+        (5, None, "No"),
+    ]
+
+
+def test_exact_only_updates_the_same_description(transactions):
+    updated = transactions.recategorize_similar(2, "Dog Food", exact=True)
+
+    assert sorted(updated) == [1, 2]
+    assert categories(transactions)[:3] == [
+        (1, "Dog Food", "Yes"),
+        (2, "Dog Food", "Yes"),
+        (3, "Groceries/House Supplies", "No"),
+    ]
@@ -0,0 +1,62 @@
+import pytest
+
+from model.search import fts_query
+from tests.conftest import export_row
+
+
+@pytest.fixture
+def transactions(model, write_export):
+    model.upload_dataframe(
+        write_export(
+            [
+                export_row("2025-02-27", "AMZN.COM/BILL*2K4 WA", "($12.00)", "$988.00"),
+                export_row("2025-03-01", "AMZN.COM/BILL*7Q1 WA", "($45.00)", "$943.00"),
+                export_row("2025-03-02", "AMZN MKTP US", "($80.00)", "$863.00"),
+                export_row("2025-03-03", "AMZN.COM/BILL REFUND", "$60.00", "$923.00"),
+                export_row("2025-03-31", "AMZN.COM/BILL*9Z2 WA", "($150.00)", "$773"),
+            ]
+        )
+    )
+    return model
+
+
+def descriptions(rows: list[tuple]) -> list[str]:
+    return sorted(row[3] for row in rows)
+
+
+def test_fts_query_quotes_punctuation_into_a_phrase():
+    assert fts_query("AMZN.COM/BILL") == '"AMZN.COM/BILL"'
+    assert fts_query("amzn.com/bill*") == '"amzn.com/bill"*'
+
+
+def test_search_matches_a_term_with_punctuation(transactions):
+    rows = transactions.search_transactions("AMZN.COM/BILL")
+
+    assert descriptions(rows) == [
+        "AMZN.COM/BILL REFUND",
+        "AMZN.COM/BILL*2K4 WA",
+        "AMZN.COM/BILL*7Q1 WA",
+        "AMZN.COM/BILL*9Z2 WA",
+    ]
+
+
+def test_search_applies_the_date_filters(transactions):
+    rows = transactions.search_transactions(
+        "amzn", start="2025-03-01", end="2025-03-03"
+    )
+
+    assert descriptions(rows) == [
+        "AMZN MKTP US",
+        "AMZN.COM/BILL REFUND",
+        "AMZN.COM/BILL*7Q1 WA",
+    ]
+
+
+def test_search_compares_amounts_by_size(transactions):
+    rows = transactions.search_transactions("amzn", min_cents=4500, max_cents=8000)
+
+    assert descriptions(rows) == [
+        "AMZN MKTP US",
+        "AMZN.COM/BILL REFUND",
+        "AMZN.COM/BILL*7Q1 WA",
+    ]
@@ -0,0 +1,16 @@
+from model.model import Model
+from profile_startup import INGEST_ONLY_MODULES, STARTUP_BUDGET, profile_startup
+
+
+def test_first_paint_is_within_budget(tmp_path):
+    db_path = tmp_path / "the_bank.db"
+    # Migrate up front so the budget covers opening an existing database.
+    Model(db_path=db_path).close_database_connection()
+
+    seconds, imports = profile_startup(db_path)
+
+    # The child exits right after the first paint, so anything it imported
+    # was in sys.modules when the HomeScreen was painted.
+    imported = {module for module, _, _ in imports}
+    assert imported.isdisjoint(INGEST_ONLY_MODULES)
+    assert seconds <= STARTUP_BUDGET
@@ -0,0 +1,82 @@
+from tests.conftest import export_row
+
+
+def categorized(model, description: str) -> str | None:
+    return model.con.execute(
+        "SELECT c.name FROM MyAccounts AS a "
+        "LEFT JOIN categories AS c ON c.id = a.CategoryId WHERE a.Description = ?",
+        (description,),
+    ).fetchone()[0]
+
+
+def categorize(model, description: str, category: str) -> None:
+    (id,) = model.con.execute(
+        "SELECT id FROM MyAccounts WHERE Description = ?", (description,)
+    ).fetchone()
+    model.apply_transaction_updates({id: category}, {}, set())
+
+
+def test_rules_win_over_a_first_word_chosen_once(model, write_export):
+    model.upload_dataframe(
+        write_export(
+            [
+                export_row(
+                    "2025-03-01", "TRANSFER TO MORTGAGE ESCROW", "($900.00)", "$100.00"
+                )
+            ],
+            "march.csv",
+        )
+    )
+    categorize(model, "TRANSFER TO MORTGAGE ESCROW", "JPMorgan Chase - Mortgage")
+
+    model.upload_dataframe(
+        write_export(
+            [export_row("2025-04-01", "Transfer to savings 55", "($50.00)", "$50.00")],
+            "april.csv",
+        )
+    )
+
+    assert categorized(model, "Transfer to savings 55") == "Money towards savings"
+
+
+def test_a_merchant_chosen_before_wins_over_the_rules(model, write_export):
+    model.upload_dataframe(
+        write_export(
+            [export_row("2025-03-01", "SCHNUCKS #12 CLAYTON MO", "($9.00)", "$91.00")],
+            "march.csv",
+        )
+    )
+    categorize(model, "SCHNUCKS #12 CLAYTON MO", "Dog Food")
+
+    model.upload_dataframe(
+        write_export(
+            [export_row("2025-04-01", "SCHNUCKS #40 CLAYTON MO", "($9.00)", "$82.00")],
+            "april.csv",
+        )
+    )
+
+    assert categorized(model, "SCHNUCKS #40 CLAYTON MO") == "Dog Food"
+
+
+def test_a_first_word_only_fills_in_once_enough_votes_agree(model, write_export):
+    stores = ["ALDI 1 CLAYTON MO", "ALDI 2 BRENTWOOD MO", "ALDI 3 KIRKWOOD MO"]
+    model.upload_dataframe(
+        write_export(
+            [
+                export_row("2025-03-01", store, "($9.00)", f"${90 - 9 * i}.00")
+                for i, store in enumerate(stores)
+            ],
+            "march.csv",
+        )
+    )
+    for store in stores:
+        categorize(model, store, "Groceries/House Supplies")
+
+    model.upload_dataframe(
+        write_export(
+            [export_row("2025-04-01", "ALDI 4 AFFTON MO", "($9.00)", "$54.00")],
+            "april.csv",
+        )
+    )
+
+    assert categorized(model, "ALDI 4 AFFTON MO") == "Groceries/House Supplies"
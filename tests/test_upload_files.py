@@ -0,0 +1,26 @@
+from model.ingest import upload_csvs
+from tests.conftest import export_row
+
+
+def test_a_broken_file_is_reported_and_the_others_imported(
+    model, write_export, tmp_path
+):
+    march = write_export(
+        [export_row("2025-03-01", "SCHNUCKS #42", "($10.00)", "$990.00")], "march.csv"
+    )
+    broken = tmp_path / "broken.csv"
+    broken.write_text("Date,Memo\n2025-03-15,not a bank export\n")
+    april = write_export(
+        [export_row("2025-04-01", "STARBUCKS 123", "($4.50)", "$985.50")], "april.csv"
+    )
+    progress = []
+    files = [march, broken, april]
+
+    reports = upload_csvs(model, files, workers=1, progress=progress.append)
+
+    assert [report.filepath for report in reports] == [str(path) for path in files]
+    assert [report.error is None for report in reports] == [True, False, True]
+    assert [report.rows_written for report in reports] == [1, 0, 1]
+    assert len(progress) == 3
+    stored = model.con.execute("SELECT Description FROM MyAccounts ORDER BY id")
+    assert stored.fetchall() == [("SCHNUCKS #42",), ("STARBUCKS 123",)]
@@ -0,0 +1,46 @@
+import os
+import time
+
+import pytest
+
+import watch_folder
+from tests.conftest import export_row
+from watch_folder import SETTLE_SECONDS, FolderWatcher
+
+
+@pytest.fixture
+def settled_export(write_export):
+    path = write_export(
+        [export_row("2025-03-01", "SCHNUCKS #42", "($10.00)", "$990.00")]
+    )
+    settled = time.time() - SETTLE_SECONDS - 60
+    os.utime(path, (settled, settled))
+    return path
+
+
+def test_an_unchanged_file_is_not_hashed_again(
+    model, tmp_path, settled_export, monkeypatch
+):
+    watcher = FolderWatcher(model, tmp_path)
+    assert watcher.poll() == 1
+
+    def fail(path):
+        raise AssertionError(f"{path} was hashed")
+
+    monkeypatch.setattr(watch_folder, "file_sha1", fail)
+
+    assert watcher.poll() == 0
+
+
+def test_a_renamed_file_only_updates_the_manifest(model, tmp_path, settled_export):
+    watcher = FolderWatcher(model, tmp_path)
+    watcher.poll()
+    renamed = settled_export.rename(tmp_path / "renamed.csv")
+
+    assert watcher.poll() == 0
+
+    count = model.con.execute("SELECT COUNT(*) FROM MyAccounts").fetchone()[0]
+    assert count == 1
+    manifest = model.ingest_manifest()
+    assert set(manifest) == {str(settled_export), str(renamed)}
+    assert manifest[str(renamed)] == manifest[str(settled_export)]